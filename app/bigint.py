@@ -0,0 +1,27 @@
+"""Big-integer helpers that use gmpy2 when it is installed.
+
+gmpy2 is an optional dependency: its GMP-backed integers make the large
+multiplications of binary splitting and radix conversion much faster,
+but plain Python ints produce identical results.
+"""
+
+import math
+
+
+try:
+    import gmpy2
+except ImportError:  # pragma: no cover - depends on the environment
+    gmpy2 = None
+
+
+HAS_GMPY2 = gmpy2 is not None
+
+
+def mpz(value: int) -> int:
+    """Convert value to the fastest available big-integer type."""
+    return gmpy2.mpz(value) if HAS_GMPY2 else value
+
+
+def isqrt(value: int) -> int:
+    """Integer square root of a big integer."""
+    return gmpy2.isqrt(value) if HAS_GMPY2 else math.isqrt(value)
@@ -0,0 +1,98 @@
+"""Cooperative cancellation of calculations.
+
+DELETE /tasks/{task_id} revokes a queued task and raises its flag in
+Redis. Running tasks check the flag from their progress callbacks, which
+engines call at bounded intervals, from the worker reveal loop, and at
+the cancellation points of engines (cancellation_point(), called between
+and inside their long phases, a no-op outside of an active check), and
+stop by raising TaskCancelledError. Cancelled tasks are stored in
+Celery's REVOKED state, which /check_progress reports as CANCELLED.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from redis import Redis
+
+from app.settings import settings
+
+
+CANCEL_KEY = "pi:cancel:{task_id}"
+
+_current: ContextVar["CancellationCheck | None"] = ContextVar(
+    "cancellation_check", default=None
+)
+
+
+class TaskCancelledError(Exception):
+    """The task was cancelled by a client."""
+
+
+def request_cancellation(redis: Redis, task_id: str) -> None:
+    """Raise the cancellation flag of a task."""
+    redis.set(CANCEL_KEY.format(task_id=task_id), 1, ex=settings.RESULT_TTL)
+
+
+def is_cancelled(redis: Redis, task_id: str) -> bool:
+    """Whether a task's cancellation was requested."""
+    return bool(redis.exists(CANCEL_KEY.format(task_id=task_id)))
+
+
+class CancellationCheck:
+    """Rate-limited check of a running task's cancellation flag."""
+
+    def __init__(
+        self, redis: Redis, task_id: str, interval: float | None = None
+    ) -> None:
+        """
+        Args:
+            redis: Redis client.
+            task_id: Id of the running task.
+            interval: Seconds between two reads of the flag
+                      (settings.CANCEL_CHECK_INTERVAL by default).
+        """
+        self.redis = redis
+        self.task_id = task_id
+        self.interval = (
+            settings.CANCEL_CHECK_INTERVAL if interval is None else interval
+        )
+        self._checked_at: float | None = None
+
+    @contextmanager
+    def activate(self) -> Iterator["CancellationCheck"]:
+        """Check this task's flag at the cancellation points run in this
+        context."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def __call__(self) -> None:
+        """Raise TaskCancelledError if the task was cancelled.
+
+        The flag is read on the first call, then at most once per
+        interval; calls in between return right away.
+        """
+        now = time.monotonic()
+        if (
+            self._checked_at is not None
+            and now - self._checked_at < self.interval
+        ):
+            return
+        self._checked_at = now
+        if is_cancelled(self.redis, self.task_id):
+            raise TaskCancelledError(f"Task {self.task_id} was cancelled")
+
+
+def cancellation_point() -> None:
+    """Raise TaskCancelledError if the running task was cancelled.
+
+    Uses the running task's active CancellationCheck, so it is as cheap
+    as that check between two reads of the flag; a no-op outside of one.
+    """
+    check = _current.get()
+    if check is not None:
+        check()
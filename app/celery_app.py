@@ -1,5 +1,7 @@
 from celery import Celery
 
+from app import metrics  # noqa: F401  Connects the task signal handlers
+from app.routing import PRIORITY_LEVELS
 from app.settings import settings
 
 
@@ -7,12 +9,36 @@ celery_app = Celery(
     "calculation",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["app.tasks.calculate_pi"],
+    include=[
+        "app.tasks.calculate_pi",
+        "app.tasks.distributed",
+        "app.tasks.hex_digits",
+    ],
 )
 
 celery_app.conf.update(
     task_track_started=True,
     worker_prefetch_multiplier=1,
     task_acks_late=True,
+    # Redeliver the tasks of killed pool processes too, to resume them
+    # from their checkpoint (see app.checkpoints)
+    task_reject_on_worker_lost=True,
     timezone="Europe/Berlin",
+    result_expires=settings.RESULT_TTL,
+    # Calculations are routed per request by size (see app.routing)
+    task_default_queue=settings.FAST_QUEUE,
+    task_routes={
+        "app.tasks.distributed.binary_split_range_task": {
+            "queue": settings.PARTS_QUEUE
+        },
+        "app.tasks.distributed.*": {"queue": settings.HEAVY_QUEUE},
+    },
+    broker_transport_options={
+        "priority_steps": list(range(PRIORITY_LEVELS)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+        # Unacknowledged tasks are redelivered after this long, so it
+        # must exceed the longest admitted task (see app.cost_model)
+        "visibility_timeout": int(settings.MAX_TASK_SECONDS) + 3600,
+    },
 )
@@ -0,0 +1,112 @@
+"""Checkpoints of long engine runs, to resume them after a restart.
+
+Tasks are acknowledged once finished (task_acks_late), so a worker crash
+or a deploy redelivers them. A task activates a Checkpointer around long
+engine runs; engines save their intermediate state through it at most
+once per interval, and on redelivery the task activates a Checkpointer
+on the same file, from which the engine resumes.
+
+Outside of an active Checkpointer, active_checkpointer() is None and
+engines run without saving anything.
+"""
+
+import os
+import pickle
+import time
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from loguru import logger
+
+from app.phases import phase
+
+
+_current: ContextVar["Checkpointer | None"] = ContextVar(
+    "checkpointer", default=None
+)
+
+
+class Checkpointer:
+    """Saves and restores the intermediate state of one engine run."""
+
+    def __init__(
+        self,
+        path: str,
+        interval: float,
+        on_save: Callable[[str], None] | None = None,
+    ) -> None:
+        """
+        Args:
+            path: File holding the checkpoint.
+            interval: Minimum seconds between two saves of maybe_save.
+            on_save: Called with the path after every save.
+        """
+        self.path = path
+        self.interval = interval
+        self.on_save = on_save
+        self._saved_at = time.monotonic()
+
+    @contextmanager
+    def activate(self) -> Iterator["Checkpointer"]:
+        """Make this checkpointer available to the engines run here."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def load(self, key: Hashable) -> Any | None:
+        """State saved under key, None if there is none.
+
+        Args:
+            key: Identifies the computation and its parameters; states
+                 saved under another key are ignored.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                saved_key, state = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError) as e:
+            logger.warning(
+                f"Ignoring unreadable checkpoint {self.path}: "
+                f"{type(e).__name__}: {e}"
+            )
+            return None
+        if saved_key != key:
+            logger.warning(f"Ignoring checkpoint {self.path} of {saved_key}")
+            return None
+        logger.info(f"Resuming from checkpoint {self.path}")
+        return state
+
+    def save(self, key: Hashable, state: Any) -> None:
+        """Save a state, replacing the previous one atomically."""
+        with phase("checkpoint"):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump((key, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+        if self.on_save is not None:
+            self.on_save(self.path)
+
+    def maybe_save(self, key: Hashable, get_state: Callable[[], Any]) -> None:
+        """Save the state from get_state() if the interval has elapsed."""
+        if time.monotonic() - self._saved_at >= self.interval:
+            self.save(key, get_state())
+
+    def remove(self) -> None:
+        """Delete the checkpoint file, if any."""
+        for path in (self.path, f"{self.path}.tmp"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def active_checkpointer() -> Checkpointer | None:
+    """Checkpointer of the running task, None if it is not checkpointed."""
+    return _current.get()
@@ -0,0 +1,294 @@
+"""Cost model of calculations: CPU time and peak memory per engine and n.
+
+Each engine's cost is fitted to benchmark measurements (see
+`python -m benchmarks --calibrate`) from engine runs of at least
+MIN_FIT_DIGITS digits, below which fixed overheads dominate:
+
+- seconds(n) = a * n^b, a power law fitted in log-log space, which
+  follows quasi-linear algorithms (Chudnovsky, mpmath); engines of known
+  complexity (the quadratic spigot, see TIME_EXPONENTS) keep their
+  exponent, as the small sizes they are benchmarked at would
+  underestimate it;
+- peak_bytes(n) = base + per_digit * n, fitted to the growth of the
+  process's resident set size during the run.
+
+The API uses the estimates to refuse or defer calculations and hex digit
+extractions over the budgets in settings (see admission()) and to route
+them to a queue, and tasks use them to report their expected finish
+time (see EtaTracker).
+"""
+
+import json
+import math
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Literal
+
+from loguru import logger
+
+from app.engines import available_engines, get_engine
+from app.reveal import RevealSchedule
+from app.settings import settings
+
+
+# Smallest benchmark size used for fitting
+MIN_FIT_DIGITS = 10_000
+
+# Compute progress from which the finish time is extrapolated from the
+# progress rate rather than estimated by the model
+MIN_EXTRAPOLATION_PROGRESS = 0.05
+
+# Seconds per BBP series term of a hex digit extraction, measured like
+# DEFAULT_COSTS (the exact path, slower than the vectorized one)
+HEX_SECONDS_PER_TERM = 8e-6
+
+# Time exponents of the engines whose complexity is known, for which
+# only the coefficient is fitted
+TIME_EXPONENTS = {"spigot": 2.0}
+
+Admission = Literal["admit", "defer", "reject"]
+
+
+class CostBudgetExceededError(Exception):
+    """A calculation's estimated cost exceeds the configured budgets."""
+
+    def __init__(self, estimate: "CostEstimate") -> None:
+        super().__init__(
+            f"Estimated cost exceeds the budget: "
+            f"{estimate.seconds:.0f}s of CPU and "
+            f"{estimate.peak_bytes / 1024**3:.1f} GiB of memory "
+            f"(limits: {settings.MAX_TASK_SECONDS:.0f}s, "
+            f"{settings.MAX_TASK_BYTES / 1024**3:.1f} GiB)"
+        )
+        self.estimate = estimate
+
+
+@dataclass(frozen=True)
+class EngineCost:
+    """Fitted cost of one engine as a function of the digits computed."""
+
+    time_coefficient: float
+    time_exponent: float
+    base_bytes: float
+    bytes_per_digit: float
+
+    def seconds(self, n_chars: int) -> float:
+        return self.time_coefficient * n_chars**self.time_exponent
+
+    def peak_bytes(self, n_chars: int) -> int:
+        return int(self.base_bytes + self.bytes_per_digit * n_chars)
+
+    @classmethod
+    def fit(
+        cls,
+        samples: list[tuple[int, float, float]],
+        time_exponent: float | None = None,
+    ) -> "EngineCost":
+        """Fit the model to measured (n_chars, seconds, peak_bytes).
+
+        Samples under MIN_FIT_DIGITS are only used when there are fewer
+        than two larger ones.
+
+        Args:
+            samples: Measurements, at least two.
+            time_exponent: Known time exponent; the coefficient is then
+                           taken from the largest sample, where fixed
+                           overheads weigh least.
+        """
+        large = [s for s in samples if s[0] >= MIN_FIT_DIGITS]
+        samples = large if len(large) >= 2 else samples
+        if len(samples) < 2:
+            raise ValueError("At least two samples are needed for a fit")
+
+        if time_exponent is None:
+            # seconds = a * n^b  <=>  log(seconds) = log(a) + b * log(n)
+            log_a, time_exponent = _linear_fit(
+                [math.log(n) for n, _, _ in samples],
+                [math.log(max(seconds, 1e-9)) for _, seconds, _ in samples],
+            )
+            time_coefficient = math.exp(log_a)
+        else:
+            n, seconds, _ = max(samples)
+            time_coefficient = seconds / n**time_exponent
+        base, per_digit = _linear_fit(
+            [float(n) for n, _, _ in samples],
+            [peak for _, _, peak in samples],
+        )
+        return cls(
+            time_coefficient=time_coefficient,
+            time_exponent=time_exponent,
+            base_bytes=max(base, 0.0),
+            bytes_per_digit=max(per_digit, 0.0),
+        )
+
+
+def _linear_fit(xs: list[float], ys: list[float]) -> tuple[float, float]:
+    """Least-squares (intercept, slope) of ys against xs."""
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return mean_y, 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+    return mean_y - slope * mean_x, slope
+
+
+# Calibrated with `python -m benchmarks --suite engines --calibrate` on
+# one core of an x86-64 machine with gmpy2, for 10^4 to 10^7 digits (the
+# spigot, quadratic, at 4 * 10^4)
+DEFAULT_COSTS: dict[str, EngineCost] = {
+    "chudnovsky": EngineCost(
+        time_coefficient=2.58e-08,
+        time_exponent=1.27,
+        base_bytes=0.0,
+        bytes_per_digit=13.2,
+    ),
+    "mpmath": EngineCost(
+        time_coefficient=3.62e-08,
+        time_exponent=1.24,
+        base_bytes=0.0,
+        bytes_per_digit=15.1,
+    ),
+    "spigot": EngineCost(
+        time_coefficient=3.7e-09,
+        time_exponent=2.0,
+        base_bytes=114_000.0,
+        bytes_per_digit=35.1,
+    ),
+}
+
+
+def save_cost_model(path: str, costs: dict[str, EngineCost]) -> None:
+    """Write engine costs as JSON, for settings.COST_MODEL_PATH."""
+    with open(path, "w") as f:
+        json.dump({name: asdict(cost) for name, cost in costs.items()}, f)
+
+
+@lru_cache(maxsize=1)
+def get_cost_model() -> dict[str, EngineCost]:
+    """Engine costs: the defaults, overridden by the calibration file at
+    settings.COST_MODEL_PATH if set."""
+    costs = dict(DEFAULT_COSTS)
+    if settings.COST_MODEL_PATH:
+        try:
+            with open(settings.COST_MODEL_PATH) as f:
+                costs.update(
+                    {
+                        name: EngineCost(**cost)
+                        for name, cost in json.load(f).items()
+                    }
+                )
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(
+                f"Failed to load the cost model, using the defaults: "
+                f"{type(e).__name__}: {e}"
+            )
+    return costs
+
+
+@dataclass(frozen=True)
+class CostEstimate:
+    """Estimated cost of computing a request."""
+
+    engine: str
+    seconds: float
+    peak_bytes: int
+
+
+def estimate_cost(n_digits: int, algorithm: str | None = None) -> CostEstimate:
+    """Estimate the compute time and peak memory of a calculation.
+
+    Args:
+        n_digits: Number of decimal digits to calculate.
+        algorithm: Engine to run, as requested or picked by
+                   select_engine; the cheapest modelled engine accepting
+                   n_digits when omitted.
+
+    Returns:
+        The estimate, for settings.DEFAULT_ENGINE's cost if the engine
+        is not modelled.
+    """
+    costs = get_cost_model()
+    n_chars = n_digits + 2
+    if algorithm is None:
+        candidates = [
+            name for name in available_engines(n_digits) if name in costs
+        ]
+        name = min(
+            candidates or [settings.DEFAULT_ENGINE],
+            key=lambda name: costs[name].seconds(n_chars),
+        )
+    else:
+        name = algorithm
+    cost = costs.get(name, costs[settings.DEFAULT_ENGINE])
+    return CostEstimate(
+        engine=name,
+        seconds=cost.seconds(n_chars),
+        peak_bytes=cost.peak_bytes(n_chars),
+    )
+
+
+def estimate_hex_cost(positions: list[int]) -> CostEstimate:
+    """Estimate the compute time of a hex digit extraction.
+
+    Extracting position d evaluates d + 1 terms of each BBP series,
+    in constant memory.
+    """
+    terms = sum(position + 1 for position in set(positions))
+    return CostEstimate(
+        engine="bbp", seconds=HEX_SECONDS_PER_TERM * terms, peak_bytes=0
+    )
+
+
+def admission(estimate: CostEstimate) -> Admission:
+    """Decide whether a calculation may run, given settings' budgets.
+
+    Returns:
+        "reject" over settings.MAX_TASK_SECONDS or MAX_TASK_BYTES,
+        "defer" over settings.DEFER_MIN_SECONDS, "admit" otherwise.
+    """
+    if (
+        estimate.seconds > settings.MAX_TASK_SECONDS
+        or estimate.peak_bytes > settings.MAX_TASK_BYTES
+    ):
+        return "reject"
+    if estimate.seconds > settings.DEFER_MIN_SECONDS:
+        return "defer"
+    return "admit"
+
+
+def reveal_seconds(n_digits: int, engine: str) -> float:
+    """Duration of the reveal following the computation of a result."""
+    if get_engine(engine).streaming:
+        # Streaming engines are not revealed
+        return 0.0
+    return RevealSchedule(total_chars=n_digits + 1, started_at=0.0).duration
+
+
+class EtaTracker:
+    """Expected finish time of a calculation, reported in its meta.
+
+    Until MIN_EXTRAPOLATION_PROGRESS of the computation is done, the
+    finish time follows the model's estimate; from then on it is
+    extrapolated from the progress rate. The reveal follows either way.
+    """
+
+    def __init__(self, estimate: CostEstimate, reveal_seconds: float) -> None:
+        self.estimate = estimate
+        self.reveal_seconds = reveal_seconds
+        self.started_at = time.time()
+
+    def meta(self, compute_progress: float = 0.0) -> dict:
+        """Task meta fields "eta_at" (a timestamp) and
+        "estimated_peak_bytes" at the given compute progress."""
+        now = time.time()
+        elapsed = now - self.started_at
+        if compute_progress >= MIN_EXTRAPOLATION_PROGRESS:
+            remaining = elapsed * (1.0 - compute_progress) / compute_progress
+        else:
+            remaining = max(self.estimate.seconds - elapsed, 0.0)
+        return {
+            "eta_at": now + remaining + self.reveal_seconds,
+            "estimated_peak_bytes": self.estimate.peak_bytes,
+        }
@@ -0,0 +1,107 @@
+"""Helpers for working with raw (truncated) digit strings of Pi.
+
+Engines and storage backends exchange Pi as a plain string of truncated
+decimal digits without the decimal point, e.g. ``"31415926535"``. The
+public result format ``"3.1416"`` is produced from it by rounding.
+"""
+
+
+def format_pi(digits: str, n_digits: int) -> str:
+    """Round truncated Pi digits to n decimals and insert the decimal point.
+
+    Rounds half up, which is exact for Pi: being irrational it can never
+    sit exactly halfway between two n-digit decimals.
+
+    Args:
+        digits: Truncated digits ("3" followed by decimals), at least
+                n_digits + 2 characters long.
+        n_digits: Number of decimal digits in the result.
+
+    Returns:
+        Pi rounded to n_digits decimals, e.g. "3.1416" for n_digits=4.
+    """
+    if len(digits) < n_digits + 2:
+        raise ValueError(
+            f"Need {n_digits + 2} digits to round to {n_digits} decimals, "
+            f"got {len(digits)}"
+        )
+
+    kept = digits[: n_digits + 1]
+    if digits[n_digits + 1] >= "5":
+        # Propagate the carry through a trailing run of nines
+        stripped = kept.rstrip("9")
+        carried = len(kept) - len(stripped)
+        kept = stripped[:-1] + str(int(stripped[-1]) + 1) + "0" * carried
+
+    return f"{kept[0]}.{kept[1:]}"
+
+
+def stable_prefix(digits: str, n_digits: int) -> str:
+    """Longest prefix of format_pi(..., n_digits) known from partial digits.
+
+    Digits still to come can only change the known ones by a rounding
+    carry, which turns a trailing run of nines into zeros and increments
+    the digit before it; everything before that digit is final.
+
+    Args:
+        digits: First truncated digits computed so far.
+        n_digits: Number of decimal digits of the final result.
+
+    Returns:
+        Prefix of the final result ("3.14159..."), empty if none is known.
+    """
+    if len(digits) >= n_digits + 2:
+        return format_pi(digits, n_digits)
+
+    stable = digits[: n_digits + 1].rstrip("9")[:-1]
+    return f"{stable[0]}.{stable[1:]}" if stable else ""
+
+
+class StablePrefix:
+    """stable_prefix of digits arriving in blocks, kept incrementally.
+
+    Each block is scanned once, so following a stream costs time linear
+    in its length; the prefix string itself is only built on demand.
+    """
+
+    def __init__(self, n_digits: int) -> None:
+        """
+        Args:
+            n_digits: Number of decimal digits of the final result.
+        """
+        self.n_digits = n_digits
+        self._blocks: list[str] = []
+        self._length = 0
+        # Digits before the last non-nine of the first n_digits + 1
+        self._stable = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def extend(self, block: str) -> None:
+        """Append the next block of truncated digits."""
+        kept = block[: max(self.n_digits + 1 - self._length, 0)]
+        stripped = kept.rstrip("9")
+        if stripped:
+            self._stable = self._length + len(stripped) - 1
+        self._blocks.append(block)
+        self._length += len(block)
+
+    @property
+    def digits(self) -> str:
+        """Digits received so far."""
+        if len(self._blocks) > 1:
+            self._blocks = ["".join(self._blocks)]
+        return self._blocks[0] if self._blocks else ""
+
+    def prefix(self) -> str:
+        """stable_prefix(self.digits, n_digits)."""
+        if self._length >= self.n_digits + 2:
+            return format_pi(self.digits, self.n_digits)
+        stable = self.digits[: self._stable]
+        return f"{stable[0]}.{stable[1:]}" if stable else ""
+
+
+def size_bucket(n_chars: int) -> int:
+    """Order-of-magnitude bucket of a request size (number of digits)."""
+    return len(str(n_chars))
@@ -0,0 +1,34 @@
+# Import engine modules so that they register themselves
+from app.engines import (  # noqa: E402, F401, I001
+    chudnovsky,
+    mpmath_engine,
+    spigot,
+)
+from app.engines.base import PiEngine
+from app.engines.registry import (
+    EngineRun,
+    available_engines,
+    engine_throughputs,
+    get_engine,
+    measured_throughputs,
+    record_throughput,
+    register_engine,
+    run_engine,
+    select_engine,
+    size_bucket,
+)
+
+
+__all__ = [
+    "EngineRun",
+    "PiEngine",
+    "available_engines",
+    "engine_throughputs",
+    "get_engine",
+    "measured_throughputs",
+    "record_throughput",
+    "register_engine",
+    "run_engine",
+    "select_engine",
+    "size_bucket",
+]
@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import ClassVar
+
+from app.progress import ProgressCallback
+
+
+class PiEngine(ABC):
+    """Interface of an algorithm computing decimal digits of Pi.
+
+    Engines return truncated digits ("31415926...") without a decimal
+    point, so results of every engine are interchangeable and can be
+    stored in the digit store and rounded by app.digits.format_pi.
+    """
+
+    name: ClassVar[str]
+    description: ClassVar[str]
+    # Whether stream() yields digits as they are computed, rather than
+    # all of them at the end
+    streaming: ClassVar[bool] = False
+    # Largest number of decimal digits the engine may be asked for, None
+    # for no limit (engines too slow for larger requests)
+    max_digits: ClassVar[int | None] = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Whether the engine's optional dependencies are installed."""
+        return True
+
+    @abstractmethod
+    def compute(
+        self, n_chars: int, on_progress: ProgressCallback | None = None
+    ) -> str:
+        """Compute the first n_chars truncated digits of Pi.
+
+        Args:
+            n_chars: Number of digit characters, including the leading 3.
+            on_progress: Called with the fraction of work done, as often
+                         as the engine can tell; callers rate-limit it.
+
+        Returns:
+            Truncated digits string of length n_chars.
+        """
+
+    def stream(
+        self, n_chars: int, on_progress: ProgressCallback | None = None
+    ) -> Iterator[str]:
+        """Yield the first n_chars truncated digits of Pi in blocks.
+
+        Streaming engines yield every block as soon as it is final; the
+        default implementation yields the whole computation at once.
+
+        Args:
+            n_chars: Number of digit characters, including the leading 3.
+            on_progress: See compute.
+
+        Yields:
+            Consecutive blocks of digits, n_chars characters in total.
+        """
+        yield self.compute(n_chars, on_progress)
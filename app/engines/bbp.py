@@ -0,0 +1,214 @@
+"""Bailey-Borwein-Plouffe extraction of hexadecimal digits of Pi.
+
+The BBP formula
+
+    pi = sum_k 16^-k * (4/(8k+1) - 2/(8k+4) - 1/(8k+5) - 1/(8k+6))
+
+gives the hex digits at any position d without the digits before it:
+the fractional part of 16^d * pi only needs the modular powers
+16^(d-k) mod (8k+j) for k <= d, plus a quickly vanishing tail. That is
+O(d log d) time and O(1) memory per position.
+
+Positions are 0-based indices of the hex digits after the point
+(pi = 3.243F6A88..., position 0 is "2").
+
+Digits are computed in exact fixed-point integer arithmetic, whose error
+is bounded: when the bound straddles a digit boundary, the precision is
+raised and the sum recomputed. Batches of positions are evaluated in
+float64 with NumPy when it is installed, vectorized over all the series
+terms of the batch, as far as the float error bound allows; positions
+whose float result lies too close to a digit boundary are recomputed
+exactly.
+"""
+
+from collections.abc import Iterator
+
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+
+HAS_NUMPY = np is not None
+
+# Hex digits per position that the float path may still get right
+MAX_COUNT = 8
+
+# (j, weight) of the four series of the formula
+SERIES = ((1, 4), (4, -2), (5, -1), (6, -1))
+
+# Series terms evaluated per vectorized step (bounds memory use)
+CHUNK_TERMS = 1 << 16
+
+# Float tail terms: 16^-14 / 8 is below float64 resolution
+FLOAT_TAIL_TERMS = 14
+
+# Moduli 8k+6 must stay below 2^32 so their squares fit in uint64
+MAX_VECTOR_POSITION = (1 << 29) - 1
+
+
+def _fixed_series(j: int, d: int, bits: int) -> tuple[int, int]:
+    """frac(sum_k 16^(d-k) / (8k+j)) as a bits-bit fixed-point integer.
+
+    Returns:
+        The truncated sum and the number of terms, each truncation
+        losing less than one unit in the last place.
+    """
+    mask = (1 << bits) - 1
+    total = 0
+    for k in range(d + 1):
+        m = 8 * k + j
+        total = (total + (pow(16, d - k, m) << bits) // m) & mask
+
+    # Tail: 16^(d-k) < 1, so terms are shifted right instead
+    k = d + 1
+    while (shift := bits - 4 * (k - d)) > 0:
+        total = (total + (1 << shift) // (8 * k + j)) & mask
+        k += 1
+    return total, k
+
+
+def hex_digits(position: int, count: int = MAX_COUNT) -> str:
+    """Exact hex digits of Pi at a position, by fixed-point BBP.
+
+    Args:
+        position: 0-based index of the first hex digit after the point.
+        count: Number of hex digits to return.
+
+    Returns:
+        count uppercase hex digits.
+    """
+    digits_bits = 4 * count
+    guard_bits = (4 * (position + 64)).bit_length() + 8
+
+    while True:
+        bits = digits_bits + guard_bits
+        total, terms = 0, 0
+        for j, weight in SERIES:
+            series, n = _fixed_series(j, position, bits)
+            total += weight * series
+            terms = max(terms, n)
+
+        # Every series is truncated by less than one ulp per term, so
+        # the exact value lies within +-error of the weighted total
+        error = 4 * terms
+        shift = bits - digits_bits
+        low, high = (total - error) >> shift, (total + error) >> shift
+        if low == high:
+            return f"{low % (1 << digits_bits):0{count}X}"
+        # Too close to a digit boundary: retry with more precision
+        guard_bits += 32
+
+
+def _powmod16(exponents: "np.ndarray", moduli: "np.ndarray") -> "np.ndarray":
+    """Elementwise 16^exponents mod moduli (uint64, moduli < 2^32)."""
+    result = np.ones_like(moduli) % moduli
+    base = np.full_like(moduli, 16) % moduli
+    exponents = exponents.copy()
+    while exponents.any():
+        odd = (exponents & 1).astype(bool)
+        result = np.where(odd, result * base % moduli, result)
+        base = base * base % moduli
+        exponents >>= 1
+    return result
+
+
+def _term_chunks(
+    positions: list[int],
+) -> "Iterator[tuple[np.ndarray, np.ndarray]]":
+    """Yield (owner, k) arrays covering terms k <= d of every position."""
+    owners, ks, filled = [], [], 0
+    for owner, d in enumerate(positions):
+        start = 0
+        while start <= d:
+            take = min(d + 1 - start, CHUNK_TERMS - filled)
+            ks.append(np.arange(start, start + take, dtype=np.uint64))
+            owners.append(np.full(take, owner, dtype=np.intp))
+            filled += take
+            start += take
+            if filled == CHUNK_TERMS:
+                yield np.concatenate(owners), np.concatenate(ks)
+                owners, ks, filled = [], [], 0
+    if filled:
+        yield np.concatenate(owners), np.concatenate(ks)
+
+
+def _float_fractions(positions: list[int]) -> "np.ndarray":
+    """frac(16^d * pi) of every position d, in float64."""
+    d = np.asarray(positions, dtype=np.uint64)
+    total = np.zeros(len(positions))
+
+    for j, weight in SERIES:
+        sums = np.zeros(len(positions))
+        for owners, k in _term_chunks(positions):
+            moduli = 8 * k + j
+            terms = _powmod16(d[owners] - k, moduli) / moduli
+            sums += np.bincount(owners, weights=terms, minlength=len(d))
+            sums %= 1.0
+        for t in range(1, FLOAT_TAIL_TERMS + 1):
+            sums += 16.0**-t / (8 * (d + t) + j)
+        total += weight * sums
+
+    return total % 1.0
+
+
+def _float_margin(position: int, scale: float) -> float:
+    """Bound on the float error of a position's fraction, times scale.
+
+    np.bincount adds the terms of a chunk one after the other, and each
+    addition may lose half an ulp of a partial sum as large as the
+    number of terms added so far: the c terms of a position in a chunk
+    lose up to c^2 / 2 ulps of 1. Over the d + 1 terms of a series that
+    is at most (d + 1) * min(d + 1, CHUNK_TERMS), plus the rounding of
+    the terms, of the reductions and of the tail; 8 is the sum of
+    |weights|.
+    """
+    terms = position + 1
+    ulps = terms * min(terms, CHUNK_TERMS) + 2 * terms + 64
+    return 8 * ulps * 2.0**-52 * scale
+
+
+def hex_digits_batch(positions: list[int], count: int = 1) -> list[str]:
+    """Hex digits of Pi at many positions.
+
+    Vectorized in float64 with NumPy when available, for the positions
+    whose float error bound is small enough to resolve count digits;
+    the others, and float results too close to a digit boundary for the
+    bound, are computed exactly.
+
+    Args:
+        positions: 0-based indices of the first hex digit after the point.
+        count: Number of hex digits per position (at most MAX_COUNT).
+
+    Returns:
+        count uppercase hex digits for every position, in order.
+    """
+    scale = 16.0**count
+    digits: dict[int, str] = {}
+    vectorized = (
+        [
+            position
+            for position in positions
+            if position <= MAX_VECTOR_POSITION
+            # Too many digits asked for the float precision to resolve
+            and _float_margin(position, scale) <= 0.25
+        ]
+        if HAS_NUMPY
+        else []
+    )
+
+    if vectorized:
+        for position, fraction in zip(
+            vectorized, _float_fractions(vectorized)
+        ):
+            margin = _float_margin(position, scale)
+            scaled = fraction * scale
+            value = int(scaled)
+            if margin < scaled - value < 1 - margin:
+                digits[position] = f"{value:0{count}X}"
+
+    return [
+        digits[position] if position in digits else hex_digits(position, count)
+        for position in positions
+    ]
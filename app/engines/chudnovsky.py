@@ -0,0 +1,286 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from loguru import logger
+
+from app.bigint import HAS_GMPY2, isqrt, mpz
+from app.cancellation import cancellation_point
+from app.checkpoints import Checkpointer, active_checkpointer
+from app.engines.base import PiEngine
+from app.engines.registry import register_engine
+from app.phases import phase
+from app.progress import ProgressCallback
+from app.radix import decimal_digits
+from app.settings import settings
+
+
+# Each term of the Chudnovsky series adds log10(640320**3 / 1728)
+# ~= 14.18 correct decimal digits
+DIGITS_PER_TERM = 14.181647462725477
+GUARD_DIGITS = 10
+
+C = 640320
+C3_OVER_24 = C**3 // 24
+
+# Term ranges per pool process, so that early finishers pick up more work
+CHUNKS_PER_WORKER = 2
+
+# Leaf ranges of a serial computation, each one a progress report
+SERIAL_CHUNKS = 64
+
+# Rough share of binary splitting in the total time; the rest is the
+# final square root and division
+SPLIT_SHARE = 0.8
+
+# Spawned pool processes are safe to start from threaded workers too
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+PQT = tuple[int, int, int]
+
+
+def binary_split(a: int, b: int) -> PQT:
+    """Compute the P, Q, T products of the Chudnovsky terms [a, b).
+
+    Args:
+        a: First term index (inclusive).
+        b: Last term index (exclusive).
+
+    Returns:
+        Tuple (P, Q, T) such that adjacent ranges merge via merge_split.
+    """
+    if b - a == 1:
+        if a == 0:
+            p = q = mpz(1)
+        else:
+            p = mpz((6 * a - 5) * (2 * a - 1) * (6 * a - 1))
+            q = mpz(a * a * a * C3_OVER_24)
+        t = p * (13591409 + 545140134 * a)
+        if a & 1:
+            t = -t
+        return p, q, t
+
+    m = (a + b) // 2
+    return merge_split(binary_split(a, m), binary_split(m, b))
+
+
+def merge_split(left: PQT, right: PQT) -> PQT:
+    """Combine the P, Q, T products of two adjacent term ranges."""
+    p1, q1, t1 = left
+    p2, q2, t2 = right
+    return p1 * p2, q1 * q2, t1 * q2 + p1 * t2
+
+
+def merge_all(parts: list[PQT]) -> PQT:
+    """Merge the products of adjacent ranges pairwise, as a balanced tree."""
+    level = parts
+    while len(level) > 1:
+        merged = [merge_split(*pair) for pair in zip(level[0::2], level[1::2])]
+        if len(level) % 2:
+            merged.append(level[-1])
+        level = merged
+    return level[0]
+
+
+def split_ranges(a: int, b: int, parts: int) -> list[tuple[int, int]]:
+    """Split the term range [a, b) into at most `parts` adjacent ranges."""
+    bounds = [a + (b - a) * i // parts for i in range(parts + 1)]
+    return [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if lo < hi]
+
+
+def chunked_binary_split(
+    a: int,
+    b: int,
+    chunks: int = SERIAL_CHUNKS,
+    on_progress: ProgressCallback | None = None,
+    checkpointer: Checkpointer | None = None,
+) -> PQT:
+    """Serial binary splitting of [a, b) in leaf ranges, reporting each.
+
+    Leaves are merged as they complete, like a binary counter: two
+    neighbours covering the same number of leaves merge right away, so
+    only O(log chunks) partial products are held at any time. Those are
+    the state saved to the checkpointer, if any, between two leaves.
+
+    Args:
+        a: First term index (inclusive).
+        b: Last term index (exclusive).
+        chunks: Number of leaf ranges.
+        on_progress: Called with the fraction of leaves done.
+        checkpointer: Saves the progress, and resumes from its state.
+
+    Returns:
+        Tuple (P, Q, T) of the whole range, same as binary_split(a, b).
+    """
+    ranges = split_ranges(a, b, chunks)
+    key = ("chudnovsky", "serial", a, b, len(ranges))
+    # (number of leaves, products) of the pending subtrees, left to right
+    stack: list[tuple[int, PQT]] = []
+    start = 0
+    if checkpointer is not None:
+        start, stack = checkpointer.load(key) or (0, [])
+
+    for done, (lo, hi) in enumerate(ranges[start:], start + 1):
+        leaves, products = 1, binary_split(lo, hi)
+        while stack and stack[-1][0] == leaves:
+            left_leaves, left = stack.pop()
+            leaves += left_leaves
+            products = merge_split(left, products)
+        stack.append((leaves, products))
+
+        if on_progress is not None:
+            on_progress(done / len(ranges))
+        if checkpointer is not None:
+            checkpointer.maybe_save(key, lambda: (done, stack))
+
+    _, products = stack.pop()
+    while stack:
+        _, left = stack.pop()
+        products = merge_split(left, products)
+    return products
+
+
+def parallel_binary_split(
+    a: int,
+    b: int,
+    workers: int,
+    on_progress: ProgressCallback | None = None,
+    checkpointer: Checkpointer | None = None,
+) -> PQT:
+    """Binary splitting of [a, b) spread over a pool of processes.
+
+    Leaf ranges are computed in parallel, then merged pairwise level by
+    level (a tree), so that every level but the last runs in parallel.
+    The leaves done are the state saved to the checkpointer, if any.
+
+    Args:
+        a: First term index (inclusive).
+        b: Last term index (exclusive).
+        workers: Number of pool processes.
+        on_progress: Called with the fraction of leaf ranges done.
+        checkpointer: Saves the progress, and resumes from its state.
+
+    Returns:
+        Tuple (P, Q, T) of the whole range, same as binary_split(a, b).
+    """
+    ranges = split_ranges(a, b, workers * CHUNKS_PER_WORKER)
+    key = ("chudnovsky", "parallel", a, b, len(ranges))
+    # Products of the leaf ranges done, by index
+    leaves: dict[int, PQT] = {}
+    if checkpointer is not None:
+        leaves = checkpointer.load(key) or {}
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=_MP_CONTEXT)
+    try:
+        futures = {
+            pool.submit(binary_split, lo, hi): i
+            for i, (lo, hi) in enumerate(ranges)
+            if i not in leaves
+        }
+        for future in as_completed(futures):
+            leaves[futures[future]] = future.result()
+            if on_progress is not None:
+                on_progress(len(leaves) / len(ranges))
+            if checkpointer is not None:
+                checkpointer.maybe_save(key, lambda: leaves)
+        level = [leaves[i] for i in range(len(ranges))]
+
+        while len(level) > 2:
+            merged = list(pool.map(merge_split, level[0::2], level[1::2]))
+            if len(level) % 2:
+                merged.append(level[-1])
+            level = merged
+    except BaseException:
+        # e.g. cancelled from on_progress: drop the queued leaves rather
+        # than wait for all of them to run
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    # The top merge is a single multiplication, no point shipping it
+    return merge_split(*level) if len(level) == 2 else level[0]
+
+
+def terms_for(n_chars: int) -> int:
+    """Number of series terms needed for n_chars digits (with guard)."""
+    return int((n_chars + GUARD_DIGITS) / DIGITS_PER_TERM) + 1
+
+
+def pi_from_split(q: int, t: int, n_chars: int) -> str:
+    """Turn the Q, T products of the full series into truncated digits."""
+    precision = n_chars - 1 + GUARD_DIGITS
+    cancellation_point()
+    with phase("final_division"):
+        sqrt_c = isqrt(10005 * mpz(10) ** (2 * precision))
+        cancellation_point()
+        scaled = (q * 426880 * sqrt_c) // t
+    cancellation_point()
+    # scaled = floor(pi * 10^precision) has precision + 1 digits
+    return decimal_digits(scaled, precision + 1, n_chars)
+
+
+@register_engine
+class ChudnovskyEngine(PiEngine):
+    name = "chudnovsky"
+    description = (
+        "Chudnovsky series with binary splitting on Python big ints"
+        + (" (gmpy2 accelerated)." if HAS_GMPY2 else ".")
+    )
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        parallel_min_digits: int | None = None,
+    ) -> None:
+        """Configure multi-core binary splitting.
+
+        Args:
+            workers: Processes used for binary splitting of large requests
+                     (settings.PARALLEL_WORKERS by default).
+            parallel_min_digits: Requests smaller than this stay serial
+                                 (settings.PARALLEL_MIN_DIGITS by default).
+        """
+        self.workers = workers or settings.PARALLEL_WORKERS
+        self.parallel_min_digits = (
+            parallel_min_digits or settings.PARALLEL_MIN_DIGITS
+        )
+
+    def compute(
+        self, n_chars: int, on_progress: ProgressCallback | None = None
+    ) -> str:
+        terms = terms_for(n_chars)
+
+        def on_split_progress(fraction: float) -> None:
+            on_progress(SPLIT_SHARE * fraction)
+
+        split_progress = on_split_progress if on_progress else None
+        checkpointer = active_checkpointer()
+
+        if self.workers > 1 and n_chars >= self.parallel_min_digits:
+            try:
+                with phase("binary_splitting"):
+                    _, q, t = parallel_binary_split(
+                        0, terms, self.workers, split_progress, checkpointer
+                    )
+                return self._finish(q, t, n_chars, on_progress)
+            except (AssertionError, OSError) as e:
+                # Daemonic processes (e.g. Celery prefork children) are
+                # not allowed to start a process pool
+                logger.warning(
+                    f"Parallel binary splitting unavailable, "
+                    f"falling back to serial: {type(e).__name__}: {e}"
+                )
+
+        with phase("binary_splitting"):
+            _, q, t = chunked_binary_split(
+                0, terms, SERIAL_CHUNKS, split_progress, checkpointer
+            )
+        return self._finish(q, t, n_chars, on_progress)
+
+    @staticmethod
+    def _finish(
+        q: int, t: int, n_chars: int, on_progress: ProgressCallback | None
+    ) -> str:
+        digits = pi_from_split(q, t, n_chars)
+        if on_progress is not None:
+            on_progress(1.0)
+        return digits
@@ -0,0 +1,47 @@
+import threading
+
+from mpmath import MPContext
+
+from app.bigint import mpz
+from app.cancellation import cancellation_point
+from app.engines.base import PiEngine
+from app.engines.registry import register_engine
+from app.phases import phase
+from app.progress import ProgressCallback
+from app.radix import decimal_digits
+
+
+# Extra digits computed beyond the requested precision, so that the
+# truncated digits are not affected by mpmath's rounding of the last place
+GUARD_DIGITS = 10
+
+# mpmath memoizes constants at the highest precision evaluated so far, in
+# a process-wide cache that concurrent threads would corrupt
+_CONSTANTS_LOCK = threading.Lock()
+
+
+@register_engine
+class MpmathEngine(PiEngine):
+    name = "mpmath"
+    description = "mpmath's built-in Pi constant evaluation."
+
+    def compute(
+        self, n_chars: int, on_progress: ProgressCallback | None = None
+    ) -> str:
+        # A context of its own, rather than the global mp, keeps the
+        # precision of concurrent tasks apart
+        ctx = MPContext()
+        ctx.dps = n_chars + GUARD_DIGITS
+
+        # mpmath evaluates Pi in one call, there is no progress to report
+        # and it can only be cancelled before and after it
+        cancellation_point()
+        with phase("evaluation"), _CONSTANTS_LOCK:
+            pi = +ctx.pi  # Evaluate the constant at the context's precision
+        cancellation_point()
+
+        # pi = man * 2^exp exactly, so floor(pi * 10^precision) is a shift
+        # away; its digits come from app.radix, not from mp.nstr
+        precision = n_chars - 1 + GUARD_DIGITS
+        scaled = (pi.man * mpz(10) ** precision) >> -pi.exp
+        return decimal_digits(scaled, precision + 1, n_chars)
@@ -0,0 +1,187 @@
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from loguru import logger
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.digits import size_bucket
+from app.engines.base import PiEngine
+from app.progress import ProgressCallback
+from app.settings import settings
+
+
+ENGINE_STATS_KEY = "pi:engine_stats:{bucket}"
+# Runs of explicitly requested engines, kept apart so that a client's
+# choice never steers the automatic selection
+EXPLICIT_STATS_KEY = "pi:engine_stats:explicit:{bucket}"
+
+_ENGINES: dict[str, type[PiEngine]] = {}
+
+
+@dataclass(frozen=True)
+class EngineRun:
+    """Outcome of one engine computation with its measured throughput."""
+
+    engine: str
+    digits: str
+    elapsed: float
+
+    @property
+    def digits_per_second(self) -> float:
+        return len(self.digits) / max(self.elapsed, 1e-9)
+
+
+def register_engine(cls: type[PiEngine]) -> type[PiEngine]:
+    """Class decorator adding an engine to the registry under its name."""
+    _ENGINES[cls.name] = cls
+    return cls
+
+
+def available_engines(n_digits: int | None = None) -> list[str]:
+    """Names of registered engines whose dependencies are installed.
+
+    Args:
+        n_digits: Only list the engines accepting this many decimal
+                  digits (see PiEngine.max_digits).
+    """
+    return [
+        name
+        for name, cls in _ENGINES.items()
+        if cls.is_available()
+        and (
+            n_digits is None
+            or cls.max_digits is None
+            or n_digits <= cls.max_digits
+        )
+    ]
+
+
+def get_engine(name: str) -> PiEngine:
+    """Instantiate a registered engine by name.
+
+    Raises:
+        ValueError: If no available engine has that name.
+    """
+    if name not in available_engines():
+        raise ValueError(f"Unknown Pi engine: {name}")
+    return _ENGINES[name]()
+
+
+def run_engine(
+    engine: PiEngine,
+    n_chars: int,
+    on_progress: ProgressCallback | None = None,
+    on_block: Callable[[str], None] | None = None,
+) -> EngineRun:
+    """Run an engine and measure its wall-clock throughput.
+
+    on_block is called with every block of digits of a streaming engine
+    as soon as it is computed, in place of on_progress; other engines
+    report to on_progress and never call on_block.
+    """
+    started = time.perf_counter()
+    if on_block is not None and engine.streaming:
+        blocks = []
+        for block in engine.stream(n_chars):
+            on_block(block)
+            blocks.append(block)
+        digits = "".join(blocks)
+    else:
+        digits = engine.compute(n_chars, on_progress)
+    run = EngineRun(engine.name, digits, time.perf_counter() - started)
+
+    logger.info(
+        f"Engine {run.engine} computed {n_chars} digits in "
+        f"{run.elapsed:.3f}s ({run.digits_per_second:,.0f} digits/s)"
+    )
+    return run
+
+
+def record_throughput(
+    redis: Redis, run: EngineRun, selected: bool = True
+) -> None:
+    """Store a run's digits/sec as the latest measurement for its bucket.
+
+    Args:
+        redis: Redis client.
+        run: Measured engine run.
+        selected: Whether the engine was picked by select_engine rather
+                  than requested explicitly.
+    """
+    key = ENGINE_STATS_KEY if selected else EXPLICIT_STATS_KEY
+    try:
+        redis.hset(
+            key.format(bucket=size_bucket(len(run.digits))),
+            run.engine,
+            run.digits_per_second,
+        )
+    except RedisError as e:
+        logger.warning(
+            f"Failed to record engine throughput: {type(e).__name__}: {e}"
+        )
+
+
+def measured_throughputs(
+    redis: Redis, bucket: int, selected: bool = True
+) -> dict[str, float]:
+    """Latest measured digits/sec of every engine in a size bucket.
+
+    Args:
+        redis: Redis client.
+        bucket: Size bucket (see app.digits.size_bucket).
+        selected: Runs of selected engines, or of explicitly requested
+                  ones when False (see record_throughput).
+    """
+    key = ENGINE_STATS_KEY if selected else EXPLICIT_STATS_KEY
+    stats = redis.hgetall(key.format(bucket=bucket))
+    return {name.decode(): float(rate) for name, rate in stats.items()}
+
+
+def engine_throughputs(n_chars: int, redis: Redis) -> dict[str, float]:
+    """Expected digits/sec of every engine accepting a request's size.
+
+    Each engine is rated by its latest run selected in the request's
+    size bucket, else its latest explicitly requested run there, else
+    the throughput modelled by app.cost_model, so that engines never
+    run in a bucket still compete with the measured ones.
+    """
+    # Imported here, as the cost model builds on the registry
+    from app.cost_model import get_cost_model
+
+    costs = get_cost_model()
+    bucket = size_bucket(n_chars)
+    try:
+        explicit = measured_throughputs(redis, bucket, selected=False)
+        selected = measured_throughputs(redis, bucket)
+    except RedisError as e:
+        logger.warning(
+            f"Failed to read engine throughput: {type(e).__name__}: {e}"
+        )
+        explicit = selected = {}
+
+    throughputs = {}
+    for name in available_engines(n_chars - 2):
+        if name in selected:
+            throughputs[name] = selected[name]
+        elif name in explicit:
+            throughputs[name] = explicit[name]
+        elif name in costs:
+            throughputs[name] = n_chars / max(
+                costs[name].seconds(n_chars), 1e-9
+            )
+    return throughputs
+
+
+def select_engine(n_chars: int, redis: Redis) -> PiEngine:
+    """Pick the fastest engine for the request's size bucket, among the
+    engines accepting its size (see engine_throughputs).
+
+    Falls back to settings.DEFAULT_ENGINE when no engine is rated.
+    """
+    throughputs = engine_throughputs(n_chars, redis)
+    name = settings.DEFAULT_ENGINE
+    if throughputs:
+        name = max(throughputs, key=throughputs.__getitem__)
+    return get_engine(name)
@@ -0,0 +1,92 @@
+from collections.abc import Iterator
+
+from app.bigint import mpz
+from app.checkpoints import active_checkpointer
+from app.engines.base import PiEngine
+from app.engines.registry import register_engine
+from app.progress import ProgressCallback
+
+
+# Digits yielded per block (and per progress report)
+BLOCK_DIGITS = 64
+
+
+# Spigot state (q, r, t, i) after the digits yielded so far
+SpigotState = tuple[int, int, int, int]
+
+
+def gibbons_digits(
+    state: SpigotState | None = None,
+) -> Iterator[tuple[int, SpigotState]]:
+    """Unbounded spigot yielding the decimal digits of Pi one by one.
+
+    Gibbons' streaming algorithm on Gosper's series: every iteration
+    absorbs one term and emits one digit, which is final when emitted.
+    Its integers grow linearly, so n digits take O(n^2) time.
+
+    Args:
+        state: State yielded with an earlier digit, to resume after it.
+
+    Yields:
+        (digit, state) pairs.
+    """
+    q, r, t, i = state or (mpz(1), mpz(180), mpz(60), 2)
+    while True:
+        u = 3 * (3 * i + 1) * (3 * i + 2)
+        y = (q * (27 * i - 12) + 5 * r) // (5 * t)
+        q, r, t, i = (
+            10 * q * i * (2 * i - 1),
+            10 * u * (q * (5 * i - 2) + r - y * t),
+            t * u,
+            i + 1,
+        )
+        yield int(y), (q, r, t, i)
+
+
+@register_engine
+class SpigotEngine(PiEngine):
+    name = "spigot"
+    description = (
+        "Gibbons' unbounded spigot: streams final digits while computing "
+        "(quadratic time, suited to small requests)."
+    )
+    streaming = True
+    # Quadratic: about 2.5 minutes at this size, hours at 10^6
+    max_digits = 200_000
+
+    def compute(
+        self, n_chars: int, on_progress: ProgressCallback | None = None
+    ) -> str:
+        return "".join(self.stream(n_chars, on_progress))
+
+    def stream(
+        self, n_chars: int, on_progress: ProgressCallback | None = None
+    ) -> Iterator[str]:
+        # The digits produced so far and the spigot state are checkpointed
+        checkpointer = active_checkpointer()
+        key = ("spigot", n_chars)
+        blocks: list[str] = []
+        state = None
+        if checkpointer is not None:
+            saved = checkpointer.load(key)
+            if saved is not None:
+                resumed, state = saved
+                blocks.append(resumed)
+                yield resumed
+
+        digits = gibbons_digits(state)
+        produced = sum(map(len, blocks))
+        while produced < n_chars:
+            size = min(BLOCK_DIGITS, n_chars - produced)
+            block = ""
+            for _ in range(size):
+                digit, state = next(digits)
+                block += str(digit)
+            if checkpointer is not None:
+                # Saved first, so it covers every block yielded
+                blocks.append(block)
+                checkpointer.maybe_save(key, lambda: ("".join(blocks), state))
+            yield block
+            produced += size
+            if on_progress is not None:
+                on_progress(produced / n_chars)
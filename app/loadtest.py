@@ -0,0 +1,526 @@
+"""Load generator simulating concurrent API clients.
+
+Every client submits /calculate_pi with n drawn from a weighted
+distribution, follows the task to completion by polling /check_progress
+(at a fixed interval, or long polling with ETags) or reading its
+progress stream, and starts over until the run ends:
+
+    python -m app.loadtest --url http://localhost:8000 --clients 50 \\
+        --duration 60 --n 100:5,1000:3,10000:1 --mode poll
+
+With --in-process the API runs inside the load generator on the Redis of
+the settings, so only a worker (``just worker``) is needed besides Redis.
+Queue wait is the time until a worker marks the task STARTED, observed
+on the channels Celery's Redis backend publishes task states on; it is
+reported when that Redis is reachable (--redis-url, implied in process).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Literal
+
+import httpx
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.client import PubSub
+
+from app.celery_app import celery_app
+
+
+# /check_progress states of tasks that stopped without a result; Celery's
+# own REVOKED is accepted too, in case an API reports it unmapped
+STOPPED_STATES = frozenset({"CANCELLED", "REVOKED"})
+
+# Wait of a client before submitting again after a failed submission,
+# doubled per consecutive failure up to RETRY_BACKOFF_MAX (seconds),
+# unless the response says how long to wait in its Retry-After header
+RETRY_BACKOFF = 0.1
+RETRY_BACKOFF_MAX = 10.0
+
+
+@dataclass(frozen=True)
+class LoadTestConfig:
+    """Parameters of a load test run."""
+
+    clients: int = 10
+    duration: float = 60.0
+    n_weights: dict[int, float] = field(default_factory=lambda: {1000: 1.0})
+    algorithm: str | None = None
+    mode: Literal["poll", "long-poll", "stream"] = "poll"
+    poll_interval: float = 0.5
+    long_poll_wait: float = 10.0
+    task_timeout: float = 300.0
+    seed: int | None = None
+
+
+@dataclass
+class TaskSample:
+    """Timeline of one submitted task, in time.monotonic() seconds."""
+
+    task_id: str
+    n: int
+    submitted_at: float
+    finished_at: float | None = None
+    failed: bool = False
+
+
+@dataclass
+class LoadTestRecorder:
+    """Measurements collected by the clients of a run."""
+
+    latencies: dict[str, list[float]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    tasks: list[TaskSample] = field(default_factory=list)
+    started_at: dict[str, float] = field(default_factory=dict)
+    errors: int = 0
+
+    async def request(
+        self,
+        name: str,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Send a request, recording its latency under name."""
+        started = time.monotonic()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append(time.monotonic() - started)
+        if response.is_error:
+            self.errors += 1
+        return response
+
+
+def parse_n_weights(spec: str) -> dict[int, float]:
+    """Parse a distribution of n like "100:5,1000:3,10000" (weight 1).
+
+    Raises:
+        ValueError: If an entry is not a positive n with a positive weight.
+    """
+    weights = {}
+    for entry in spec.split(","):
+        n, _, weight = entry.strip().partition(":")
+        weights[int(n)] = float(weight or 1)
+        if int(n) < 1 or weights[int(n)] <= 0:
+            raise ValueError(f"Invalid distribution entry: {entry!r}")
+    return weights
+
+
+async def _follow_by_polling(
+    client: httpx.AsyncClient,
+    recorder: LoadTestRecorder,
+    task_id: str,
+    config: LoadTestConfig,
+) -> bool:
+    while True:
+        await asyncio.sleep(config.poll_interval)
+        response = await recorder.request(
+            "check_progress",
+            client,
+            "POST",
+            "/check_progress",
+            json={"task_id": task_id},
+        )
+        if response.is_error:
+            return False
+        state = response.json()["state"]
+        if state == "FINISHED" or state in STOPPED_STATES:
+            return state == "FINISHED"
+
+
+async def _follow_by_long_polling(
+    client: httpx.AsyncClient,
+    recorder: LoadTestRecorder,
+    task_id: str,
+    config: LoadTestConfig,
+) -> bool:
+    payload = {
+        "task_id": task_id,
+        "wait_ms": int(config.long_poll_wait * 1000),
+    }
+    headers = {}
+    while True:
+        response = await recorder.request(
+            "check_progress",
+            client,
+            "POST",
+            "/check_progress",
+            json=payload,
+            headers=headers,
+        )
+        if response.is_error:
+            return False
+        headers["If-None-Match"] = response.headers["ETag"]
+        if response.status_code == 200:
+            state = response.json()["state"]
+            if state == "FINISHED" or state in STOPPED_STATES:
+                return state == "FINISHED"
+
+
+async def _follow_by_streaming(
+    client: httpx.AsyncClient,
+    recorder: LoadTestRecorder,
+    task_id: str,
+) -> bool:
+    started = time.monotonic()
+    async with client.stream("GET", f"/progress/{task_id}/stream") as response:
+        # Stream latency is the time to the first byte of the response
+        recorder.latencies["stream"].append(time.monotonic() - started)
+        if response.is_error:
+            recorder.errors += 1
+            return False
+        async for line in response.aiter_lines():
+            if line == "event: finished":
+                return True
+            if line in ("event: error", "event: cancelled"):
+                return False
+    return False
+
+
+def retry_delay(response: httpx.Response, failures: int) -> float:
+    """Seconds to wait before retrying a request that failed.
+
+    Args:
+        response: The failed response; its Retry-After header, in seconds
+                  or as an HTTP date, is honoured (e.g. on 429 or 503).
+        failures: Number of consecutive failures, this one included.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            try:
+                at = parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                pass
+            else:
+                return max(at.timestamp() - time.time(), 0.0)
+    return min(RETRY_BACKOFF * 2 ** (failures - 1), RETRY_BACKOFF_MAX)
+
+
+async def _client(
+    client: httpx.AsyncClient,
+    recorder: LoadTestRecorder,
+    config: LoadTestConfig,
+    rng: random.Random,
+    deadline: float,
+) -> None:
+    sizes, weights = zip(*config.n_weights.items())
+    failures = 0
+    while time.monotonic() < deadline:
+        n = rng.choices(sizes, weights)[0]
+        payload: dict[str, Any] = {"n": n}
+        if config.algorithm is not None:
+            payload["algorithm"] = config.algorithm
+
+        submitted_at = time.monotonic()
+        response = await recorder.request(
+            "calculate_pi", client, "POST", "/calculate_pi", json=payload
+        )
+        if response.is_error:
+            # Throttled or failing submissions are not retried right away
+            failures += 1
+            delay = retry_delay(response, failures)
+            await asyncio.sleep(min(delay, deadline - time.monotonic()))
+            continue
+        failures = 0
+        sample = TaskSample(response.json()["task_id"], n, submitted_at)
+        recorder.tasks.append(sample)
+
+        try:
+            async with asyncio.timeout(config.task_timeout):
+                if config.mode == "stream":
+                    finished = await _follow_by_streaming(
+                        client, recorder, sample.task_id
+                    )
+                elif config.mode == "long-poll":
+                    finished = await _follow_by_long_polling(
+                        client, recorder, sample.task_id, config
+                    )
+                else:
+                    finished = await _follow_by_polling(
+                        client, recorder, sample.task_id, config
+                    )
+        except (TimeoutError, httpx.HTTPError):
+            finished = False
+        if finished:
+            sample.finished_at = time.monotonic()
+        else:
+            sample.failed = True
+
+
+async def _watch_started(pubsub: PubSub, recorder: LoadTestRecorder) -> None:
+    """Record when workers mark tasks STARTED, until cancelled."""
+    async for message in pubsub.listen():
+        if message["type"] != "pmessage":
+            continue
+        meta = celery_app.backend.decode_result(message["data"])
+        if meta.get("status") == "STARTED":
+            recorder.started_at.setdefault(meta["task_id"], time.monotonic())
+
+
+async def run_load_test(
+    client: httpx.AsyncClient,
+    config: LoadTestConfig,
+    redis: AsyncRedis | None = None,
+) -> dict[str, Any]:
+    """Simulate config.clients concurrent clients for config.duration.
+
+    Clients stop submitting at the deadline and finish following their
+    last task (bounded by config.task_timeout).
+
+    Args:
+        client: HTTP client with the API as base URL.
+        config: Run parameters.
+        redis: Redis of the Celery result backend, to measure queue wait.
+
+    Returns:
+        Summary of the run, see summarize.
+    """
+    recorder = LoadTestRecorder()
+    rng = random.Random(config.seed)
+    watcher = pubsub = None
+    if redis is not None:
+        # Subscribed before the first submission, so no start is missed
+        pubsub = redis.pubsub()
+        prefix = celery_app.backend.task_keyprefix.decode()
+        await pubsub.psubscribe(f"{prefix}*")
+        watcher = asyncio.create_task(_watch_started(pubsub, recorder))
+
+    started = time.monotonic()
+    deadline = started + config.duration
+    try:
+        await asyncio.gather(
+            *(
+                _client(
+                    client,
+                    recorder,
+                    config,
+                    random.Random(rng.random()),
+                    deadline,
+                )
+                for _ in range(config.clients)
+            )
+        )
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
+            await pubsub.aclose()
+
+    return summarize(
+        recorder, time.monotonic() - started, queue_wait=redis is not None
+    )
+
+
+def _distribution(samples: list[float], scale: float) -> dict[str, Any]:
+    summary: dict[str, Any] = {"count": len(samples)}
+    if not samples:
+        return summary
+    if len(samples) == 1:
+        cuts = samples * 99
+    else:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    summary.update(
+        {f"p{p}": cuts[p - 1] * scale for p in (50, 95, 99)},
+        max=max(samples) * scale,
+    )
+    return summary
+
+
+def summarize(
+    recorder: LoadTestRecorder, elapsed: float, queue_wait: bool = True
+) -> dict[str, Any]:
+    """Throughput and latency distributions of a run.
+
+    Returns:
+        Dict with "elapsed", "tasks" (submitted, completed, failed and
+        completed per second), "requests" (count and per second),
+        "errors", latency percentiles per endpoint in milliseconds
+        ("latency_ms"), and task completion and queue wait percentiles in
+        seconds.
+    """
+    completed = [t for t in recorder.tasks if t.finished_at is not None]
+    waits = [
+        recorder.started_at[t.task_id] - t.submitted_at
+        for t in recorder.tasks
+        if t.task_id in recorder.started_at
+    ]
+    requests = sum(len(samples) for samples in recorder.latencies.values())
+
+    summary = {
+        "elapsed": elapsed,
+        "tasks": {
+            "submitted": len(recorder.tasks),
+            "completed": len(completed),
+            "failed": sum(t.failed for t in recorder.tasks),
+            "per_second": len(completed) / elapsed,
+        },
+        "requests": {"count": requests, "per_second": requests / elapsed},
+        "errors": recorder.errors,
+        "latency_ms": {
+            name: _distribution(samples, 1000)
+            for name, samples in recorder.latencies.items()
+        },
+        "completion_s": _distribution(
+            [t.finished_at - t.submitted_at for t in completed], 1
+        ),
+    }
+    if queue_wait:
+        # Tasks joining an already started calculation never get a
+        # STARTED state of their own and are left out
+        summary["queue_wait_s"] = _distribution(waits, 1)
+    return summary
+
+
+def format_summary(summary: dict[str, Any]) -> str:
+    """Human-readable table of a run summary."""
+    tasks = summary["tasks"]
+    lines = [
+        f"Elapsed: {summary['elapsed']:.1f}s",
+        f"Tasks: {tasks['submitted']} submitted, {tasks['completed']} "
+        f"completed, {tasks['failed']} failed "
+        f"({tasks['per_second']:.2f} completed/s)",
+        f"Requests: {summary['requests']['count']} "
+        f"({summary['requests']['per_second']:.1f}/s), "
+        f"{summary['errors']} errors",
+        "",
+        f"{'':24}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+    ]
+    rows = [
+        (f"{name} (ms)", distribution)
+        for name, distribution in summary["latency_ms"].items()
+    ]
+    rows.append(("task completion (s)", summary["completion_s"]))
+    if "queue_wait_s" in summary:
+        rows.append(("queue wait (s)", summary["queue_wait_s"]))
+    for label, distribution in rows:
+        values = "".join(
+            f"{distribution[key]:>10.3f}"
+            if key in distribution
+            else f"{'-':>10}"
+            for key in ("p50", "p95", "p99", "max")
+        )
+        lines.append(f"{label:24}{distribution['count']:>8}{values}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.loadtest",
+        description="Simulate concurrent clients against the Pi API.",
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "--url",
+        default="http://localhost:8000",
+        help="Base URL of the API (default: http://localhost:8000)",
+    )
+    target.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Serve the API in this process, on the Redis of the settings",
+    )
+    parser.add_argument(
+        "--redis-url",
+        help="Redis of the result backend, to measure queue wait",
+    )
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument(
+        "--duration", type=float, default=60.0, help="Seconds to submit for"
+    )
+    parser.add_argument(
+        "--n",
+        type=parse_n_weights,
+        default={1000: 1.0},
+        metavar="N:WEIGHT,...",
+        help="Distribution of requested digits (default: 1000)",
+    )
+    parser.add_argument("--algorithm", help="Engine requested by clients")
+    parser.add_argument(
+        "--mode",
+        choices=["poll", "long-poll", "stream"],
+        default="poll",
+        help=(
+            "Follow tasks by polling /check_progress, long polling it or "
+            "by SSE stream"
+        ),
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.5,
+        help="Seconds between /check_progress polls of a client",
+    )
+    parser.add_argument(
+        "--long-poll-wait",
+        type=float,
+        default=10.0,
+        help="Seconds a long poll waits for progress (wait_ms)",
+    )
+    parser.add_argument(
+        "--task-timeout",
+        type=float,
+        default=300.0,
+        help="Seconds after which a task counts as failed",
+    )
+    parser.add_argument("--seed", type=int, help="Seed of the n draws")
+    parser.add_argument(
+        "--json", action="store_true", help="Print the summary as JSON"
+    )
+    return parser.parse_args(argv)
+
+
+async def _main(args: argparse.Namespace) -> dict[str, Any]:
+    config = LoadTestConfig(
+        clients=args.clients,
+        duration=args.duration,
+        n_weights=args.n,
+        algorithm=args.algorithm,
+        mode=args.mode,
+        poll_interval=args.poll_interval,
+        long_poll_wait=args.long_poll_wait,
+        task_timeout=args.task_timeout,
+        seed=args.seed,
+    )
+
+    if args.in_process:
+        from app.main import app
+        from app.redis_client import get_async_redis
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+        redis = get_async_redis()
+    else:
+        transport = None
+        base_url = args.url
+        redis = AsyncRedis.from_url(args.redis_url) if args.redis_url else None
+
+    # Clients share connections, as many as there are clients
+    limits = httpx.Limits(max_connections=args.clients)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, limits=limits, timeout=None
+    ) as client:
+        return await run_load_test(client, config, redis)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    summary = asyncio.run(_main(args))
+    print(
+        json.dumps(summary, indent=2) if args.json else format_summary(summary)
+    )
+    return 0 if summary["tasks"]["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,109 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+import secrets
+from collections.abc import AsyncIterator
+from dataclasses import replace
+from typing import Annotated, Any
+from uuid import uuid4
+
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import (
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.concurrency import run_in_threadpool
 
+from app.cancellation import TaskCancelledError, request_cancellation
 from app.celery_app import celery_app
+from app.cost_model import (
+    CostBudgetExceededError,
+    EtaTracker,
+    admission,
+    estimate_cost,
+    estimate_hex_cost,
+    reveal_seconds,
+)
+from app.engines import (
+    available_engines,
+    get_engine,
+    measured_throughputs,
+    select_engine,
+)
+from app.metrics import (
+    CALCULATION_REQUESTS,
+    RequestMetricsMiddleware,
+    metrics_registry,
+)
+from app.profiling import get_profiling_config, set_profiling_config
+from app.redis_client import get_async_redis, get_redis
+from app.result_reader import (
+    RangeNotSatisfiableError,
+    StoredResult,
+    accepts_gzip,
+    gzip_chunks,
+    iter_result,
+    parse_range,
+)
+from app.routing import route_calculation
 from app.schemas import (
+    BatchProgressRequest,
+    BatchProgressResponse,
     CalculatePiRequest,
     CalculatePiResponse,
+    EngineInfo,
+    HexDigitsRequest,
+    HexDigitsResponse,
+    ProfilingConfig,
     ProgressRequest,
     ProgressResponse,
+    TaskPhasesResponse,
+    TaskProgressError,
+)
+from app.settings import settings
+from app.singleflight import (
+    detach,
+    find_claim,
+    join_inflight,
+    join_or_claim,
+    release,
+)
+from app.storage import published_high_water_mark
+from app.streaming import (
+    StreamEvent,
+    format_sse,
+    progress_events,
+    wait_for_progress,
+)
+from app.task_state import (
+    TaskFailedError,
+    TaskNotFoundError,
+    etag_matches,
+    load_results,
+    progress_etag,
+    read_state,
+    read_states,
+    resolve_progress,
+    retry_after,
+)
+from app.tasks.calculate_pi import (
+    calculate_pi_task,
+    fail_subscribers,
+    mark_cancelled,
+)
+from app.tasks.distributed import (
+    should_distribute,
+    start_distributed_calculation,
 )
-from app.tasks.calculate_pi import calculate_pi_task
+from app.tasks.hex_digits import extract_hex_digits_task
 
 
 tags_metadata = [
@@ -17,6 +111,10 @@ tags_metadata = [
         "name": "Pi Calculation",
         "description": "Calculate Pi asynchronously and check progress.",
     },
+    {
+        "name": "Admin",
+        "description": "Diagnose slow tasks: phase timings and profiling.",
+    },
 ]
 
 app = FastAPI(
@@ -35,6 +133,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 
 @app.get("/", include_in_schema=False)
@@ -42,6 +141,100 @@ def redirect_to_docs():
     return RedirectResponse(url="/docs")
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics() -> Response:
+    """Prometheus metrics of the API process."""
+    return Response(
+        generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST
+    )
+
+
+def _start_calculation(request: CalculatePiRequest) -> tuple[str, bool]:
+    """Attach a request to an in-flight calculation or start a new one.
+
+    Identical in-flight requests share one task; requests for fewer
+    digits than a running task get an alias id finished from its digits.
+
+    Requests are admitted by their estimated cost (see app.cost_model):
+    over budget they are refused, and expensive ones are deferred to the
+    lowest priority of their queue.
+
+    Returns:
+        Task id to check progress with, and whether it was deferred.
+
+    Raises:
+        CostBudgetExceededError: If the request is over budget.
+    """
+    redis = get_redis()
+
+    # The engine is picked once, here, so that the admission, the route
+    # and the worker all see the same one
+    distribute = should_distribute(request.n, request.algorithm)
+    engine = request.algorithm
+    if engine is None:
+        engine = (
+            "chudnovsky"
+            if distribute
+            else select_engine(request.n + 2, redis).name
+        )
+    estimate = estimate_cost(request.n, engine)
+    if published_high_water_mark(redis) >= request.n + 2:
+        # Served from the digit store, there is nothing to compute
+        estimate = replace(estimate, seconds=0.0)
+    decision = admission(estimate)
+    if decision == "reject":
+        raise CostBudgetExceededError(estimate)
+    deferred = decision == "defer"
+
+    # Fast path for bursts of identical requests
+    task_id = join_inflight(redis, request.algorithm, request.n)
+    if task_id is not None:
+        CALCULATION_REQUESTS.labels("joined").inc()
+        logger.info(f"Joining in-flight task {task_id}")
+        return task_id, deferred
+
+    # Stored before claiming, so that a subscribed alias can never be
+    # overwritten after the worker has already finished it
+    task_id = str(uuid4())
+    eta = EtaTracker(estimate, reveal_seconds(request.n, estimate.engine))
+    celery_app.backend.store_result(
+        task_id,
+        {"progress": 0.0, "result": None, "queued": True, **eta.meta()},
+        "PROGRESS",
+    )
+
+    flight = join_or_claim(
+        redis, request.algorithm, request.n, task_id, estimate.seconds
+    )
+    CALCULATION_REQUESTS.labels(flight.outcome).inc()
+    if flight.outcome == "joined":
+        celery_app.backend.forget(task_id)
+        logger.info(f"Joining in-flight task {flight.task_id}")
+        return flight.task_id, deferred
+    if flight.outcome == "subscribed":
+        logger.info(f"Alias {task_id} subscribed to task {flight.task_id}")
+        return task_id, deferred
+
+    try:
+        route = route_calculation(
+            request.n, estimate, request.priority, deferred
+        )
+        if distribute:
+            job_id = start_distributed_calculation(
+                request.n, request.algorithm, task_id, route.priority
+            )
+            return job_id, deferred
+        result = calculate_pi_task.apply_async(
+            (request.n, request.algorithm, engine),
+            task_id=task_id,
+            **route.options(),
+        )
+        return result.id, deferred
+    except Exception:
+        release(redis, request.algorithm, request.n, task_id)
+        raise
+
+
 @app.post(
     "/calculate_pi",
     summary="Start Pi calculation",
@@ -73,11 +266,12 @@ def redirect_to_docs():
         },
     },
 )
-def calculate_pi(request: CalculatePiRequest) -> CalculatePiResponse:
+async def calculate_pi(request: CalculatePiRequest) -> CalculatePiResponse:
     """Start asynchronous Pi calculation.
 
     Args:
-        request: Request with number of decimal digits to calculate.
+        request: Request with number of decimal digits to calculate
+                 and an optional engine name.
 
     Returns:
         Task information with task_id for progress tracking.
@@ -85,13 +279,20 @@ def calculate_pi(request: CalculatePiRequest) -> CalculatePiResponse:
     logger.info(f"Received request to calculate Pi with {request.n} digits")
 
     try:
-        task = calculate_pi_task.delay(request.n)
-        logger.info(f"Task {task.id} started for {request.n} digits")
+        # Celery's producer and the claim scripts are blocking calls
+        task_id, deferred = await run_in_threadpool(
+            _start_calculation, request
+        )
+        outcome = "deferred" if deferred else "started"
+        logger.info(f"Task {task_id} {outcome} for {request.n} digits")
 
         return CalculatePiResponse(
-            task_id=task.id,
-            message=f"Pi calculation started for {request.n} digits",
+            task_id=task_id,
+            message=f"Pi calculation {outcome} for {request.n} digits",
         )
+    except CostBudgetExceededError as e:
+        logger.warning(f"Refusing {request.n} digits: {e}")
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to start task: {type(e).__name__}: {e}")
         raise HTTPException(
@@ -104,7 +305,13 @@ def calculate_pi(request: CalculatePiRequest) -> CalculatePiResponse:
     summary="Check calculation progress",
     description=(
         "Check the progress of a Pi calculation task. "
-        "Returns current state, progress (0.0 to 1.0), and result if finished."
+        "Returns current state, progress (0.0 to 1.0), and result if "
+        "finished. Responses carry an `ETag`: sent back in "
+        "`If-None-Match`, it gets a 304 while the progress is unchanged. "
+        "With `wait_ms`, the request is held until the progress changes "
+        "or the wait expires. Unfinished tasks come with a `Retry-After` "
+        "hint, the seconds after which their progress should have "
+        "advanced."
     ),
     tags=["Pi Calculation"],
     responses={
@@ -133,6 +340,7 @@ def calculate_pi(request: CalculatePiRequest) -> CalculatePiResponse:
                 }
             },
         },
+        304: {"description": "Progress unchanged since If-None-Match"},
         404: {"description": "Task not found"},
         500: {
             "description": "Failed to check taskprogress",
@@ -144,61 +352,854 @@ def calculate_pi(request: CalculatePiRequest) -> CalculatePiResponse:
         },
     },
 )
-def check_progress(request: ProgressRequest) -> ProgressResponse:
+async def check_progress(
+    request: ProgressRequest,
+    response: Response,
+    if_none_match: Annotated[str | None, Header(alias="If-None-Match")] = None,
+) -> ProgressResponse:
     """Check the progress of a Pi calculation task.
 
     Args:
         request: Request with task ID returned from calculate_pi endpoint
-                 to check progress.
+                 to check progress, and how long to wait for a change.
+        response: Response whose ETag and Retry-After headers are set.
+        if_none_match: ETags of progress the client already has.
 
     Returns:
-        Current state, progress, and result (if finished).
+        Current state, progress, and result (if finished), or an empty
+        304 response if the progress matches if_none_match.
     """
     logger.info(f"Checking progress for task {request.task_id}")
 
     try:
-        task_result = celery_app.AsyncResult(request.task_id)
+        redis = get_async_redis()
+        if request.wait_ms:
+            state, info = await wait_for_progress(
+                request.task_id,
+                redis,
+                min(request.wait_ms / 1000, settings.POLL_MAX_WAIT),
+                if_none_match,
+            )
+        else:
+            state, info = await read_state(redis, request.task_id)
+        progress = resolve_progress(state, info)
+
+        headers = {"ETag": progress_etag(request.task_id, progress)}
+        seconds = retry_after(progress)
+        if seconds is not None:
+            headers["Retry-After"] = str(seconds)
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
 
-        # Check if task exists by examining the backend metadata
-        # PENDING with no info means task was never created
-        if task_result.state == "PENDING" and task_result.info is None:
-            logger.warning(f"Task {request.task_id} not found")
-            raise HTTPException(status_code=404, detail="Task not found")
+        # Packed results are only decoded once the digits are returned
+        await load_results(redis, [(progress, info)])
+        response.headers.update(headers)
+        return progress
 
+    except TaskNotFoundError:
+        logger.warning(f"Task {request.task_id} not found")
+        raise HTTPException(status_code=404, detail="Task not found")
+    except TaskFailedError as e:
         # Task failed during execution
-        if task_result.state == "FAILURE":
-            error_info = (
-                str(task_result.info) if task_result.info else "Unknown error"
-            )
-            logger.error(f"Task {request.task_id} failed: {error_info}")
-            raise HTTPException(
-                status_code=500, detail="Task execution failed"
-            )
+        logger.error(f"Task {request.task_id} failed: {e}")
+        raise HTTPException(status_code=500, detail="Task execution failed")
+    except Exception as e:
+        logger.error(
+            f"Failed to check progress for task {request.task_id}: "
+            f"{type(e).__name__}: {e}"
+        )
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to check task progress",
+        )
 
-        if task_result.state == "SUCCESS":
-            result_data = task_result.result
-            return ProgressResponse(
-                state="FINISHED",
-                progress=1.0,
-                result=result_data.get("result"),
-            )
 
-        # Task in progress (STARTED, PROGRESS, or any other state)
-        info = task_result.info or {}
-        return ProgressResponse(
-            state="PROGRESS",
-            progress=info.get("progress", 0.0),
-            result=None,
+@app.post(
+    "/check_progress/batch",
+    summary="Check progress of many calculations",
+    description=(
+        "Check the progress of up to 1000 Pi calculation tasks at once, "
+        "read from the result backend in a single round trip. Unknown "
+        "and failed tasks get an error entry instead of failing the "
+        "whole request."
+    ),
+    tags=["Pi Calculation"],
+    responses={
+        200: {
+            "description": "Task statuses retrieved successfully",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "tasks": {
+                            "a1b2c3d4-e5f6-7890-abcd-ef1234567890": {
+                                "state": "PROGRESS",
+                                "progress": 0.25,
+                                "result": None,
+                            },
+                            "non-existent-id": {
+                                "error": "NOT_FOUND",
+                                "detail": "Task not found",
+                            },
+                        }
+                    }
+                }
+            },
+        },
+        422: {"description": "Invalid parameters"},
+        500: {
+            "description": "Failed to check task progress",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Failed to check task progress"}
+                }
+            },
+        },
+    },
+)
+async def check_progress_batch(
+    request: BatchProgressRequest,
+) -> BatchProgressResponse:
+    """Check the progress of many Pi calculation tasks at once.
+
+    Args:
+        request: Request with the task IDs to check.
+
+    Returns:
+        Progress or error entry of every task, by task ID.
+    """
+    task_ids = list(dict.fromkeys(request.task_ids))
+    logger.info(f"Checking progress for {len(task_ids)} tasks")
+
+    redis = get_async_redis()
+    try:
+        states = await read_states(redis, task_ids)
+    except Exception as e:
+        logger.error(
+            f"Failed to check progress for {len(task_ids)} tasks: "
+            f"{type(e).__name__}: {e}"
+        )
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to check task progress",
         )
 
-    except HTTPException:
-        raise  # Re-raise HTTP exceptions (like 404)
+    tasks: dict[str, ProgressResponse | TaskProgressError] = {}
+    resolved: list[tuple[ProgressResponse, Any]] = []
+    for task_id, (state, info) in states.items():
+        try:
+            tasks[task_id] = resolve_progress(state, info)
+            resolved.append((tasks[task_id], info))
+        except TaskNotFoundError:
+            tasks[task_id] = TaskProgressError(
+                error="NOT_FOUND", detail="Task not found"
+            )
+        except TaskFailedError:
+            tasks[task_id] = TaskProgressError(
+                error="FAILURE", detail="Task execution failed"
+            )
+
+    try:
+        await load_results(redis, resolved)
     except Exception as e:
         logger.error(
-            f"Failed to check progress for task {request.task_id}: "
+            f"Failed to load results of {len(resolved)} tasks: "
             f"{type(e).__name__}: {e}"
         )
         raise HTTPException(
             status_code=500,
             detail="Failed to check task progress",
         )
+    return BatchProgressResponse(tasks=tasks)
+
+
+@app.get(
+    "/progress/{task_id}/stream",
+    summary="Stream calculation progress",
+    description=(
+        "Streams the progress of a Pi calculation task as Server-Sent "
+        "Events, pushed as the worker publishes them, until the task "
+        "finishes (`finished` event), is cancelled (`cancelled` event) or "
+        "fails (`error` event). With "
+        "`digits=true`, events also carry the newly revealed digits. "
+        "The same path accepts WebSocket connections, sending each event "
+        'as a JSON message with an `"event"` field.'
+    ),
+    tags=["Pi Calculation"],
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Progress event stream",
+            "content": {
+                "text/event-stream": {
+                    "example": (
+                        "event: progress\n"
+                        'data: {"state": "PROGRESS", "progress": 0.25, '
+                        '"result": null}\n\n'
+                    )
+                }
+            },
+        },
+        404: {"description": "Task not found"},
+        500: {
+            "description": "Failed to stream task progress",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Failed to stream task progress"}
+                }
+            },
+        },
+    },
+)
+async def stream_progress(
+    task_id: str, digits: bool = False
+) -> StreamingResponse:
+    """Stream the progress of a Pi calculation task as Server-Sent Events.
+
+    Args:
+        task_id: Task ID returned from calculate_pi endpoint.
+        digits: Include the newly revealed digits in every event.
+
+    Returns:
+        Event stream closed once the task finished, was cancelled or
+        failed.
+    """
+    logger.info(f"Streaming progress for task {task_id}")
+
+    events = progress_events(task_id, get_async_redis(), with_digits=digits)
+    try:
+        # Pull the current state now, so unknown tasks get a 404
+        first_event = await anext(events)
+    except TaskNotFoundError:
+        logger.warning(f"Task {task_id} not found")
+        raise HTTPException(status_code=404, detail="Task not found")
+    except Exception as e:
+        logger.error(
+            f"Failed to stream progress for task {task_id}: "
+            f"{type(e).__name__}: {e}"
+        )
+        raise HTTPException(
+            status_code=500, detail="Failed to stream task progress"
+        )
+
+    async def encode(first: StreamEvent) -> AsyncIterator[str]:
+        try:
+            yield format_sse(*first)
+            async for event in events:
+                yield format_sse(*event)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        encode(first_event),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/progress/{task_id}/stream")
+async def stream_progress_ws(
+    websocket: WebSocket, task_id: str, digits: bool = False
+) -> None:
+    """Stream the progress of a Pi calculation task over a WebSocket.
+
+    Sends the same events as the SSE stream as JSON messages, then
+    closes the connection. Unknown tasks are closed with code 4404.
+    """
+    await websocket.accept()
+
+    events = progress_events(task_id, get_async_redis(), with_digits=digits)
+    try:
+        async for event, data in events:
+            await websocket.send_json({"event": event, **data})
+    except TaskNotFoundError:
+        logger.warning(f"Task {task_id} not found")
+        await websocket.close(code=4404, reason="Task not found")
+        return
+    except WebSocketDisconnect:
+        logger.info(f"Progress stream of task {task_id} disconnected")
+        return
+    finally:
+        await events.aclose()
+
+    await websocket.close()
+
+
+def _never_started(task_id: str) -> bool:
+    """Whether a task still has the state stored when it was submitted.
+
+    Workers replace it as soon as they start the task (STARTED), or a
+    part of its distributed job (PROGRESS).
+    """
+    meta = celery_app.backend.get_task_meta(task_id)
+    info = meta["result"]
+    return isinstance(info, dict) and info.get("queued", False)
+
+
+def _cancel_task(task_id: str) -> None:
+    """Cancel a queued or running task (see app.cancellation).
+
+    Only the caller's reference to a deduplicated calculation is dropped
+    (see app.singleflight.detach): a cancelled alias stops waiting for
+    it, and the calculation itself is only cancelled once no other
+    client holds it. A task that never started is revoked, so its
+    single-flight claim is released and the aliases waiting for it are
+    failed here. A running task does the same once it stops, and deletes
+    its checkpoint and scratch files, which are on the workers' volume.
+    """
+    redis = get_redis()
+    computation, held = detach(redis, task_id)
+    if computation != task_id:
+        request_cancellation(redis, task_id)
+        mark_cancelled(task_id)
+    if held:
+        logger.info(f"Task {computation} kept running for other clients")
+        return
+
+    queued = _never_started(computation)
+    request_cancellation(redis, computation)
+    mark_cancelled(computation)
+    if not queued:
+        return
+
+    celery_app.control.revoke(computation)
+    claim = find_claim(redis, computation, [None, *available_engines()])
+    if claim is not None:
+        algorithm, n = claim
+        fail_subscribers(
+            computation,
+            algorithm,
+            TaskCancelledError(f"Task {computation} cancelled"),
+        )
+        release(redis, algorithm, n, computation)
+
+
+@app.delete(
+    "/tasks/{task_id}",
+    summary="Cancel a calculation",
+    description=(
+        "Cancels a queued or running task. Queued tasks are revoked, and "
+        "running ones stop at their next progress report, freeing their "
+        "worker. A calculation shared by deduplicated requests keeps "
+        "running until every client attached to it has cancelled; "
+        "cancelling the same id again is a no-op. A result still being "
+        "revealed stops its reveal. /check_progress then reports the "
+        "`CANCELLED` state."
+    ),
+    tags=["Pi Calculation"],
+    responses={
+        200: {
+            "description": "Task cancelled",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "state": "CANCELLED",
+                        "progress": 0.0,
+                        "result": None,
+                    }
+                }
+            },
+        },
+        404: {"description": "Task not found"},
+        409: {"description": "Task already finished"},
+        500: {
+            "description": "Failed to cancel task",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Failed to cancel task"}
+                }
+            },
+        },
+    },
+)
+async def cancel_task(task_id: str) -> ProgressResponse:
+    """Cancel a Pi calculation task.
+
+    Args:
+        task_id: Task ID returned from calculate_pi endpoint.
+
+    Returns:
+        The cancelled task's progress.
+    """
+    try:
+        state, info = await read_state(get_async_redis(), task_id)
+        found = not (state == "PENDING" and info is None)
+        # A result still revealed virtually is in progress for
+        # /check_progress, and is cancelled like a running task
+        finished = state == "FAILURE" or (
+            state == "SUCCESS"
+            and resolve_progress(state, info).state == "FINISHED"
+        )
+        if found and not finished and state != "REVOKED":
+            # Celery's control broadcast and the backend are blocking
+            await run_in_threadpool(_cancel_task, task_id)
+            logger.info(f"Task {task_id} cancelled")
+    except Exception as e:
+        logger.error(
+            f"Failed to cancel task {task_id}: {type(e).__name__}: {e}"
+        )
+        raise HTTPException(status_code=500, detail="Failed to cancel task")
+
+    if not found:
+        logger.warning(f"Task {task_id} not found")
+        raise HTTPException(status_code=404, detail="Task not found")
+    if finished:
+        raise HTTPException(status_code=409, detail="Task already finished")
+    return resolve_progress("REVOKED", None)
+
+
+@app.get(
+    "/result/{task_id}",
+    summary="Download calculated digits",
+    description=(
+        "Streams the Pi value of a finished task as text/plain. A part of "
+        "it can be selected with the `offset` and `length` query "
+        'parameters (characters of the formatted value, "3." '
+        "included) or an HTTP `Range` header, served as 206 Partial "
+        "Content. Full responses are gzip-compressed when accepted."
+    ),
+    tags=["Pi Calculation"],
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Calculated digits",
+            "content": {"text/plain": {"example": "3.14159265358979323846"}},
+        },
+        206: {"description": "Requested range of the calculated digits"},
+        404: {"description": "Task not found"},
+        409: {"description": "Task not finished yet"},
+        416: {"description": "Requested range not satisfiable"},
+        500: {
+            "description": "Failed to read task result",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Failed to read task result"}
+                }
+            },
+        },
+    },
+)
+async def get_result(
+    task_id: str,
+    offset: Annotated[
+        int, Query(ge=0, description="Index of the first character")
+    ] = 0,
+    length: Annotated[
+        int | None, Query(ge=1, description="Number of characters")
+    ] = None,
+    range_header: Annotated[str | None, Header(alias="Range")] = None,
+    accept_encoding: Annotated[
+        str | None, Header(alias="Accept-Encoding")
+    ] = None,
+) -> StreamingResponse:
+    """Stream (part of) the calculated Pi value of a finished task.
+
+    Args:
+        task_id: Task ID returned from calculate_pi endpoint.
+        offset: Index of the first character to return.
+        length: Number of characters to return; all remaining by default.
+        range_header: HTTP Range within the selected characters.
+        accept_encoding: Encodings accepted by the client.
+
+    Returns:
+        The selected characters, streamed in chunks.
+    """
+    logger.info(f"Reading result of task {task_id}")
+
+    redis = get_async_redis()
+    try:
+        state, info = await read_state(redis, task_id)
+        progress = resolve_progress(state, info)
+    except TaskNotFoundError:
+        logger.warning(f"Task {task_id} not found")
+        raise HTTPException(status_code=404, detail="Task not found")
+    except TaskFailedError as e:
+        logger.error(f"Task {task_id} failed: {e}")
+        raise HTTPException(status_code=500, detail="Task execution failed")
+    except Exception as e:
+        logger.error(
+            f"Failed to read result of task {task_id}: {type(e).__name__}: {e}"
+        )
+        raise HTTPException(
+            status_code=500, detail="Failed to read task result"
+        )
+
+    if progress.state != "FINISHED":
+        raise HTTPException(status_code=409, detail="Task not finished")
+
+    result = StoredResult.from_info(info)
+    if offset > result.length:
+        raise HTTPException(
+            status_code=416, detail="Requested range not satisfiable"
+        )
+    start = offset
+    end = (
+        result.length
+        if length is None
+        else min(offset + length, result.length)
+    )
+
+    status_code = 200
+    headers = {"Accept-Ranges": "bytes", "Vary": "Accept-Encoding"}
+    if range_header is not None:
+        window = end - start
+        try:
+            selected = parse_range(range_header, window)
+        except RangeNotSatisfiableError:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{window}"},
+            )
+        if selected is not None:
+            status_code = 206
+            headers["Content-Range"] = (
+                f"bytes {selected[0]}-{selected[1] - 1}/{window}"
+            )
+            start, end = start + selected[0], start + selected[1]
+
+    body = iter_result(redis, result, start, end, settings.RESULT_CHUNK_CHARS)
+    # Ranges address the identity encoding, so only full bodies are gzipped
+    if status_code == 200 and accepts_gzip(accept_encoding):
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    else:
+        headers["Content-Length"] = str(end - start)
+
+    return StreamingResponse(
+        body,
+        status_code=status_code,
+        media_type="text/plain",
+        headers=headers,
+    )
+
+
+def _start_hex_extraction(request: HexDigitsRequest) -> tuple[str, bool]:
+    """Admit, route and publish a hex digit extraction.
+
+    Returns:
+        Task id to check progress with, and whether it was deferred.
+
+    Raises:
+        CostBudgetExceededError: If the request is over budget.
+    """
+    estimate = estimate_hex_cost(request.positions)
+    decision = admission(estimate)
+    if decision == "reject":
+        raise CostBudgetExceededError(estimate)
+    deferred = decision == "defer"
+
+    task_id = str(uuid4())
+    # Queued tasks would otherwise look unknown to /check_progress
+    celery_app.backend.store_result(
+        task_id, {"progress": 0.0, "result": None, "queued": True}, "PROGRESS"
+    )
+    route = route_calculation(
+        max(request.positions), estimate, deferred=deferred
+    )
+    result = extract_hex_digits_task.apply_async(
+        (request.positions, request.count), task_id=task_id, **route.options()
+    )
+    return result.id, deferred
+
+
+@app.post(
+    "/hex_digits",
+    summary="Start hex digit extraction",
+    description=(
+        "Starts extracting hexadecimal digits of Pi at arbitrary "
+        "positions with the Bailey-Borwein-Plouffe formula, without "
+        "computing the digits before them. Track the task with "
+        "/check_progress and fetch the digits from /hex_digits/{task_id}."
+    ),
+    tags=["Pi Calculation"],
+    responses={
+        200: {"description": "Task started successfully"},
+        422: {"description": "Invalid parameters"},
+        500: {
+            "description": "Extraction request failed",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Failed to start extraction"}
+                }
+            },
+        },
+    },
+)
+async def extract_hex_digits(request: HexDigitsRequest) -> CalculatePiResponse:
+    """Start asynchronous extraction of hex digits of Pi.
+
+    Args:
+        request: Request with the digit positions and digits per position.
+
+    Returns:
+        Task information with task_id for progress tracking.
+    """
+    logger.info(
+        f"Received request to extract hex digits at "
+        f"{len(request.positions)} positions"
+    )
+
+    try:
+        task_id, deferred = await run_in_threadpool(
+            _start_hex_extraction, request
+        )
+        outcome = "deferred" if deferred else "started"
+        return CalculatePiResponse(
+            task_id=task_id,
+            message=(
+                f"Hex digit extraction {outcome} for "
+                f"{len(request.positions)} positions"
+            ),
+        )
+    except CostBudgetExceededError as e:
+        logger.warning(
+            f"Refusing hex digits at {len(request.positions)} positions: {e}"
+        )
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to start task: {type(e).__name__}: {e}")
+        raise HTTPException(
+            status_code=500, detail="Failed to start extraction"
+        )
+
+
+@app.get(
+    "/hex_digits/{task_id}",
+    summary="Get extracted hex digits",
+    description="Returns the hex digits of a finished extraction task.",
+    tags=["Pi Calculation"],
+    responses={
+        200: {"description": "Digits retrieved successfully"},
+        404: {"description": "Task not found"},
+        409: {"description": "Task not finished yet"},
+        500: {
+            "description": "Failed to read task result",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Failed to read task result"}
+                }
+            },
+        },
+    },
+)
+async def get_hex_digits(task_id: str) -> HexDigitsResponse:
+    """Return the hex digits extracted by a finished task.
+
+    Args:
+        task_id: Task ID returned from the hex_digits endpoint.
+
+    Returns:
+        Hex digits by position.
+    """
+    try:
+        state, info = await read_state(get_async_redis(), task_id)
+        progress = resolve_progress(state, info)
+    except TaskNotFoundError:
+        logger.warning(f"Task {task_id} not found")
+        raise HTTPException(status_code=404, detail="Task not found")
+    except TaskFailedError as e:
+        logger.error(f"Task {task_id} failed: {e}")
+        raise HTTPException(status_code=500, detail="Task execution failed")
+    except Exception as e:
+        logger.error(
+            f"Failed to read result of task {task_id}: {type(e).__name__}: {e}"
+        )
+        raise HTTPException(
+            status_code=500, detail="Failed to read task result"
+        )
+
+    if progress.state != "FINISHED":
+        raise HTTPException(status_code=409, detail="Task not finished")
+    if "hex_digits" not in info:
+        raise HTTPException(
+            status_code=404, detail="Task is not a hex digit extraction"
+        )
+    return HexDigitsResponse(digits=info["hex_digits"])
+
+
+@app.get(
+    "/engines",
+    summary="List Pi engines",
+    description=(
+        "Lists the available Pi engines with their latest measured "
+        "throughput (digits/sec) per request size bucket."
+    ),
+    tags=["Pi Calculation"],
+    responses={
+        200: {"description": "Engines listed successfully"},
+        500: {
+            "description": "Failed to list engines",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Failed to list engines"}
+                }
+            },
+        },
+    },
+)
+def list_engines() -> list[EngineInfo]:
+    """List available Pi engines and their measured throughput.
+
+    Returns:
+        Engine names, descriptions and digits/sec per size bucket.
+    """
+    try:
+        redis = get_redis()
+        throughputs: dict[str, dict[int, float]] = {
+            name: {} for name in available_engines()
+        }
+        # Buckets cover request sizes up to 10^15 digits; runs of
+        # selected engines take precedence over requested ones
+        for bucket in range(1, 16):
+            for selected in (False, True):
+                measured = measured_throughputs(redis, bucket, selected)
+                for name, rate in measured.items():
+                    if name in throughputs:
+                        throughputs[name][bucket] = rate
+
+        return [
+            EngineInfo(
+                name=name,
+                description=get_engine(name).description,
+                digits_per_second=rates,
+            )
+            for name, rates in throughputs.items()
+        ]
+    except Exception as e:
+        logger.error(f"Failed to list engines: {type(e).__name__}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to list engines")
+
+
+def require_admin(
+    x_admin_token: Annotated[str | None, Header()] = None,
+) -> None:
+    """Check the admin token; admin endpoints are disabled (404) while
+    settings.ADMIN_TOKEN is unset or empty."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(
+        (x_admin_token or "").encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get(
+    "/admin/tasks/{task_id}/phases",
+    summary="Get task phase timings",
+    description=(
+        "Returns the wall-clock time spent in each phase of a finished "
+        "calculation task, and its saved profile if it was profiled."
+    ),
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+    responses={
+        200: {"description": "Phase timings retrieved successfully"},
+        403: {"description": "Invalid admin token"},
+        404: {
+            "description": (
+                "Task not found or without phase timings, or admin "
+                "endpoints disabled"
+            )
+        },
+        409: {"description": "Task not finished yet"},
+        500: {
+            "description": "Failed to read task result",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Failed to read task result"}
+                }
+            },
+        },
+    },
+)
+async def get_task_phases(task_id: str) -> TaskPhasesResponse:
+    """Return the phase timings recorded by a finished calculation.
+
+    Args:
+        task_id: Task ID returned from /calculate_pi.
+
+    Returns:
+        Seconds per phase and the saved profile, if any.
+    """
+    try:
+        state, info = await read_state(get_async_redis(), task_id)
+    except Exception as e:
+        logger.error(
+            f"Failed to read result of task {task_id}: {type(e).__name__}: {e}"
+        )
+        raise HTTPException(
+            status_code=500, detail="Failed to read task result"
+        )
+
+    if state == "PENDING" and info is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if state == "FAILURE":
+        raise HTTPException(status_code=500, detail="Task execution failed")
+    if state != "SUCCESS":
+        raise HTTPException(status_code=409, detail="Task not finished")
+    if not isinstance(info, dict) or "phases" not in info:
+        raise HTTPException(
+            status_code=404, detail="Task has no phase timings"
+        )
+    return TaskPhasesResponse(
+        task_id=task_id, phases=info["phases"], profile=info.get("profile")
+    )
+
+
+@app.get(
+    "/admin/profiling",
+    summary="Get profiling configuration",
+    description="Returns the profiling configuration of the workers.",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+    responses={
+        403: {"description": "Invalid admin token"},
+        404: {"description": "Admin endpoints disabled"},
+    },
+)
+def get_profiling() -> ProfilingConfig:
+    """Return the current profiling configuration."""
+    return get_profiling_config(get_redis())
+
+
+@app.put(
+    "/admin/profiling",
+    summary="Configure task profiling",
+    description=(
+        "Switches profiling of calculation tasks on or off without "
+        "redeploying; tasks started afterwards use the new configuration. "
+        "Profiles are saved on the workers, under PROFILE_DIR."
+    ),
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+    responses={
+        403: {"description": "Invalid admin token"},
+        422: {"description": "Invalid configuration"},
+        500: {
+            "description": "Failed to store the configuration",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Failed to configure profiling"}
+                }
+            },
+        },
+    },
+)
+def configure_profiling(config: ProfilingConfig) -> ProfilingConfig:
+    """Override the profiling configuration of all workers.
+
+    Args:
+        config: Profiler mode and the thresholds for saving profiles.
+
+    Returns:
+        The stored configuration.
+    """
+    try:
+        set_profiling_config(get_redis(), config)
+    except Exception as e:
+        logger.error(f"Failed to configure profiling: {type(e).__name__}: {e}")
+        raise HTTPException(
+            status_code=500, detail="Failed to configure profiling"
+        )
+    logger.info(f"Profiling configured: {config.model_dump()}")
+    return config
@@ -0,0 +1,249 @@
+"""Prometheus metrics of the API and the worker.
+
+The API serves its metrics on /metrics; workers export theirs on
+settings.WORKER_METRICS_PORT from an HTTP server started by Celery's
+worker_init signal. Worker pool processes each hold their own metrics,
+so prefork workers must run with PROMETHEUS_MULTIPROC_DIR set for the
+exporter to aggregate them (prometheus_client's multiprocess mode); the
+directory must be emptied before the worker starts.
+
+Task phases are labelled by the order-of-magnitude size bucket of the
+request (see app.digits.size_bucket):
+
+- queue_wait: from publishing a calculation to a worker starting it;
+- compute: an engine run, including its conversion to decimal;
+- conversion: converting an engine's big integer to decimal digits;
+- reveal: the reveal schedule played out by the worker or the API.
+"""
+
+import json
+import os
+import time
+from typing import Any
+
+from celery import Task
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+)
+from loguru import logger
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.digits import size_bucket
+from app.settings import settings
+
+
+# Task message header holding the time the task was published
+PUBLISHED_AT_HEADER = "published_at"
+
+REQUEST_SECONDS = Histogram(
+    "pi_http_request_duration_seconds",
+    "Time from receiving a request to starting its response.",
+    ["method", "endpoint", "status"],
+)
+TASK_PHASE_SECONDS = Histogram(
+    "pi_task_phase_seconds",
+    "Duration of a phase of a calculation, by request size bucket.",
+    ["phase", "bucket"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+TASK_SECONDS = Histogram(
+    "pi_task_duration_seconds",
+    "Run time of worker tasks.",
+    ["task", "state"],
+    buckets=(0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+TASKS_IN_FLIGHT = Gauge(
+    "pi_tasks_in_flight",
+    "Tasks currently running on workers.",
+    ["task"],
+    multiprocess_mode="livesum",
+)
+BACKEND_BYTES = Counter(
+    "pi_backend_bytes_written",
+    "Bytes written to the result backend, by kind of write.",
+    ["kind"],
+)
+PROGRESS_REPORTS = Counter(
+    "pi_progress_reports",
+    "Progress reports of running tasks, written or coalesced.",
+)
+PROGRESS_WRITES = Counter(
+    "pi_progress_writes",
+    "Progress states written to the result backend.",
+)
+DIGIT_STORE_LOOKUPS = Counter(
+    "pi_digit_store_lookups",
+    "Digit store lookups of calculations, by result (hit or miss).",
+    ["result"],
+)
+CALCULATION_REQUESTS = Counter(
+    "pi_calculation_requests",
+    "Calculation requests, by single-flight outcome (claimed, joined or "
+    "subscribed).",
+    ["outcome"],
+)
+
+_task_started: dict[str, float] = {}
+
+
+def observe_phase(phase: str, n_chars: int, seconds: float) -> None:
+    """Record the duration of a calculation phase.
+
+    Args:
+        phase: "queue_wait", "compute", "conversion" or "reveal".
+        n_chars: Size of the calculation in digits.
+        seconds: Duration of the phase.
+    """
+    TASK_PHASE_SECONDS.labels(phase, str(size_bucket(n_chars))).observe(
+        seconds
+    )
+
+
+def observe_queue_wait(task: Task, n_chars: int) -> None:
+    """Record how long a running task waited in the queue.
+
+    Tasks published without PUBLISHED_AT_HEADER (e.g. run eagerly) are
+    not recorded.
+    """
+    published_at = (task.request.headers or {}).get(PUBLISHED_AT_HEADER)
+    if published_at is not None:
+        observe_phase(
+            "queue_wait", n_chars, max(time.time() - published_at, 0.0)
+        )
+
+
+def _json_size(value: Any) -> int:
+    """Length of json.dumps(value, default=str), from the lengths of its
+    parts: exact for ASCII strings without characters to escape, which
+    task meta is made of, without encoding the digits again."""
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return sum(
+            _json_size(str(k)) + 2 + _json_size(v) for k, v in value.items()
+        ) + 2 * max(len(value), 1)
+    if isinstance(value, list | tuple):
+        return sum(_json_size(v) for v in value) + 2 * max(len(value), 1)
+    if value is None or isinstance(value, bool | int | float):
+        return len(json.dumps(value))
+    return len(str(value)) + 2
+
+
+def record_backend_write(kind: str, value: Any) -> None:
+    """Count the bytes of a value written to the result backend.
+
+    Args:
+        kind: Kind of write: "progress", "result" or "packed_result".
+        value: Bytes written, or a value serialized as JSON, whose
+               size is derived from the lengths of its parts.
+    """
+    size = len(value) if isinstance(value, bytes) else _json_size(value)
+    BACKEND_BYTES.labels(kind).inc(size)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry to expose: aggregated across processes in multiprocess
+    mode, the process's own otherwise."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware observing the latency of HTTP requests.
+
+    Requests are labelled by their route's path template, so that task
+    ids in paths do not create a series per task. Latency is measured up
+    to the start of the response, as progress streams stay open.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int) -> None:
+            nonlocal observed
+            observed = True
+            route = scope.get("route")
+            endpoint = route.path if route is not None else "unmatched"
+            REQUEST_SECONDS.labels(
+                scope["method"], endpoint, str(status)
+            ).observe(time.perf_counter() - started)
+
+        async def send_observed(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_observed)
+        finally:
+            if not observed:
+                observe(500)
+
+
+@before_task_publish.connect
+def _stamp_published_at(headers: dict, **_: Any) -> None:
+    headers[PUBLISHED_AT_HEADER] = time.time()
+
+
+@task_prerun.connect
+def _task_started_signal(task_id: str, task: Task, **_: Any) -> None:
+    TASKS_IN_FLIGHT.labels(task.name).inc()
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _task_finished_signal(
+    task_id: str, task: Task, retval: Any, state: str | None, **_: Any
+) -> None:
+    TASKS_IN_FLIGHT.labels(task.name).dec()
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_SECONDS.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
+    if state == "SUCCESS":
+        record_backend_write("result", retval)
+
+
+@worker_init.connect
+def _start_worker_exporter(**_: Any) -> None:
+    if not settings.WORKER_METRICS_PORT:
+        return
+    start_http_server(
+        settings.WORKER_METRICS_PORT, registry=metrics_registry()
+    )
+    logger.info(
+        f"Exporting worker metrics on port {settings.WORKER_METRICS_PORT}"
+    )
+
+
+@worker_process_shutdown.connect
+def _mark_process_dead(pid: int | None = None, **_: Any) -> None:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,59 @@
+"""Named phase timers of running tasks.
+
+A task activates a PhaseTimer for its duration; code anywhere below it
+(engines, storage, the reveal loop) times its work with phase(name),
+which is a no-op outside of an active timer. Phases may nest, e.g. the
+"conversion" of an engine's result is part of its "compute" phase.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+_current: ContextVar["PhaseTimer | None"] = ContextVar(
+    "phase_timer", default=None
+)
+
+
+class PhaseTimer:
+    """Accumulated wall-clock seconds of the named phases of one task."""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+
+    @contextmanager
+    def activate(self) -> Iterator["PhaseTimer"]:
+        """Record the phases timed in this context into this timer."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def to_meta(self) -> dict[str, float]:
+        """Seconds per phase, in the order the phases first ran."""
+        return {name: round(s, 6) for name, s in self.seconds.items()}
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a phase of the running task, if it has an active PhaseTimer.
+
+    Args:
+        name: Phase name; repeated phases accumulate.
+    """
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    timer.seconds.setdefault(name, 0.0)  # Ordered by first start
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
@@ -0,0 +1,189 @@
+"""Opt-in profiling of calculation tasks.
+
+Profiling is configured by settings.PROFILE_MODE and can be switched at
+runtime, without redeploying, through /admin/profiling: the API stores
+the configuration in Redis and workers read it when a task starts.
+
+While enabled, every calculation runs under the profiler, as its
+duration is only known once it finished; the profile is saved to
+settings.PROFILE_DIR only for tasks over the size or duration threshold:
+
+- cprofile: "<task_id>.prof", readable with pstats or snakeviz;
+- tracemalloc: "<task_id>.tracemalloc", a snapshot of the allocations
+  still alive when the task finished (tracemalloc.Snapshot.load), along
+  with the peak traced memory of the task.
+"""
+
+import cProfile
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from loguru import logger
+from pydantic import ValidationError
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.schemas import ProfilingConfig
+from app.settings import settings
+
+
+PROFILING_KEY = "pi:admin:profiling"
+
+# Frames stored per traced allocation
+TRACEMALLOC_FRAMES = 25
+
+
+def default_profiling_config() -> ProfilingConfig:
+    """Profiling configuration from settings."""
+    return ProfilingConfig(
+        mode=settings.PROFILE_MODE,
+        min_digits=settings.PROFILE_MIN_DIGITS,
+        min_seconds=settings.PROFILE_MIN_SECONDS,
+    )
+
+
+def get_profiling_config(redis: Redis) -> ProfilingConfig:
+    """Current profiling configuration, the settings' unless overridden."""
+    try:
+        payload = redis.get(PROFILING_KEY)
+        if payload is not None:
+            return ProfilingConfig.model_validate_json(payload)
+    except (RedisError, ValidationError) as e:
+        logger.warning(
+            f"Failed to read profiling configuration: {type(e).__name__}: {e}"
+        )
+    return default_profiling_config()
+
+
+def set_profiling_config(redis: Redis, config: ProfilingConfig) -> None:
+    """Override the profiling configuration of all workers."""
+    redis.set(PROFILING_KEY, config.model_dump_json())
+
+
+@contextmanager
+def profiled(
+    task_id: str, n_digits: int, config: ProfilingConfig
+) -> Iterator[dict]:
+    """Profile the enclosed calculation according to config.
+
+    Args:
+        task_id: Id of the task, naming its profile artifact.
+        n_digits: Size of the calculation.
+        config: Profiling configuration.
+
+    Yields:
+        Dict filled in on exit with the saved artifact ("mode", "path"
+        and, for tracemalloc, "peak_bytes"); left empty if no profile
+        was saved.
+    """
+    capture: dict = {}
+    if config.mode == "cprofile":
+        profile = _profile_cpu
+    elif config.mode == "tracemalloc":
+        profile = _profile_memory
+    else:
+        yield capture
+        return
+
+    started = time.perf_counter()
+
+    def should_save() -> bool:
+        return (
+            n_digits >= config.min_digits
+            or time.perf_counter() - started >= config.min_seconds
+        )
+
+    with profile(task_id, should_save, capture):
+        yield capture
+    if capture:
+        logger.info(
+            f"Saved {config.mode} profile of task {task_id} "
+            f"to {capture['path']}"
+        )
+
+
+def _artifact_path(task_id: str, suffix: str) -> Path:
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{task_id}.{suffix}"
+
+
+@contextmanager
+def _profile_cpu(
+    task_id: str, should_save: Callable[[], bool], capture: dict
+) -> Iterator[None]:
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Only one profiler can be active per thread (or per process
+        # under sys.monitoring), e.g. under a debugger
+        logger.warning(f"cProfile unavailable: {e}")
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if should_save():
+            path = _artifact_path(task_id, "prof")
+            profiler.dump_stats(path)
+            capture.update(mode="cprofile", path=str(path))
+
+
+class _SharedTracing:
+    """tracemalloc tracing shared by the concurrent tasks of a process.
+
+    Tracing is process-wide: it is started by the first task needing it
+    and stopped by the last one, unless it was already on (e.g. with
+    PYTHONTRACEMALLOC).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._users = 0
+        self._owned = False
+
+    @contextmanager
+    def __call__(self) -> Iterator[None]:
+        with self._lock:
+            if self._users == 0:
+                self._owned = not tracemalloc.is_tracing()
+                if self._owned:
+                    tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._users += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._users -= 1
+                if self._users == 0 and self._owned:
+                    tracemalloc.stop()
+
+
+_shared_tracing = _SharedTracing()
+
+
+@contextmanager
+def _profile_memory(
+    task_id: str, should_save: Callable[[], bool], capture: dict
+) -> Iterator[None]:
+    # Snapshots and the peak cover every task running concurrently in
+    # the process (threads pool), not just this one
+    with _shared_tracing():
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            if should_save():
+                path = _artifact_path(task_id, "tracemalloc")
+                tracemalloc.take_snapshot().dump(str(path))
+                capture.update(
+                    mode="tracemalloc", path=str(path), peak_bytes=peak
+                )
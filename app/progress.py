@@ -0,0 +1,140 @@
+import json
+import time
+from collections.abc import Callable
+
+from celery import Task
+from loguru import logger
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.metrics import (
+    PROGRESS_REPORTS,
+    PROGRESS_WRITES,
+    record_backend_write,
+)
+from app.phases import phase
+from app.settings import settings
+
+
+PROGRESS_CHANNEL = "pi:progress:{task_id}"
+
+# Callback through which engines report the fraction of work done
+ProgressCallback = Callable[[float], None]
+
+
+class ProgressReporter:
+    """Rate-limited, coalescing publisher of a task's progress.
+
+    Reports are coalesced: a state is only written to the result backend
+    when the progress changed and either min_interval seconds passed since
+    the last write or the progress advanced by min_delta. The number of
+    backend writes is thus bounded by the task's duration and 1/min_delta,
+    not by the number of digits. flush() always writes the latest state.
+
+    Every write is optionally published on the task's Redis pub/sub
+    channel (PROGRESS_CHANNEL), for clients streaming the progress.
+    """
+
+    def __init__(
+        self,
+        task: Task,
+        task_id: str | None = None,
+        redis: Redis | None = None,
+        min_interval: float | None = None,
+        min_delta: float | None = None,
+    ) -> None:
+        """Create a reporter for one task.
+
+        Args:
+            task: Task whose state is updated.
+            task_id: Id of the reported task (the running task by default).
+            redis: Client used to publish updates; None disables pub/sub.
+            min_interval: Seconds between writes
+                          (settings.PROGRESS_MIN_INTERVAL by default).
+            min_delta: Progress advance forcing a write
+                       (settings.PROGRESS_MIN_DELTA by default).
+        """
+        self.task = task
+        self.task_id = task_id or task.request.id
+        self.redis = redis
+        self.min_interval = (
+            settings.PROGRESS_MIN_INTERVAL
+            if min_interval is None
+            else min_interval
+        )
+        self.min_delta = (
+            settings.PROGRESS_MIN_DELTA if min_delta is None else min_delta
+        )
+        self.writes = 0
+
+        self._pending: tuple[float, dict | Callable[[], dict]] | None = None
+        self._last_fraction: float | None = None
+        self._last_write = 0.0
+
+    def report(
+        self,
+        fraction: float,
+        meta: dict | Callable[[], dict] | None = None,
+    ) -> None:
+        """Report progress, writing it only if a threshold is crossed.
+
+        Args:
+            fraction: Fraction of work done, used for the thresholds.
+            meta: Task meta to store; {"progress": fraction,
+                  "result": None} by default. Meta that is costly to
+                  build can be passed as a function, only called when
+                  the state is written.
+        """
+        if meta is None:
+            meta = {"progress": fraction, "result": None}
+        PROGRESS_REPORTS.inc()
+        self._pending = (fraction, meta)
+
+        if self._last_fraction is None:
+            self._write()
+            return
+        if fraction == self._last_fraction:
+            return
+
+        now = time.monotonic()
+        if (
+            now - self._last_write >= self.min_interval
+            or abs(fraction - self._last_fraction) >= self.min_delta
+        ):
+            self._write()
+
+    def flush(self) -> None:
+        """Write the latest reported state if it has not been written."""
+        if self._pending is not None:
+            self._write()
+
+    def _write(self) -> None:
+        fraction, meta = self._pending
+        self._pending = None
+        if callable(meta):
+            meta = meta()
+        self._last_fraction = fraction
+        self._last_write = time.monotonic()
+
+        with phase("progress_writes"):
+            self.task.update_state(
+                task_id=self.task_id, state="PROGRESS", meta=meta
+            )
+            if self.redis is not None:
+                self._publish(meta)
+        self.writes += 1
+        PROGRESS_WRITES.inc()
+        record_backend_write("progress", meta)
+
+    def _publish(self, meta: dict) -> None:
+        try:
+            self.redis.publish(
+                PROGRESS_CHANNEL.format(task_id=self.task_id),
+                json.dumps({"state": "PROGRESS", **meta}),
+            )
+        except RedisError as e:
+            # Streaming clients fall back to the stored state
+            logger.warning(
+                f"Failed to publish progress of task {self.task_id}: "
+                f"{type(e).__name__}: {e}"
+            )
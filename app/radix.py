@@ -0,0 +1,137 @@
+"""Divide-and-conquer conversion of big integers to decimal digits.
+
+Engines end with a huge integer floor(pi * 10^k) whose decimal digits are
+the result. Converting it is quadratic with naive repeated division, so
+the value is split recursively in halves at cached powers and only the
+small leaves are converted directly:
+
+- with gmpy2, the halves are split by division at powers of ten (GMP's
+  division is subquadratic), and leaves are written straight into the
+  output buffer, with no string of the whole value;
+- with plain ints, whose division is slow, the value is rebuilt as a
+  Decimal from its binary halves at powers of two (libmpdec multiplies
+  in quasi-linear time) and the Decimal's digits are copied out in
+  chunks.
+
+Digits are written as ASCII into any writable buffer: a bytearray, or a
+memory-mapped file to keep them out of the Python heap altogether.
+"""
+
+import mmap
+import time
+from decimal import MAX_EMAX, MAX_PREC, MIN_EMIN, Context, Decimal
+
+from app import bigint
+from app.bigint import mpz
+from app.cancellation import cancellation_point
+from app.metrics import observe_phase
+from app.phases import phase
+
+
+# Digits (gmpy2) and bits (plain ints) of values converted directly
+LEAF_DIGITS = 1 << 16
+LEAF_BITS = 1 << 14
+
+# Characters copied out of the Decimal's digit string per step
+COPY_CHUNK = 1 << 20
+
+# Exact integer arithmetic on Decimals of any size
+_EXACT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+WritableBuffer = bytearray | memoryview | mmap.mmap
+
+
+def _write_gmpy2(value: int, width: int, out: WritableBuffer) -> None:
+    limit = len(out)
+
+    # powers[k] = 10^(LEAF_DIGITS * 2^k), each one the previous squared
+    powers = [mpz(10) ** LEAF_DIGITS]
+    while LEAF_DIGITS << len(powers) < width:
+        powers.append(powers[-1] * powers[-1])
+
+    def write(value: int, start: int, width: int) -> None:
+        if width <= LEAF_DIGITS:
+            end = min(width, limit - start)
+            digits = bigint.gmpy2.mpz(value).digits(10).zfill(width)
+            out[start : start + end] = digits[:end].encode("ascii")
+            return
+
+        cancellation_point()
+        k = ((width - 1) // LEAF_DIGITS).bit_length() - 1
+        low_width = LEAF_DIGITS << k
+        high_width = width - low_width
+        if start + high_width >= limit:
+            # The low half would be truncated away entirely
+            write(value // powers[k], start, high_width)
+            return
+        high, low = bigint.gmpy2.t_divmod(value, powers[k])
+        write(high, start, high_width)
+        write(low, start + high_width, low_width)
+
+    write(value, 0, width)
+
+
+def _to_decimal(value: int) -> Decimal:
+    powers: dict[int, Decimal] = {}  # 2^bits of every split size
+
+    def convert(value: int, bits: int) -> Decimal:
+        if bits <= LEAF_BITS:
+            return Decimal(int(value))
+        cancellation_point()
+        low_bits = 1 << ((bits - 1).bit_length() - 1)
+        if low_bits not in powers:
+            powers[low_bits] = _EXACT.power(Decimal(2), low_bits)
+        high = convert(value >> low_bits, bits - low_bits)
+        low = convert(value & ((1 << low_bits) - 1), low_bits)
+        return _EXACT.fma(high, powers[low_bits], low)
+
+    return convert(value, value.bit_length())
+
+
+def _write_python(value: int, width: int, out: WritableBuffer) -> None:
+    digits = str(_to_decimal(value))
+    padding = width - len(digits)
+    limit = min(len(out), width)
+
+    out[: min(padding, limit)] = b"0" * min(padding, limit)
+    for start in range(max(padding, 0), limit, COPY_CHUNK):
+        end = min(start + COPY_CHUNK, limit)
+        out[start:end] = digits[start - padding : end - padding].encode(
+            "ascii"
+        )
+
+
+def write_decimal(value: int, width: int, out: WritableBuffer) -> None:
+    """Write the leading decimal digits of a non-negative integer.
+
+    Args:
+        value: Integer to convert, less than 10^width.
+        width: Number of digits of value, zero-padded on the left.
+        out: Writable buffer receiving the first len(out) of the width
+             digits, as ASCII; len(out) must not exceed width.
+    """
+    if len(out) > width:
+        raise ValueError(f"Buffer of {len(out)} bytes exceeds {width} digits")
+    started = time.perf_counter()
+    with phase("conversion"):
+        if bigint.HAS_GMPY2:
+            _write_gmpy2(value, width, out)
+        else:
+            _write_python(value, width, out)
+    observe_phase("conversion", width, time.perf_counter() - started)
+
+
+def decimal_digits(value: int, width: int, n_chars: int | None = None) -> str:
+    """Leading decimal digits of a non-negative integer as a string.
+
+    Args:
+        value: Integer to convert, less than 10^width.
+        width: Number of digits of value, zero-padded on the left.
+        n_chars: Number of leading digits to return, width by default.
+
+    Returns:
+        The first n_chars of the width digits of value.
+    """
+    out = bytearray(width if n_chars is None else n_chars)
+    write_decimal(value, width, out)
+    return out.decode("ascii")
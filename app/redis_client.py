@@ -0,0 +1,24 @@
+from functools import lru_cache
+
+from redis import Redis
+from redis.asyncio import BlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis
+
+from app.settings import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> Redis:
+    """Return the process-wide Redis client (lazily created)."""
+    return Redis.from_url(settings.REDIS_URL)
+
+
+@lru_cache(maxsize=1)
+def get_async_redis() -> AsyncRedis:
+    """Return the API's asyncio Redis client over a shared pool."""
+    pool = BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+    )
+    return AsyncRedis(connection_pool=pool)
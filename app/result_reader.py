@@ -0,0 +1,138 @@
+"""Ranged reads of finished results, for streaming them to clients.
+
+Results are addressed as their formatted text ("3.1415..."), so that
+character offsets match the bytes of a text/plain response. Packed
+results (see app.storage.results) are read with GETRANGE, chunk by
+chunk, without loading the whole expansion.
+"""
+
+import zlib
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+from redis.asyncio import Redis as AsyncRedis
+
+from app.storage.results import unpack_digits
+
+
+class RangeNotSatisfiableError(Exception):
+    """The requested range lies outside of the result."""
+
+
+@dataclass(frozen=True)
+class StoredResult:
+    """Result of a finished task, inline or packed under its own key.
+
+    Attributes:
+        pi_value: Formatted Pi value stored inline in the task meta.
+        ref: Reference of a packed result (see store_packed_result).
+    """
+
+    pi_value: str | None = None
+    ref: dict | None = None
+
+    @classmethod
+    def from_info(cls, info: dict) -> "StoredResult":
+        """Stored result of a finished task's meta."""
+        return cls(pi_value=info.get("result"), ref=info.get("result_ref"))
+
+    @property
+    def length(self) -> int:
+        """Number of characters of the formatted value."""
+        if self.pi_value is not None:
+            return len(self.pi_value)
+        digits = self.ref["length"]
+        return digits + 1 if digits > 1 else digits
+
+    async def read(self, redis: AsyncRedis, start: int, end: int) -> str:
+        """Characters [start, end) of the formatted value."""
+        if self.pi_value is not None:
+            return self.pi_value[start:end]
+
+        # Character c is digit c, except after the decimal point at 1
+        first_digit = start if start < 2 else start - 1
+        end_digit = end if end < 2 else end - 1
+        text = ""
+        if end_digit > first_digit:
+            packed = await redis.getrange(
+                self.ref["key"], first_digit // 2, (end_digit - 1) // 2
+            )
+            text = unpack_digits(packed, first_digit, end_digit - first_digit)
+        if start <= 1 < end:
+            text = text[: 1 - start] + "." + text[1 - start :]
+        return text
+
+
+async def iter_result(
+    redis: AsyncRedis,
+    result: StoredResult,
+    start: int,
+    end: int,
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    """Yield characters [start, end) of a result in chunks."""
+    for chunk_start in range(start, end, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, end)
+        text = await result.read(redis, chunk_start, chunk_end)
+        yield text.encode("ascii")
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compress a stream of chunks into a single gzip member."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """Whether an Accept-Encoding header accepts gzip."""
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00")
+    return False
+
+
+def parse_range(header: str, total: int) -> tuple[int, int] | None:
+    """Parse a single HTTP byte range into [start, end) offsets.
+
+    Args:
+        header: Value of the Range header ("bytes=0-99", "bytes=100-"
+                or "bytes=-100").
+        total: Length of the full representation.
+
+    Returns:
+        The range, or None if the header is malformed (including a last
+        position before the first one) or asks for several ranges: the
+        header is then ignored and the full representation served, as
+        RFC 9110 requires.
+
+    Raises:
+        RangeNotSatisfiableError: If the range lies outside of the
+                                  representation.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    # ASCII only: str.isdigit() also accepts digits int() rejects ("²")
+    digits = first + last
+    if not sep or not (digits.isascii() and digits.isdigit()):
+        return None
+
+    if not first:
+        # Suffix range: the last `last` bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiableError()
+        return max(total - int(last), 0), total
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= total:
+        raise RangeNotSatisfiableError()
+    end = min(int(last) + 1, total) if last else total
+    return start, end
@@ -0,0 +1,108 @@
+"""Theatrical reveal schedule of calculated digits.
+
+Digit i of n is revealed after an exponentially decreasing delay:
+
+    delay(i) = 5.0 * exp(-8.0 * i / (n - 1))
+
+- First digit:    5 seconds
+- Middle digit:  ~0.1 seconds
+- Last digit:   ~0.001 seconds
+
+Delays form a geometric series, so the number of digits revealed after
+t seconds has a closed form. This lets the API derive the reveal progress
+from the elapsed time alone, instead of a worker sleeping through it.
+"""
+
+import math
+from dataclasses import asdict, dataclass
+
+
+BASE_DELAY = 5.0
+DECAY = 8.0
+
+
+@dataclass(frozen=True)
+class RevealSchedule:
+    """Reveal of total_chars digits, started at the started_at timestamp.
+
+    Attributes:
+        total_chars: Number of digits to reveal (without decimal point).
+        started_at: Unix timestamp at which the first digit is revealed.
+        start_progress: Progress already reported before the reveal; the
+                        reveal covers the remaining range up to 1.0.
+        base_delay: Delay after the first digit, in seconds.
+        decay: Exponential decay rate of the delay over the digits.
+    """
+
+    total_chars: int
+    started_at: float
+    start_progress: float = 0.0
+    base_delay: float = BASE_DELAY
+    decay: float = DECAY
+
+    @property
+    def _rate(self) -> float:
+        # Decay of the delay from one digit to the next (log of the ratio)
+        return self.decay / max(self.total_chars - 1, 1)
+
+    def delay(self, i: int) -> float:
+        """Delay after revealing digit i, in seconds."""
+        return self.base_delay * math.exp(-self._rate * i)
+
+    def elapsed_before(self, i: int) -> float:
+        """Seconds from the start until digit i is revealed."""
+        # Geometric series; expm1 keeps precision when the ratio is ~1
+        return (
+            self.base_delay
+            * math.expm1(-self._rate * i)
+            / math.expm1(-self._rate)
+        )
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the start until the reveal is finished."""
+        return self.elapsed_before(self.total_chars)
+
+    def revealed_chars(self, now: float) -> int:
+        """Number of digits revealed at timestamp now."""
+        elapsed = now - self.started_at
+        if elapsed < 0:
+            return 0
+        if elapsed >= self.duration:
+            return self.total_chars
+
+        # Invert elapsed_before: the largest i with elapsed_before(i) <= t
+        x = elapsed * -math.expm1(-self._rate) / self.base_delay
+        i = int(-math.log1p(-x) / self._rate)
+        i = max(0, min(i, self.total_chars - 1))
+        # Guard against floating point error at the boundaries
+        last = self.total_chars - 1
+        while i < last and self.elapsed_before(i + 1) <= elapsed:
+            i += 1
+        while i > 0 and self.elapsed_before(i) > elapsed:
+            i -= 1
+        return i + 1
+
+    def progress(self, now: float) -> float:
+        """Overall task progress at timestamp now."""
+        revealed = self.revealed_chars(now) / max(self.total_chars, 1)
+        return self.start_progress + (1.0 - self.start_progress) * revealed
+
+    def is_finished(self, now: float) -> bool:
+        """Whether every digit has been revealed (and the last delay over)."""
+        return now - self.started_at >= self.duration
+
+    def revealed_prefix(self, pi_value: str, now: float) -> str:
+        """Part of the formatted Pi value revealed at timestamp now."""
+        chars = self.revealed_chars(now)
+        # Account for the decimal point after the first digit
+        return pi_value[: chars + 1] if chars > 1 else pi_value[:chars]
+
+    def to_meta(self) -> dict:
+        """Serialize for the task result stored in the backend."""
+        return asdict(self)
+
+    @classmethod
+    def from_meta(cls, meta: dict) -> "RevealSchedule":
+        """Deserialize a schedule stored by to_meta."""
+        return cls(**meta)
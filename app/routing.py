@@ -0,0 +1,71 @@
+"""Routing of calculations to worker queues by estimated cost.
+
+Calculations estimated to compute for at least settings.HEAVY_MIN_SECONDS
+(see app.cost_model) go to settings.HEAVY_QUEUE and all others to
+settings.FAST_QUEUE, each served by its own workers (see
+docker-compose.yml), so that small requests never wait behind a job
+running for hours. Hex digit extractions are routed the same way by their
+estimated cost. Distributed jobs run their parts on settings.PARTS_QUEUE
+and their merge on the heavy queue, with the priority of their route.
+
+Within a queue, tasks are ordered by priority, 0 being the highest (as
+in Celery's Redis transport). Requests without an explicit priority get
+their size bucket's, so smaller requests run first; deferred requests
+(see app.cost_model.admission) get the lowest.
+"""
+
+from dataclasses import dataclass
+
+from app.cost_model import CostEstimate
+from app.digits import size_bucket
+from app.settings import settings
+
+
+# Priority levels of the broker's queues: 0 (highest) to 9
+PRIORITY_LEVELS = 10
+
+
+@dataclass(frozen=True)
+class Route:
+    """Queue and priority a calculation is published with."""
+
+    queue: str
+    priority: int
+
+    def options(self) -> dict:
+        """apply_async options publishing a task along this route."""
+        return {"queue": self.queue, "priority": self.priority}
+
+
+def default_priority(n_digits: int) -> int:
+    """Priority of a request by size: 0 for n < 10, then one level lower
+    per order of magnitude."""
+    return min(size_bucket(n_digits) - 1, PRIORITY_LEVELS - 1)
+
+
+def route_calculation(
+    n_digits: int,
+    estimate: CostEstimate,
+    priority: int | None = None,
+    deferred: bool = False,
+) -> Route:
+    """Route of a calculation of n_digits decimals.
+
+    Args:
+        n_digits: Number of decimal digits to calculate.
+        estimate: Estimated cost of the calculation.
+        priority: Priority requested by the client, default_priority()
+                  when omitted.
+        deferred: Run after all other work of its queue, whatever the
+                  requested priority.
+    """
+    queue = (
+        settings.HEAVY_QUEUE
+        if estimate.seconds >= settings.HEAVY_MIN_SECONDS
+        else settings.FAST_QUEUE
+    )
+    if deferred:
+        priority = PRIORITY_LEVELS - 1
+    elif priority is None:
+        priority = default_priority(n_digits)
+    return Route(queue=queue, priority=priority)
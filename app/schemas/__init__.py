@@ -1,12 +1,28 @@
+from app.schemas.batch_progress import (
+    BatchProgressRequest,
+    BatchProgressResponse,
+    TaskProgressError,
+)
 from app.schemas.calculation_request import CalculatePiRequest
 from app.schemas.calculation_response import CalculatePiResponse
+from app.schemas.engine_info import EngineInfo
+from app.schemas.hex_digits import HexDigitsRequest, HexDigitsResponse
+from app.schemas.profiling import ProfilingConfig, TaskPhasesResponse
 from app.schemas.progress_request import ProgressRequest
 from app.schemas.progress_response import ProgressResponse
 
 
 __all__ = [
+    "BatchProgressRequest",
+    "BatchProgressResponse",
     "CalculatePiRequest",
     "CalculatePiResponse",
+    "EngineInfo",
+    "HexDigitsRequest",
+    "HexDigitsResponse",
+    "ProfilingConfig",
     "ProgressRequest",
     "ProgressResponse",
+    "TaskPhasesResponse",
+    "TaskProgressError",
 ]
@@ -0,0 +1,46 @@
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field
+
+from app.schemas.progress_response import ProgressResponse
+
+
+MAX_BATCH_TASKS = 1000
+
+
+class BatchProgressRequest(BaseModel):
+    task_ids: Annotated[
+        list[Annotated[str, Field(min_length=1)]],
+        Field(
+            min_length=1,
+            max_length=MAX_BATCH_TASKS,
+            description="Task IDs returned from /calculate_pi",
+            examples=[["a1b2c3d4-e5f6-7890-abcd-ef1234567890"]],
+        ),
+    ]
+
+
+class TaskProgressError(BaseModel):
+    error: Annotated[
+        Literal["NOT_FOUND", "FAILURE"],
+        Field(
+            description="Why no progress is available for the task",
+            examples=["NOT_FOUND"],
+        ),
+    ]
+    detail: Annotated[
+        str,
+        Field(
+            description="Error message",
+            examples=["Task not found"],
+        ),
+    ]
+
+
+class BatchProgressResponse(BaseModel):
+    tasks: Annotated[
+        dict[str, ProgressResponse | TaskProgressError],
+        Field(
+            description="Progress (or error) of every requested task by ID",
+        ),
+    ]
@@ -1,6 +1,9 @@
 from typing import Annotated
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from app.engines import available_engines, get_engine
+from app.routing import PRIORITY_LEVELS
 
 
 class CalculatePiRequest(BaseModel):
@@ -12,3 +15,46 @@ class CalculatePiRequest(BaseModel):
             examples=[100],
         ),
     ]
+    algorithm: Annotated[
+        str | None,
+        Field(
+            description=(
+                "Pi engine to use (see /engines). "
+                "When omitted, the fastest engine measured for n is used."
+            ),
+            examples=[None, "chudnovsky"],
+        ),
+    ] = None
+    priority: Annotated[
+        int | None,
+        Field(
+            ge=0,
+            le=PRIORITY_LEVELS - 1,
+            description=(
+                "Queue priority, 0 (highest) to 9. When omitted, smaller "
+                "requests get higher priorities."
+            ),
+            examples=[None, 0],
+        ),
+    ] = None
+
+    @field_validator("algorithm")
+    @classmethod
+    def validate_algorithm(cls, value: str | None) -> str | None:
+        if value is not None and value not in available_engines():
+            raise ValueError(
+                f"Unknown algorithm, expected one of: "
+                f"{', '.join(available_engines())}"
+            )
+        return value
+
+    @model_validator(mode="after")
+    def validate_engine_limit(self) -> "CalculatePiRequest":
+        if self.algorithm is not None:
+            max_digits = get_engine(self.algorithm).max_digits
+            if max_digits is not None and self.n > max_digits:
+                raise ValueError(
+                    f"The {self.algorithm} engine computes at most "
+                    f"{max_digits} digits"
+                )
+        return self
@@ -0,0 +1,30 @@
+from typing import Annotated
+
+from pydantic import BaseModel, Field
+
+
+class EngineInfo(BaseModel):
+    name: Annotated[
+        str,
+        Field(
+            description="Engine name accepted by /calculate_pi",
+            examples=["chudnovsky"],
+        ),
+    ]
+    description: Annotated[
+        str,
+        Field(
+            description="Short description of the algorithm",
+            examples=["Chudnovsky series with binary splitting"],
+        ),
+    ]
+    digits_per_second: Annotated[
+        dict[int, float],
+        Field(
+            description=(
+                "Latest measured throughput per size bucket, where bucket "
+                "k covers requests with k-digit sizes (e.g. 3: 100-999)"
+            ),
+            examples=[{3: 450000.0, 6: 1100000.0}],
+        ),
+    ]
@@ -0,0 +1,40 @@
+from typing import Annotated
+
+from pydantic import BaseModel, Field
+
+from app.engines.bbp import MAX_COUNT
+from app.settings import settings
+
+
+class HexDigitsRequest(BaseModel):
+    positions: Annotated[
+        list[Annotated[int, Field(ge=0, le=settings.HEX_MAX_POSITION)]],
+        Field(
+            min_length=1,
+            max_length=1000,
+            description=(
+                "0-based positions of hexadecimal digits after the point "
+                "(pi = 3.243F6A88..., position 0 is 2)"
+            ),
+            examples=[[0, 1000000]],
+        ),
+    ]
+    count: Annotated[
+        int,
+        Field(
+            ge=1,
+            le=MAX_COUNT,
+            description="Number of hex digits to extract at each position",
+            examples=[8],
+        ),
+    ] = 1
+
+
+class HexDigitsResponse(BaseModel):
+    digits: Annotated[
+        dict[int, str],
+        Field(
+            description="Hex digits starting at each requested position",
+            examples=[{0: "243F6A88", 1000000: "6C65E52C"}],
+        ),
+    ]
@@ -0,0 +1,73 @@
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field
+
+
+class ProfilingConfig(BaseModel):
+    mode: Annotated[
+        Literal["off", "cprofile", "tracemalloc"],
+        Field(
+            description=(
+                "Profiler run on calculation tasks: cProfile for CPU time, "
+                "tracemalloc for memory allocations"
+            ),
+            examples=["cprofile"],
+        ),
+    ]
+    min_digits: Annotated[
+        int,
+        Field(
+            ge=0,
+            description="Profiles of tasks with at least n digits are saved",
+            examples=[100000],
+        ),
+    ]
+    min_seconds: Annotated[
+        float,
+        Field(
+            ge=0,
+            description=(
+                "Profiles of tasks running at least this long are saved"
+            ),
+            examples=[10.0],
+        ),
+    ]
+
+
+class TaskPhasesResponse(BaseModel):
+    task_id: Annotated[
+        str,
+        Field(
+            description="Task ID returned from /calculate_pi",
+            examples=["a1b2c3d4-e5f6-7890-abcd-ef1234567890"],
+        ),
+    ]
+    phases: Annotated[
+        dict[str, float],
+        Field(
+            description=(
+                "Wall-clock seconds per phase of the task; nested phases "
+                "(e.g. conversion within compute) are also counted in "
+                "their parent"
+            ),
+            examples=[
+                {
+                    "digit_store_read": 0.0002,
+                    "compute": 1.52,
+                    "binary_splitting": 1.1,
+                    "conversion": 0.31,
+                    "result_write": 0.004,
+                }
+            ],
+        ),
+    ]
+    profile: Annotated[
+        dict | None,
+        Field(
+            description=(
+                "Saved profile artifact (mode, path on the worker and, for "
+                "tracemalloc, peak_bytes), if the task was profiled"
+            ),
+            examples=[{"mode": "cprofile", "path": "data/profiles/a1b2.prof"}],
+        ),
+    ] = None
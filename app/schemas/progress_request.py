@@ -11,3 +11,16 @@ class ProgressRequest(BaseModel):
             examples=["a1b2c3d4-e5f6-7890-abcd-ef1234567890"],
         ),
     ]
+    wait_ms: Annotated[
+        int | None,
+        Field(
+            ge=0,
+            description=(
+                "Hold the request until the progress changes, for at most "
+                "this many milliseconds (capped by the server). The "
+                "progress is compared to the If-None-Match ETag if given, "
+                "to the progress at the time of the request otherwise"
+            ),
+            examples=[10000],
+        ),
+    ] = None
@@ -5,7 +5,7 @@ from pydantic import BaseModel, Field
 
 class ProgressResponse(BaseModel):
     state: Annotated[
-        Literal["PROGRESS", "FINISHED"],
+        Literal["PROGRESS", "FINISHED", "CANCELLED"],
         Field(
             description="Current state of the task",
             examples=["PROGRESS"],
@@ -27,3 +27,31 @@ class ProgressResponse(BaseModel):
             examples=[None, "3.14159265358979323846"],
         ),
     ]
+    partial_result: Annotated[
+        str | None,
+        Field(
+            description=(
+                "Prefix of the result already final while a streaming "
+                "engine computes it"
+            ),
+            examples=[None, "3.14159265"],
+        ),
+    ] = None
+    eta_seconds: Annotated[
+        float | None,
+        Field(
+            ge=0.0,
+            description=(
+                "Estimated seconds until the result is complete, null if "
+                "unknown"
+            ),
+            examples=[12.5],
+        ),
+    ] = None
+    estimated_peak_bytes: Annotated[
+        int | None,
+        Field(
+            description="Estimated peak memory of the computation in bytes",
+            examples=[15100030],
+        ),
+    ] = None
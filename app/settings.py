@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 
 from loguru import logger
 from pydantic import computed_field
@@ -17,6 +18,103 @@ class Settings(BaseSettings):
     def REDIS_URL(self) -> str:
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
+    # Connections of the API's asyncio pool, shared by all requests
+    # (progress streams and long polls share one pub/sub connection per
+    # process); requests wait for a free one
+    REDIS_MAX_CONNECTIONS: int = 500
+    REDIS_POOL_TIMEOUT: float = 5.0
+
+    DEFAULT_ENGINE: str = "chudnovsky"
+
+    # "virtual": the API derives the reveal from the elapsed time,
+    # "worker": the worker sleeps through the reveal, digit by digit
+    REVEAL_MODE: Literal["virtual", "worker"] = "virtual"
+
+    # Multi-core binary splitting for large requests
+    PARALLEL_WORKERS: int = os.cpu_count() or 1
+    PARALLEL_MIN_DIGITS: int = 500_000
+
+    # Calculations estimated to compute for at least HEAVY_MIN_SECONDS
+    # are queued on HEAVY_QUEUE, all others on FAST_QUEUE, each with its
+    # own workers (see app.routing)
+    FAST_QUEUE: str = "fast"
+    HEAVY_QUEUE: str = "heavy"
+    # Parts of distributed jobs, served by workers of their own so that
+    # the parts of a job run side by side
+    PARTS_QUEUE: str = "parts"
+    HEAVY_MIN_SECONDS: float = 1.0
+
+    # Admission control by estimated cost (see app.cost_model): requests
+    # over MAX_TASK_SECONDS of CPU or MAX_TASK_BYTES of memory are
+    # rejected, those over DEFER_MIN_SECONDS run at the lowest priority
+    MAX_TASK_SECONDS: float = 4 * 60 * 60
+    MAX_TASK_BYTES: int = 8 * 1024**3
+    DEFER_MIN_SECONDS: float = 10 * 60
+    # Engine costs written by `python -m benchmarks --calibrate`, instead
+    # of the built-in calibration
+    COST_MODEL_PATH: str | None = None
+
+    # Requests fanned out across workers as a Celery chord
+    DISTRIBUTED_MIN_DIGITS: int = 5_000_000
+    DISTRIBUTED_PARTS: int = 16
+
+    # Progress is written at most every PROGRESS_MIN_INTERVAL seconds,
+    # unless it advanced by PROGRESS_MIN_DELTA since the last write
+    PROGRESS_MIN_INTERVAL: float = 0.5
+    PROGRESS_MIN_DELTA: float = 0.01
+    # Also publish progress on the task's Redis pub/sub channel
+    PROGRESS_PUBSUB: bool = True
+
+    # Progress streams: minimum seconds between reveal events, and
+    # seconds without updates before a keepalive is sent
+    STREAM_MIN_INTERVAL: float = 0.1
+    STREAM_KEEPALIVE: float = 15.0
+    # /check_progress long polls (wait_ms) wait at most POLL_MAX_WAIT
+    # seconds; clients are told to poll again within POLL_RETRY_AFTER_MAX
+    POLL_MAX_WAIT: float = 30.0
+    POLL_RETRY_AFTER_MAX: int = 30
+
+    # Results with at least RESULT_PACK_MIN_DIGITS digits are stored
+    # packed under their own key; results expire after RESULT_TTL seconds
+    RESULT_PACK_MIN_DIGITS: int = 10_000
+    RESULT_TTL: int = 24 * 60 * 60
+    # Characters read from Redis per chunk of a /result response
+    RESULT_CHUNK_CHARS: int = 1 << 20
+
+    # Largest hex digit position served by BBP digit extraction
+    HEX_MAX_POSITION: int = 10_000_000
+
+    # Safety expiry of single-flight claims, in case a worker dies
+    SINGLEFLIGHT_TTL: int = 24 * 60 * 60
+
+    # Port of the worker's Prometheus exporter; 0 disables it
+    WORKER_METRICS_PORT: int = 9808
+
+    # Opt-in profiling of calculation tasks (overridable at runtime through
+    # /admin/profiling): profiles of tasks with at least PROFILE_MIN_DIGITS
+    # digits or running at least PROFILE_MIN_SECONDS are saved to PROFILE_DIR
+    PROFILE_MODE: Literal["off", "cprofile", "tracemalloc"] = "off"
+    PROFILE_MIN_DIGITS: int = 100_000
+    PROFILE_MIN_SECONDS: float = 10.0
+    PROFILE_DIR: str = os.path.join(BASE_DIR, "..", "data", "profiles")
+
+    # Token required in the X-Admin-Token header of /admin endpoints;
+    # while unset, they are disabled (404)
+    ADMIN_TOKEN: str | None = None
+
+    DIGIT_STORE_PATH: str = os.path.join(BASE_DIR, "..", "data", "pi_digits")
+    # Must be shared by all workers taking part in distributed jobs
+    SCRATCH_DIR: str = os.path.join(BASE_DIR, "..", "data", "scratch")
+    # Engine runs estimated to take CHECKPOINT_MIN_SECONDS or more save
+    # their state to SCRATCH_DIR every CHECKPOINT_INTERVAL seconds, and
+    # redelivered tasks resume from it (see app.checkpoints)
+    CHECKPOINT_MIN_SECONDS: float = 60.0
+    CHECKPOINT_INTERVAL: float = 60.0
+
+    # Seconds between two checks of a running task's cancellation flag
+    # (see app.cancellation)
+    CANCEL_CHECK_INTERVAL: float = 1.0
+
     LOG_FORMAT: str = "{time:YYYY-MM-DD at HH:mm:ss} | {level} | {message}"
     LOG_ROTATION: str = "10 MB"
 
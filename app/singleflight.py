@@ -0,0 +1,330 @@
+"""Single-flight deduplication of in-flight Pi calculations.
+
+A calculation is claimed in Redis under (algorithm, n) when submitted.
+Identical requests arriving while it runs join the claimed task, and
+requests for fewer digits subscribe to it under their own alias task id:
+the worker publishes their rounded prefix as soon as the larger
+expansion is computed, instead of computing it again, provided the
+larger task is estimated to finish before a calculation of their own
+would. Members of the index of in-flight tasks that outlived their
+estimate (e.g. their worker died) stop taking subscribers and are
+pruned.
+
+Every client attached to a claimed task (its submitter, the joiners and
+the live subscribed aliases) holds a reference to it, and cancelling
+only detaches one client, once per id: the computation is cancelled once
+the last reference is gone (see detach).
+"""
+
+import math
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Literal
+
+from redis import Redis
+
+from app.settings import settings
+
+
+CLAIM_KEY = "pi:inflight:{algorithm}:{n}"
+INDEX_KEY = "pi:inflight:{algorithm}"
+SUBSCRIBERS_KEY = "pi:subscribers:{task_id}"
+HOLDERS_KEY = "pi:holders:{task_id}"
+PARENT_KEY = "pi:parent:{task_id}"
+FINISH_KEY = "pi:finish:{task_id}"
+DETACHED_KEY = "pi:detached:{task_id}"
+
+# A task takes subscribers until it outlives its estimated duration by
+# this factor plus margin (seconds)
+OVERDUE_FACTOR = 2.0
+OVERDUE_MARGIN = 60
+
+# Larger in-flight tasks considered for a subscription, smallest first
+SUBSCRIBE_CANDIDATES = 8
+
+# Queueing and dispatch time of a new task, which a subscription saves
+DISPATCH_SECONDS = 1.0
+
+# KEYS: claim key. ARGV: TTL, holders key prefix
+_JOIN_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    redis.call('INCR', ARGV[2] .. existing)
+    redis.call('EXPIRE', ARGV[2] .. existing, ARGV[1])
+end
+return existing
+"""
+
+# KEYS: claim key, index key
+# ARGV: n, candidate task id, TTL, subscribers key prefix,
+#       holders key prefix, parent key prefix, finish key prefix,
+#       current time, estimated seconds, finish key TTL, candidates,
+#       longest wait for a subscription
+_JOIN_OR_CLAIM_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    redis.call('INCR', ARGV[5] .. existing)
+    redis.call('EXPIRE', ARGV[5] .. existing, ARGV[3])
+    return {'joined', existing}
+end
+
+local now = tonumber(ARGV[8])
+local parents = redis.call(
+    'ZRANGEBYSCORE', KEYS[2], ARGV[1], '+inf', 'LIMIT', 0, ARGV[11]
+)
+for _, parent in ipairs(parents) do
+    local finish = redis.call('GET', ARGV[7] .. parent)
+    if not finish then
+        -- Overdue, released or expired
+        redis.call('ZREM', KEYS[2], parent)
+    elseif tonumber(finish) - now <= tonumber(ARGV[12]) then
+        local subscribers = ARGV[4] .. parent
+        redis.call('HSET', subscribers, ARGV[2], ARGV[1])
+        redis.call('EXPIRE', subscribers, ARGV[3])
+        redis.call('INCR', ARGV[5] .. parent)
+        redis.call('EXPIRE', ARGV[5] .. parent, ARGV[3])
+        redis.call('SET', ARGV[6] .. ARGV[2], parent, 'EX', ARGV[3])
+        return {'subscribed', parent}
+    end
+end
+
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('SET', ARGV[5] .. ARGV[2], 1, 'EX', ARGV[3])
+redis.call(
+    'SET', ARGV[7] .. ARGV[2], now + tonumber(ARGV[9]), 'EX', ARGV[10]
+)
+return {'claimed', ARGV[2]}
+"""
+
+# KEYS: index key, subscribers key. ARGV: task id
+_CLOSE_SUBSCRIPTIONS_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+local subscribers = redis.call('HGETALL', KEYS[2])
+redis.call('DEL', KEYS[2])
+return subscribers
+"""
+
+# KEYS: claim key, index key, holders key, finish key. ARGV: task id
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('DEL', KEYS[3], KEYS[4])
+"""
+
+# ARGV: task id, holders key prefix, parent key prefix,
+#       subscribers key prefix, detached key prefix, TTL
+_DETACH_SCRIPT = """
+local task_id = ARGV[1]
+local detached = ARGV[5] .. task_id
+local previous = redis.call('GET', detached)
+if previous then
+    return {previous, 1}
+end
+local parent = redis.call('GET', ARGV[3] .. task_id)
+if parent then
+    redis.call('HDEL', ARGV[4] .. parent, task_id)
+    redis.call('DEL', ARGV[3] .. task_id)
+    task_id = parent
+end
+local holders = redis.call('DECR', ARGV[2] .. task_id)
+if holders <= 0 then
+    redis.call('DEL', ARGV[2] .. task_id)
+end
+redis.call('SET', detached, task_id, 'EX', ARGV[6])
+return {task_id, holders}
+"""
+
+
+@dataclass(frozen=True)
+class Flight:
+    """Outcome of joining or claiming an in-flight calculation.
+
+    Attributes:
+        outcome: "claimed" when the caller must start task_id itself,
+                 "joined" when task_id is an identical running task,
+                 "subscribed" when the caller's alias id waits for the
+                 prefix of the larger running task task_id.
+        task_id: The task the request is attached to.
+    """
+
+    outcome: Literal["claimed", "joined", "subscribed"]
+    task_id: str
+
+
+def _algorithm_key(algorithm: str | None) -> str:
+    return algorithm or "auto"
+
+
+def find_inflight(redis: Redis, algorithm: str | None, n: int) -> str | None:
+    """Task id of a running calculation with the same (algorithm, n)."""
+    key = CLAIM_KEY.format(algorithm=_algorithm_key(algorithm), n=n)
+    task_id = redis.get(key)
+    return task_id.decode() if task_id is not None else None
+
+
+def join_inflight(redis: Redis, algorithm: str | None, n: int) -> str | None:
+    """Join a running calculation with the same (algorithm, n), if any.
+
+    Unlike find_inflight, the caller holds a reference to the task it
+    joins.
+
+    Returns:
+        Id of the joined task, None if there is none.
+    """
+    key = CLAIM_KEY.format(algorithm=_algorithm_key(algorithm), n=n)
+    task_id = redis.eval(
+        _JOIN_SCRIPT,
+        1,
+        key,
+        settings.SINGLEFLIGHT_TTL,
+        HOLDERS_KEY.format(task_id=""),
+    )
+    return task_id.decode() if task_id is not None else None
+
+
+def join_or_claim(
+    redis: Redis,
+    algorithm: str | None,
+    n: int,
+    task_id: str,
+    seconds: float = 0.0,
+) -> Flight:
+    """Atomically attach a request to a running calculation or claim it.
+
+    Args:
+        redis: Redis client.
+        algorithm: Requested engine name (None for automatic selection).
+        n: Number of decimal digits requested.
+        task_id: Id the request would use for a new task or an alias.
+        seconds: Estimated duration of the request's own calculation.
+                 It only subscribes to a larger task estimated to finish
+                 within it (plus DISPATCH_SECONDS); a claimed task is
+                 estimated to finish after it, and takes subscribers
+                 until it is overdue by OVERDUE_FACTOR times it plus
+                 OVERDUE_MARGIN.
+
+    Returns:
+        The Flight the request is attached to.
+    """
+    algorithm = _algorithm_key(algorithm)
+    finish_ttl = min(
+        math.ceil(OVERDUE_FACTOR * seconds) + OVERDUE_MARGIN,
+        settings.SINGLEFLIGHT_TTL,
+    )
+    outcome, flight_task_id = redis.eval(
+        _JOIN_OR_CLAIM_SCRIPT,
+        2,
+        CLAIM_KEY.format(algorithm=algorithm, n=n),
+        INDEX_KEY.format(algorithm=algorithm),
+        n,
+        task_id,
+        settings.SINGLEFLIGHT_TTL,
+        SUBSCRIBERS_KEY.format(task_id=""),
+        HOLDERS_KEY.format(task_id=""),
+        PARENT_KEY.format(task_id=""),
+        FINISH_KEY.format(task_id=""),
+        time.time(),
+        seconds,
+        finish_ttl,
+        SUBSCRIBE_CANDIDATES,
+        seconds + DISPATCH_SECONDS,
+    )
+    return Flight(outcome.decode(), flight_task_id.decode())
+
+
+def close_subscriptions(
+    redis: Redis, algorithm: str | None, task_id: str
+) -> dict[str, int]:
+    """Stop accepting subscribers and return the subscribed aliases.
+
+    Args:
+        redis: Redis client.
+        algorithm: Engine name the task was claimed under.
+        task_id: Id of the claimed task.
+
+    Returns:
+        Mapping of alias task id to its requested number of digits.
+    """
+    flat = redis.eval(
+        _CLOSE_SUBSCRIPTIONS_SCRIPT,
+        2,
+        INDEX_KEY.format(algorithm=_algorithm_key(algorithm)),
+        SUBSCRIBERS_KEY.format(task_id=task_id),
+        task_id,
+    )
+    return {alias.decode(): int(n) for alias, n in zip(flat[0::2], flat[1::2])}
+
+
+def release(redis: Redis, algorithm: str | None, n: int, task_id: str) -> None:
+    """Release the claim of a finished (or failed) task."""
+    algorithm = _algorithm_key(algorithm)
+    redis.eval(
+        _RELEASE_SCRIPT,
+        4,
+        CLAIM_KEY.format(algorithm=algorithm, n=n),
+        INDEX_KEY.format(algorithm=algorithm),
+        HOLDERS_KEY.format(task_id=task_id),
+        FINISH_KEY.format(task_id=task_id),
+        task_id,
+    )
+
+
+def detach(redis: Redis, task_id: str) -> tuple[str, bool]:
+    """Drop the reference of one client to the calculation it is attached to.
+
+    A subscribed alias also stops waiting for its task's prefix. Each id
+    drops its reference once: detaching it again (e.g. a retried DELETE)
+    drops nothing and reports the computation as held, so that it is
+    left alone. Clients that joined a calculation share its id, so only
+    the first of them to detach drops a reference, and it then runs to
+    completion for the others.
+
+    Args:
+        redis: Redis client.
+        task_id: Id the client was given, a task or an alias.
+
+    Returns:
+        (computation, held): id of the task computing the client's digits
+        (task_id itself unless it is an alias), and whether other clients
+        still hold a reference to it, in which case it must keep running.
+        Tasks without references (e.g. not deduplicated) are not held.
+    """
+    computation, holders = redis.eval(
+        _DETACH_SCRIPT,
+        0,
+        task_id,
+        HOLDERS_KEY.format(task_id=""),
+        PARENT_KEY.format(task_id=""),
+        SUBSCRIBERS_KEY.format(task_id=""),
+        DETACHED_KEY.format(task_id=""),
+        settings.SINGLEFLIGHT_TTL,
+    )
+    return computation.decode(), holders > 0
+
+
+def find_claim(
+    redis: Redis, task_id: str, algorithms: Iterable[str | None]
+) -> tuple[str | None, int] | None:
+    """Engine name and n a task is claimed under.
+
+    Args:
+        redis: Redis client.
+        task_id: Id of the task.
+        algorithms: Engine names it may be claimed under (None for
+                    automatic selection).
+
+    Returns:
+        (algorithm, n), None if the task holds no open claim.
+    """
+    for algorithm in algorithms:
+        n = redis.zscore(
+            INDEX_KEY.format(algorithm=_algorithm_key(algorithm)), task_id
+        )
+        if n is not None:
+            return algorithm, int(n)
+    return None
@@ -0,0 +1,18 @@
+from app.storage.digit_store import (
+    DigitStore,
+    get_digit_store,
+    published_high_water_mark,
+)
+from app.storage.results import (
+    load_packed_results,
+    store_packed_result,
+)
+
+
+__all__ = [
+    "DigitStore",
+    "get_digit_store",
+    "load_packed_results",
+    "published_high_water_mark",
+    "store_packed_result",
+]
@@ -0,0 +1,46 @@
+"""Locations of task checkpoints (see app.checkpoints).
+
+Checkpoint files live in settings.SCRATCH_DIR and their path is recorded
+in Redis under the task id, so that a redelivered task, possibly on
+another worker sharing the scratch directory, finds its checkpoint.
+"""
+
+import os
+
+from redis import Redis
+
+from app.settings import settings
+
+
+CHECKPOINT_KEY = "pi:checkpoint:{task_id}"
+
+
+def checkpoint_path(task_id: str) -> str:
+    """Default path of a task's checkpoint file."""
+    return os.path.join(settings.SCRATCH_DIR, "checkpoints", f"{task_id}.ckpt")
+
+
+def find_checkpoint(redis: Redis, task_id: str) -> str | None:
+    """Path of the checkpoint recorded for a task, None if there is none."""
+    path = redis.get(CHECKPOINT_KEY.format(task_id=task_id))
+    return None if path is None else path.decode()
+
+
+def record_checkpoint(redis: Redis, task_id: str, path: str) -> None:
+    """Record the path of a task's latest checkpoint."""
+    redis.set(
+        CHECKPOINT_KEY.format(task_id=task_id), path, ex=settings.RESULT_TTL
+    )
+
+
+def remove_checkpoint(redis: Redis, task_id: str) -> None:
+    """Delete a task's checkpoint file and its record."""
+    key = CHECKPOINT_KEY.format(task_id=task_id)
+    path = redis.get(key)
+    if path is not None:
+        for suffix in ("", ".tmp"):
+            try:
+                os.remove(path.decode() + suffix)
+            except FileNotFoundError:
+                pass
+    redis.delete(key)
@@ -0,0 +1,115 @@
+import fcntl
+import mmap
+import os
+from functools import lru_cache
+
+from loguru import logger
+from redis import Redis
+from redis.client import Pipeline
+from redis.exceptions import RedisError
+
+from app.redis_client import get_redis
+from app.settings import settings
+
+
+HIGH_WATER_MARK_KEY = "pi:digit_store:hwm"
+
+
+class DigitStore:
+    """File-backed store of the longest Pi expansion computed so far.
+
+    The file holds truncated digits ("31415926...") without a decimal
+    point, so the first k characters are always a valid prefix. Reads are
+    served from a memory map; writes only ever append the missing tail.
+    The high-water mark (number of stored digits) is mirrored to Redis.
+    """
+
+    def __init__(self, path: str, redis: Redis | None = None) -> None:
+        self.path = path
+        self.redis = redis
+
+    def high_water_mark(self) -> int:
+        """Number of digit characters currently stored on disk."""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def read(self, n_chars: int) -> str | None:
+        """Return the first n_chars stored digits, or None if not stored.
+
+        Args:
+            n_chars: Number of digit characters (including the leading 3).
+
+        Returns:
+            Truncated digits string, or None when the store is too short.
+        """
+        if n_chars > self.high_water_mark():
+            return None
+
+        with (
+            open(self.path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+        ):
+            return mm[:n_chars].decode("ascii")
+
+    def extend(self, digits: str) -> int:
+        """Append the part of digits that extends past the stored prefix.
+
+        Args:
+            digits: Truncated digits string starting with "3".
+
+        Returns:
+            The new high-water mark.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        with open(self.path, "ab") as f:
+            # Serialize concurrent writers on the same machine
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                stored = os.fstat(f.fileno()).st_size
+                if len(digits) > stored:
+                    f.write(digits[stored:].encode("ascii"))
+                    f.flush()
+                    logger.info(
+                        f"Digit store extended from {stored} "
+                        f"to {len(digits)} digits"
+                    )
+                high_water_mark = max(stored, len(digits))
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+        self._publish_high_water_mark(high_water_mark)
+        return high_water_mark
+
+    def _publish_high_water_mark(self, high_water_mark: int) -> None:
+        if self.redis is None:
+            return
+
+        def raise_high_water_mark(pipe: Pipeline) -> None:
+            # Never lower the mark published by a worker with a longer file
+            current = int(pipe.get(HIGH_WATER_MARK_KEY) or 0)
+            if high_water_mark > current:
+                pipe.multi()
+                pipe.set(HIGH_WATER_MARK_KEY, high_water_mark)
+
+        try:
+            self.redis.transaction(raise_high_water_mark, HIGH_WATER_MARK_KEY)
+        except RedisError as e:
+            # The file is the source of truth, Redis only advertises it
+            logger.warning(
+                f"Failed to publish digit store high-water mark: "
+                f"{type(e).__name__}: {e}"
+            )
+
+
+def published_high_water_mark(redis: Redis) -> int:
+    """Largest digit store high-water mark published by any worker."""
+    return int(redis.get(HIGH_WATER_MARK_KEY) or 0)
+
+
+@lru_cache(maxsize=1)
+def get_digit_store() -> DigitStore:
+    """Return the worker's digit store configured from settings."""
+    return DigitStore(settings.DIGIT_STORE_PATH, redis=get_redis())
@@ -0,0 +1,44 @@
+import os
+import pickle
+import shutil
+
+from app.settings import settings
+
+
+PQT = tuple[int, int, int]
+
+
+def job_dir(job_id: str) -> str:
+    """Scratch directory holding the partial products of one job."""
+    return os.path.join(settings.SCRATCH_DIR, job_id)
+
+
+def save_partial(job_id: str, a: int, b: int, pqt: PQT) -> str:
+    """Persist the P, Q, T products of the term range [a, b).
+
+    The file is written under a temporary name and renamed, so a reader
+    never sees a partially written product.
+
+    Returns:
+        Path of the stored partial products.
+    """
+    directory = job_dir(job_id)
+    os.makedirs(directory, exist_ok=True)
+
+    path = os.path.join(directory, f"{a}-{b}.pqt")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(pqt, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_partial(path: str) -> PQT:
+    """Load partial products stored by save_partial."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def remove_job(job_id: str) -> None:
+    """Delete all scratch files of a job."""
+    shutil.rmtree(job_dir(job_id), ignore_errors=True)
@@ -0,0 +1,94 @@
+"""Packed storage of finished results.
+
+Large results are not stored inline in the task meta: their digits are
+packed as 4-bit BCD (two digits per byte) under a separate Redis key,
+and the meta references that key. Digit strings are valid hexadecimal,
+so packing and unpacking are single bytes.fromhex / bytes.hex calls,
+and any range of digits maps to a byte range of the packed value.
+"""
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.metrics import record_backend_write
+from app.settings import settings
+
+
+RESULT_KEY = "pi:result:{task_id}"
+
+# Pads an odd number of digits to whole bytes; never a decimal digit
+PAD_NIBBLE = "f"
+
+
+def pack_digits(digits: str) -> bytes:
+    """Pack a string of decimal digits as 4-bit BCD."""
+    if len(digits) % 2:
+        digits += PAD_NIBBLE
+    return bytes.fromhex(digits)
+
+
+def unpack_digits(
+    packed: bytes, start: int = 0, length: int | None = None
+) -> str:
+    """Unpack BCD digits, optionally a range of them.
+
+    Args:
+        packed: Packed digits, or the byte range of them that begins
+                with the byte holding digit start.
+        start: Index of the first digit to return in the full value.
+        length: Number of digits to return; all remaining by default.
+
+    Returns:
+        The unpacked decimal digits.
+    """
+    digits = packed.hex()
+    offset = start % 2
+    end = None if length is None else offset + length
+    return digits[offset:end].rstrip(PAD_NIBBLE)
+
+
+def store_packed_result(redis: Redis, task_id: str, pi_value: str) -> dict:
+    """Store a formatted Pi value packed and return its meta reference.
+
+    Args:
+        redis: Redis client.
+        task_id: Id of the task the result belongs to.
+        pi_value: Formatted Pi value ("3.1415...").
+
+    Returns:
+        Reference to store in the task meta as "result_ref".
+    """
+    digits = pi_value.replace(".", "")
+    key = RESULT_KEY.format(task_id=task_id)
+    packed = pack_digits(digits)
+    redis.set(key, packed, ex=settings.RESULT_TTL)
+    record_backend_write("packed_result", packed)
+    return {"key": key, "length": len(digits)}
+
+
+def format_digits(digits: str) -> str:
+    """Formatted Pi value of stored digits (decimal point after the 3)."""
+    return f"{digits[0]}.{digits[1:]}" if len(digits) > 1 else digits
+
+
+async def load_packed_results(
+    redis: AsyncRedis, refs: list[dict]
+) -> list[str | None]:
+    """Load and format packed results, in a single MGET.
+
+    Args:
+        redis: Asyncio Redis client.
+        refs: References returned by store_packed_result.
+
+    Returns:
+        Formatted Pi values, None for results that have expired.
+    """
+    if not refs:
+        return []
+    packed = await redis.mget([ref["key"] for ref in refs])
+    return [
+        format_digits(unpack_digits(value, length=ref["length"]))
+        if value is not None
+        else None
+        for ref, value in zip(refs, packed)
+    ]
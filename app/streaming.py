@@ -0,0 +1,375 @@
+"""Push-based streaming of task progress (SSE, WebSocket, long polls).
+
+A stream subscribes to the task's progress channel (see app.progress)
+and to the channel on which Celery's Redis backend publishes every
+stored state, so updates are pushed as soon as a worker writes them
+instead of being polled. Once a finished result carries a reveal
+schedule, the remaining events are derived from the schedule locally.
+Long polls of /check_progress wait on the same channels for a single
+change (see wait_for_progress).
+
+Streams and long polls of a process share one pub/sub connection (see
+ProgressSubscriber), which fans the messages out to them in memory, so
+that waiting clients do not hold connections of the Redis pool.
+"""
+
+import asyncio
+import json
+import time
+import weakref
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from loguru import logger
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.client import PubSub
+
+from app.celery_app import celery_app
+from app.progress import PROGRESS_CHANNEL
+from app.reveal import RevealSchedule
+from app.schemas import ProgressResponse
+from app.settings import settings
+from app.task_state import (
+    TaskFailedError,
+    etag_matches,
+    load_results,
+    progress_etag,
+    read_state,
+    resolve_progress,
+)
+
+
+# Event name and data: "progress", "finished", "cancelled" and "error"
+# events carry a ProgressResponse (plus newly revealed "digits" if
+# requested) or an error detail; "keepalive" events carry nothing
+StreamEvent = tuple[str, dict[str, Any]]
+
+
+def _decode_message(task_id: str, message: dict) -> tuple[str, Any]:
+    if message["channel"].decode() == PROGRESS_CHANNEL.format(task_id=task_id):
+        payload = json.loads(message["data"])
+        return payload.pop("state"), payload
+
+    meta = celery_app.backend.decode_result(message["data"])
+    return meta["status"], meta["result"]
+
+
+class ProgressSubscriber:
+    """Pub/sub connection shared by the progress waiters of a process.
+
+    The connection is opened for the first waiter and closed after the
+    last one; the channels of a task are subscribed to while at least
+    one waiter follows it, and each message is queued for every waiter
+    of its channel.
+    """
+
+    def __init__(self, redis: AsyncRedis) -> None:
+        """
+        Args:
+            redis: Asyncio Redis client of the result backend.
+        """
+        self.redis = redis
+        self._pubsub: PubSub | None = None
+        self._reader: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._queues: dict[str, set[asyncio.Queue]] = {}
+        self._confirmations: dict[str, asyncio.Future] = {}
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Queue the messages published for a task in this context.
+
+        The subscription is confirmed on entry, so no state stored after
+        it can be missed. A failure of the shared connection is queued
+        as the exception instead of a message.
+        """
+        channels = _task_channels(task_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        async with self._lock:
+            new = [
+                channel for channel in channels if channel not in self._queues
+            ]
+            for channel in channels:
+                self._queues.setdefault(channel, set()).add(queue)
+            if new:
+                if self._pubsub is None:
+                    self._pubsub = self.redis.pubsub()
+                loop = asyncio.get_running_loop()
+                for channel in new:
+                    self._confirmations[channel] = loop.create_future()
+                await self._pubsub.subscribe(*new)
+                if self._reader is None:
+                    self._reader = asyncio.create_task(self._read())
+            pending = [
+                self._confirmations[channel]
+                for channel in channels
+                if channel in self._confirmations
+            ]
+        try:
+            if pending:
+                # Not gather, which would cancel futures shared with
+                # other waiters if this one is cancelled
+                await asyncio.wait(pending)
+            yield queue
+        finally:
+            await self._unsubscribe(channels, queue)
+
+    async def _unsubscribe(
+        self, channels: list[str], queue: asyncio.Queue
+    ) -> None:
+        async with self._lock:
+            unused = []
+            for channel in channels:
+                queues = self._queues.get(channel)
+                if queues is None:
+                    continue
+                queues.discard(queue)
+                if not queues:
+                    del self._queues[channel]
+                    unused.append(channel)
+            if not self._queues:
+                await self._close()
+            elif unused:
+                await self._pubsub.unsubscribe(*unused)
+
+    async def _close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._confirmations.clear()
+
+    async def _read(self) -> None:
+        try:
+            async for message in self._pubsub.listen():
+                channel = message["channel"].decode()
+                if message["type"] == "subscribe":
+                    confirmation = self._confirmations.pop(channel, None)
+                    if confirmation is not None and not confirmation.done():
+                        confirmation.set_result(None)
+                elif message["type"] == "message":
+                    for queue in self._queues.get(channel, ()):
+                        queue.put_nowait(message)
+        except Exception as e:
+            logger.error(
+                f"Progress subscriber failed: {type(e).__name__}: {e}"
+            )
+            for confirmation in self._confirmations.values():
+                if not confirmation.done():
+                    confirmation.set_result(None)
+            for queues in self._queues.values():
+                for queue in queues:
+                    queue.put_nowait(e)
+            raise
+
+
+_subscribers: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, ProgressSubscriber
+] = weakref.WeakKeyDictionary()
+
+
+def get_subscriber(redis: AsyncRedis) -> ProgressSubscriber:
+    """Return the process-wide subscriber over redis (per event loop)."""
+    loop = asyncio.get_running_loop()
+    subscriber = _subscribers.get(loop)
+    if subscriber is None or subscriber.redis is not redis:
+        subscriber = _subscribers[loop] = ProgressSubscriber(redis)
+    return subscriber
+
+
+def _task_channels(task_id: str) -> list[str]:
+    return [
+        PROGRESS_CHANNEL.format(task_id=task_id),
+        celery_app.backend.get_key_for_task(task_id).decode(),
+    ]
+
+
+async def _next_message(queue: asyncio.Queue, timeout: float) -> dict | None:
+    try:
+        message = await asyncio.wait_for(queue.get(), max(timeout, 0.0))
+    except TimeoutError:
+        return None
+    if isinstance(message, Exception):
+        raise message
+    return message
+
+
+def _reveal_schedule(state: str, info: Any) -> RevealSchedule | None:
+    if state == "SUCCESS" and isinstance(info, dict) and info.get("reveal"):
+        return RevealSchedule.from_meta(info["reveal"])
+    return None
+
+
+def _next_reveal_delay(schedule: RevealSchedule, now: float) -> float:
+    """Seconds until the next digit is revealed, coalescing fast reveals
+    to at most one wake-up per STREAM_MIN_INTERVAL."""
+    revealed = schedule.revealed_chars(now)
+    next_at = schedule.started_at + schedule.elapsed_before(revealed)
+    return max(next_at - now, settings.STREAM_MIN_INTERVAL)
+
+
+async def _reveal_events(
+    schedule: RevealSchedule, pi_value: str, with_digits: bool
+) -> AsyncIterator[StreamEvent]:
+    """Events of a virtual reveal, at most one per STREAM_MIN_INTERVAL."""
+    sent = 0  # Characters of pi_value already sent
+    while True:
+        now = time.time()
+        if schedule.is_finished(now):
+            event = {"state": "FINISHED", "progress": 1.0, "result": pi_value}
+            if with_digits:
+                event["digits"] = pi_value[sent:]
+            yield "finished", event
+            return
+
+        event = {
+            "state": "PROGRESS",
+            "progress": schedule.progress(now),
+            "result": None,
+        }
+        if with_digits:
+            prefix = schedule.revealed_prefix(pi_value, now)
+            event["digits"] = prefix[sent:]
+            sent = len(prefix)
+        yield "progress", event
+
+        await asyncio.sleep(
+            min(_next_reveal_delay(schedule, now), settings.STREAM_KEEPALIVE)
+        )
+
+
+async def progress_events(
+    task_id: str, redis: AsyncRedis, with_digits: bool = False
+) -> AsyncIterator[StreamEvent]:
+    """Stream the progress events of a task until it finishes or fails.
+
+    The first event is the task's current state, later ones are pushed
+    as the worker publishes them. A keepalive event is emitted after
+    settings.STREAM_KEEPALIVE seconds without updates.
+
+    Args:
+        task_id: Id of the task to follow.
+        redis: Asyncio Redis client of the result backend.
+        with_digits: Include the digits revealed since the previous event.
+
+    Yields:
+        Stream events, ending with a "finished", "cancelled" or "error"
+        event.
+
+    Raises:
+        TaskNotFoundError: If the task was never created (before any
+                           event is yielded).
+    """
+    # Subscribed before reading the state, so no update can be missed
+    async with get_subscriber(redis).subscribe(task_id) as messages:
+        state, info = await read_state(redis, task_id)
+        last_event = None
+
+        while True:
+            schedule = _reveal_schedule(state, info)
+            if schedule is not None:
+                finished = ProgressResponse(
+                    state="FINISHED", progress=1.0, result=info["result"]
+                )
+                await load_results(redis, [(finished, info)])
+                async for event in _reveal_events(
+                    schedule, finished.result, with_digits
+                ):
+                    yield event
+                return
+
+            try:
+                response = resolve_progress(state, info)
+            except TaskFailedError:
+                yield "error", {"detail": "Task execution failed"}
+                return
+
+            if response.state == "FINISHED":
+                await load_results(redis, [(response, info)])
+            event = response.model_dump()
+            if response.state == "FINISHED":
+                if with_digits:
+                    event["digits"] = response.result
+                yield "finished", event
+                return
+            if response.state == "CANCELLED":
+                yield "cancelled", event
+                return
+            if event != last_event:
+                # Both channels carry the same progress writes
+                yield "progress", event
+                last_event = event
+
+            message = await _next_message(messages, settings.STREAM_KEEPALIVE)
+            if message is None:
+                yield "keepalive", {}
+                continue
+            state, info = _decode_message(task_id, message)
+
+
+async def wait_for_progress(
+    task_id: str,
+    redis: AsyncRedis,
+    timeout: float,
+    if_none_match: str | None = None,
+) -> tuple[str, Any]:
+    """Wait until the progress of a task changes, for a long poll.
+
+    Updates are pushed on the channels progress streams subscribe to;
+    during a virtual reveal, the wait ends when the next digit shows.
+    Finished, cancelled and failed tasks never change, so they are
+    returned at once.
+
+    Args:
+        task_id: Id of the task to follow.
+        redis: Asyncio Redis client of the result backend.
+        timeout: Longest wait in seconds.
+        if_none_match: If-None-Match header: the wait lasts while the
+                       progress matches it; while the progress is the
+                       one at the time of the call when None.
+
+    Returns:
+        The task's (state, info), as read_state returns them; still
+        matching if the timeout expired first.
+
+    Raises:
+        TaskNotFoundError: If the task was never created.
+    """
+    # Subscribed before reading the state, so no update can be missed
+    async with get_subscriber(redis).subscribe(task_id) as messages:
+        deadline = time.monotonic() + timeout
+        state, info = await read_state(redis, task_id)
+        while True:
+            try:
+                response = resolve_progress(state, info)
+            except TaskFailedError:
+                return state, info
+            etag = progress_etag(task_id, response)
+            if if_none_match is None:
+                if_none_match = etag
+            remaining = deadline - time.monotonic()
+            if (
+                response.state != "PROGRESS"
+                or not etag_matches(if_none_match, etag)
+                or remaining <= 0
+            ):
+                return state, info
+
+            schedule = _reveal_schedule(state, info)
+            if schedule is not None:
+                delay = _next_reveal_delay(schedule, time.time())
+                await asyncio.sleep(min(delay, remaining))
+                continue
+            message = await _next_message(messages, remaining)
+            if message is not None:
+                state, info = _decode_message(task_id, message)
+
+
+def format_sse(event: str, data: dict[str, Any]) -> str:
+    """Encode a stream event as a Server-Sent Events message."""
+    if event == "keepalive":
+        return ": keepalive\n\n"
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,200 @@
+"""Translation of Celery task states into API progress responses."""
+
+import hashlib
+import math
+import time
+from typing import Any
+
+from redis.asyncio import Redis as AsyncRedis
+
+from app.celery_app import celery_app
+from app.reveal import RevealSchedule
+from app.schemas import ProgressResponse
+from app.settings import settings
+from app.storage import load_packed_results
+
+
+class TaskNotFoundError(Exception):
+    """The task id is unknown to the result backend."""
+
+
+class TaskFailedError(Exception):
+    """The task failed during execution."""
+
+
+def resolve_progress(
+    state: str, info: Any, now: float | None = None
+) -> ProgressResponse:
+    """Build the progress response of a task from its backend state.
+
+    Finished results carrying a reveal schedule are reported as still in
+    progress until the schedule has played out at timestamp now. The
+    time left is derived from the schedule, or from the expected finish
+    time the task reports while it computes (see app.cost_model).
+
+    Args:
+        state: Celery task state.
+        info: Task meta (progress info, result or exception).
+        now: Current timestamp, time.time() by default.
+
+    Returns:
+        Current state, progress, and result (if finished).
+
+    Raises:
+        TaskNotFoundError: If the task was never created.
+        TaskFailedError: If the task failed.
+    """
+    # PENDING with no info means task was never created
+    if state == "PENDING" and info is None:
+        raise TaskNotFoundError()
+
+    if state == "FAILURE":
+        raise TaskFailedError(str(info) if info else "Unknown error")
+
+    if state == "REVOKED":
+        return ProgressResponse(state="CANCELLED", progress=0.0, result=None)
+
+    now = time.time() if now is None else now
+    if state == "SUCCESS":
+        result = info or {}
+        if result.get("reveal") is not None:
+            schedule = RevealSchedule.from_meta(result["reveal"])
+            if not schedule.is_finished(now):
+                return ProgressResponse(
+                    state="PROGRESS",
+                    progress=schedule.progress(now),
+                    result=None,
+                    eta_seconds=max(
+                        schedule.started_at + schedule.duration - now, 0.0
+                    ),
+                )
+        return ProgressResponse(
+            state="FINISHED",
+            progress=1.0,
+            result=result.get("result"),
+            eta_seconds=0.0,
+        )
+
+    # Task in progress (STARTED, PROGRESS, or any other state)
+    info = info or {}
+    eta_at = info.get("eta_at")
+    return ProgressResponse(
+        state="PROGRESS",
+        progress=info.get("progress", 0.0),
+        result=None,
+        partial_result=info.get("partial_result"),
+        eta_seconds=None if eta_at is None else max(eta_at - now, 0.0),
+        estimated_peak_bytes=info.get("estimated_peak_bytes"),
+    )
+
+
+def progress_etag(task_id: str, response: ProgressResponse) -> str:
+    """Weak ETag of a task's progress response.
+
+    It changes with the state, the progress and the partial result, but
+    not with eta_seconds, which drifts with the clock alone, nor with the
+    result, which is final once the task finished (and may be large).
+    """
+    partial = response.partial_result or ""
+    key = f"{task_id}:{response.state}:{response.progress!r}:{len(partial)}"
+    return f'W/"{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison)."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def retry_after(response: ProgressResponse) -> int | None:
+    """Seconds a polling client should wait before checking again.
+
+    Estimated from the task's expected progress rate as the time it takes
+    to advance by settings.PROGRESS_MIN_DELTA, the smallest advance that
+    is always written, within 1 to settings.POLL_RETRY_AFTER_MAX seconds.
+
+    Returns:
+        The hint, None for settled tasks or without an expected finish.
+    """
+    if response.state != "PROGRESS" or response.eta_seconds is None:
+        return None
+    remaining = 1.0 - response.progress
+    seconds = response.eta_seconds
+    if remaining > settings.PROGRESS_MIN_DELTA:
+        seconds *= settings.PROGRESS_MIN_DELTA / remaining
+    return max(1, min(math.ceil(seconds), settings.POLL_RETRY_AFTER_MAX))
+
+
+def decode_state(payload: bytes | None) -> tuple[str, Any]:
+    """State and info of a task from its raw result backend meta.
+
+    Args:
+        payload: Value of the task's meta key, None if it does not exist.
+
+    Returns:
+        (state, info) as resolve_progress takes them; unknown tasks are
+        ("PENDING", None), like AsyncResult reports them.
+    """
+    if payload is None:
+        return "PENDING", None
+    meta = celery_app.backend.decode_result(payload)
+    return meta["status"], meta["result"]
+
+
+async def read_state(redis: AsyncRedis, task_id: str) -> tuple[str, Any]:
+    """Read the backend state of a task without blocking the event loop."""
+    if not task_id:
+        # Celery has no meta key for an empty id, it is simply unknown
+        return decode_state(None)
+    key = celery_app.backend.get_key_for_task(task_id)
+    return decode_state(await redis.get(key))
+
+
+async def read_states(
+    redis: AsyncRedis, task_ids: list[str]
+) -> dict[str, tuple[str, Any]]:
+    """Read the backend state of many tasks in a single MGET.
+
+    Args:
+        redis: Asyncio Redis client of the result backend.
+        task_ids: Ids of the tasks to read.
+
+    Returns:
+        Mapping of task id to (state, info), see decode_state.
+    """
+    backend = celery_app.backend
+    payloads = await redis.mget(
+        [backend.get_key_for_task(task_id) for task_id in task_ids]
+    )
+    return {
+        task_id: decode_state(payload)
+        for task_id, payload in zip(task_ids, payloads)
+    }
+
+
+async def load_results(
+    redis: AsyncRedis, entries: list[tuple[ProgressResponse, Any]]
+) -> None:
+    """Fill in the packed results of finished responses, in one MGET.
+
+    Args:
+        redis: Asyncio Redis client.
+        entries: Responses built by resolve_progress with the task info
+                 they were built from; finished ones whose result is
+                 stored packed get it loaded in place.
+    """
+    pending = [
+        (response, info["result_ref"])
+        for response, info in entries
+        if response.state == "FINISHED"
+        and response.result is None
+        and isinstance(info, dict)
+        and info.get("result_ref")
+    ]
+    results = await load_packed_results(redis, [ref for _, ref in pending])
+    for (response, _), result in zip(pending, results):
+        response.result = result
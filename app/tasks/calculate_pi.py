@@ -1,46 +1,412 @@
-import math
 import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 
+from celery import Task
+from celery.exceptions import Ignore
 from loguru import logger
-from mpmath import mp
 
+from app.cancellation import (
+    CancellationCheck,
+    TaskCancelledError,
+    is_cancelled,
+)
 from app.celery_app import celery_app
+from app.checkpoints import Checkpointer
+from app.cost_model import EtaTracker, estimate_cost, reveal_seconds
+from app.digits import StablePrefix, format_pi
+from app.engines import (
+    PiEngine,
+    get_engine,
+    record_throughput,
+    run_engine,
+    select_engine,
+)
+from app.metrics import (
+    DIGIT_STORE_LOOKUPS,
+    observe_phase,
+    observe_queue_wait,
+)
+from app.phases import PhaseTimer, phase
+from app.profiling import get_profiling_config, profiled
+from app.progress import ProgressCallback, ProgressReporter
+from app.redis_client import get_redis
+from app.reveal import RevealSchedule
 from app.schemas.progress_response import ProgressResponse
+from app.settings import settings
+from app.singleflight import close_subscriptions, release
+from app.storage import get_digit_store, store_packed_result
+from app.storage.checkpoints import (
+    checkpoint_path,
+    find_checkpoint,
+    record_checkpoint,
+    remove_checkpoint,
+)
+
+
+def _get_digits(
+    n_digits: int,
+    algorithm: str | None = None,
+    on_progress: ProgressCallback | None = None,
+    on_block: Callable[[str], None] | None = None,
+    task_id: str | None = None,
+    engine_name: str | None = None,
+) -> str:
+    """Return enough truncated digits to round Pi to n_digits decimals.
+
+    Served from the digit store whenever a long enough expansion has
+    already been computed; otherwise computed with the requested engine
+    (else engine_name, picked at submission, else the one select_engine
+    picks now) and appended to the store.
+    Streaming engines pass each block of digits to on_block as they
+    compute it. Long computations of a task are checkpointed under its
+    task_id (see checkpointing).
+    """
+    n_chars = n_digits + 2  # Leading "3", n decimals and a rounding digit
+    store = get_digit_store()
+
+    with phase("digit_store_read"):
+        digits = store.read(n_chars)
+    if digits is not None:
+        DIGIT_STORE_LOOKUPS.labels("hit").inc()
+        logger.info(f"Serving {n_digits} decimals from the digit store")
+        return digits
+    DIGIT_STORE_LOOKUPS.labels("miss").inc()
+
+    redis = get_redis()
+    if algorithm is not None:
+        engine = get_engine(algorithm)
+    elif engine_name is not None:
+        engine = get_engine(engine_name)
+    else:
+        engine = select_engine(n_chars, redis)
+
+    with phase("compute"), checkpointing(task_id, engine, n_chars):
+        run = run_engine(engine, n_chars, on_progress, on_block)
+    observe_phase("compute", n_chars, run.elapsed)
+    record_throughput(redis, run, selected=algorithm is None)
+    with phase("digit_store_write"):
+        store.extend(run.digits)
+    return run.digits
+
+
+@contextmanager
+def checkpointing(
+    task_id: str | None, engine: PiEngine, n_chars: int
+) -> Iterator[None]:
+    """Checkpoint an engine run of a task, if it is long enough.
+
+    Runs estimated to take settings.CHECKPOINT_MIN_SECONDS or more save
+    their state every settings.CHECKPOINT_INTERVAL seconds, at the path
+    recorded for the task, which a redelivered task resumes from. The
+    checkpoint is deleted once the run returns or raises; it is only
+    kept when the worker is killed or shut down in the middle of it.
+    """
+    cost = estimate_cost(n_chars - 2, engine.name)
+    if task_id is None or cost.seconds < settings.CHECKPOINT_MIN_SECONDS:
+        yield
+        return
+
+    redis = get_redis()
+    checkpointer = Checkpointer(
+        find_checkpoint(redis, task_id) or checkpoint_path(task_id),
+        interval=settings.CHECKPOINT_INTERVAL,
+        on_save=lambda path: record_checkpoint(redis, task_id, path),
+    )
+    with checkpointer.activate():
+        try:
+            yield
+        except Exception:
+            remove_checkpoint(redis, task_id)
+            raise
+    remove_checkpoint(redis, task_id)
 
 
 @celery_app.task(bind=True)
-def calculate_pi_task(self, n_digits: int) -> ProgressResponse:
+def calculate_pi_task(
+    self,
+    n_digits: int,
+    algorithm: str | None = None,
+    engine: str | None = None,
+) -> ProgressResponse:
     """Calculate Pi using the most 'efficient' algorithm available:
     calculate Pi immediately, but reveal each digit with exponentially
-    decreasing delay.
+    decreasing delay (see app.reveal for the schedule).
+
+    Streaming engines are not revealed: their progress follows the
+    digits actually computed, and the final prefix of the result is
+    published as "partial_result" while they run.
 
-     The delay formula: delay = 5.0 * exp(-8.0 * f), f = (i / n_digits)
-    - First digit (f = 0):       5 seconds
-    - Middle digit (f = 0.5):   ~0.1 seconds
-    - Last digit (f = 1):     ~0.001 seconds
+    The wall-clock time of each phase of the task (see app.phases) is
+    recorded in its result as "phases", and the task is profiled when
+    enabled (see app.profiling). Cancelled tasks stop at their next
+    progress report or engine cancellation point (see app.cancellation).
 
     Args:
         n_digits: Number of decimal digits to calculate.
+        algorithm: Name of the Pi engine requested by the client.
+        engine: Engine picked for the request at submission when no
+                algorithm was requested (see select_engine), which its
+                cost estimate and queue were based on; picked by the
+                worker when omitted as well.
 
     Returns:
         ProgressResponse: {state, progress, result}
     """
     logger.info(f"Starting Pi calculation for {n_digits} decimals")
+    observe_queue_wait(self, n_digits + 2)
+
+    timer = PhaseTimer()
+    config = get_profiling_config(get_redis())
+    try:
+        with (
+            timer.activate(),
+            profiled(self.request.id, n_digits, config) as profile,
+        ):
+            result = _calculate(self, n_digits, algorithm, engine)
+    except TaskCancelledError:
+        logger.info(f"Task {self.request.id} cancelled")
+        mark_cancelled(self.request.id)
+        raise Ignore()
+
+    result["phases"] = timer.to_meta()
+    if profile:
+        result["profile"] = profile
+    logger.info(
+        f"Phases of task {self.request.id}: "
+        + ", ".join(f"{name}={s:.3f}s" for name, s in timer.seconds.items())
+    )
+    return result
+
 
-    total_chars = n_digits + 1
+def _calculate(
+    task: Task, n_digits: int, algorithm: str | None, engine: str | None
+) -> dict:
+    reporter = progress_reporter(task)
+    estimate = estimate_cost(n_digits, algorithm or engine)
+    eta = EtaTracker(estimate, reveal_seconds(n_digits, estimate.engine))
+    check_cancelled = CancellationCheck(get_redis(), task.request.id)
+
+    def on_progress(fraction: float) -> None:
+        check_cancelled()
+        reporter.report(
+            fraction,
+            {
+                "progress": 0.0,
+                "result": None,
+                "compute_progress": fraction,
+                **eta.meta(fraction),
+            },
+        )
 
-    mp.dps = n_digits + 10  # Set decimal places precision (with buffer)
-    pi_value = mp.nstr(mp.pi, total_chars, strip_zeros=False)
+    streamed = StablePrefix(n_digits)
+
+    def on_block(block: str) -> None:
+        check_cancelled()
+        streamed.extend(block)
+        fraction = len(streamed) / (n_digits + 2)
+        reporter.report(
+            fraction,
+            lambda: {
+                "progress": fraction,
+                "result": None,
+                "partial_result": streamed.prefix(),
+                **eta.meta(fraction),
+            },
+        )
+
+    try:
+        check_cancelled()
+        with check_cancelled.activate():
+            digits = _get_digits(
+                n_digits,
+                algorithm,
+                on_progress,
+                on_block,
+                task.request.id,
+                engine,
+            )
+        reporter.flush()
+        with phase("subscribers"):
+            finish_subscribers(task.request.id, algorithm, digits)
+        if streamed:
+            logger.info(f"Calculation complete: {n_digits} digits streamed")
+            return finished_result(
+                format_pi(digits, n_digits), task_id=task.request.id
+            )
+        return reveal(task, format_pi(digits, n_digits))
+    except Exception as e:
+        fail_subscribers(task.request.id, algorithm, e)
+        raise
+    finally:
+        with phase("release"):
+            release(get_redis(), algorithm, n_digits, task.request.id)
+
+
+def progress_reporter(task: Task) -> ProgressReporter:
+    """Progress reporter of a running task configured from settings."""
+    redis = get_redis() if settings.PROGRESS_PUBSUB else None
+    return ProgressReporter(task, redis=redis)
+
+
+def finish_subscribers(
+    task_id: str, algorithm: str | None, digits: str
+) -> None:
+    """Finish the aliases subscribed to a task with their rounded prefix.
+
+    Args:
+        task_id: Id of the task the aliases subscribed to.
+        algorithm: Engine name the task was claimed under.
+        digits: Truncated digits computed by the task.
+    """
+    redis = get_redis()
+    subscribers = close_subscriptions(redis, algorithm, task_id)
+    for alias_id, n_digits in subscribers.items():
+        if is_cancelled(redis, alias_id):
+            continue
+        # Aliases are always revealed virtually, they hold no worker slot
+        pi_value = format_pi(digits, n_digits)
+        schedule = RevealSchedule(
+            total_chars=len(pi_value) - 1, started_at=time.time()
+        )
+        celery_app.backend.store_result(
+            alias_id,
+            finished_result(pi_value, schedule, task_id=alias_id),
+            "SUCCESS",
+        )
+        logger.info(f"Alias {alias_id} finished from task {task_id}")
+
+
+def fail_subscribers(
+    task_id: str, algorithm: str | None, error: Exception
+) -> None:
+    """Fail the aliases subscribed to a task that failed."""
+    redis = get_redis()
+    subscribers = close_subscriptions(redis, algorithm, task_id)
+    for alias_id in subscribers:
+        if not is_cancelled(redis, alias_id):
+            celery_app.backend.mark_as_failure(alias_id, error)
+
+
+def mark_cancelled(task_id: str) -> None:
+    """Store the REVOKED state of a cancelled task.
+
+    The backend never replaces a SUCCESS state, so the result of a task
+    cancelled during its virtual reveal is forgotten first.
+    """
+    backend = celery_app.backend
+    if backend.get_state(task_id) == "SUCCESS":
+        backend.forget(task_id)
+    backend.mark_as_revoked(task_id, reason="cancelled")
+
+
+def reveal(task: Task, pi_value: str, start_progress: float = 0.0) -> dict:
+    """Reveal the calculated digits according to settings.REVEAL_MODE.
+
+    In "virtual" mode the result is returned right away together with its
+    reveal schedule, and /check_progress derives the progress from the
+    elapsed time, so the worker slot is freed immediately. In "worker"
+    mode the worker sleeps through the schedule, reporting its progress.
+
+    Args:
+        task: Bound task whose state is updated.
+        pi_value: Formatted Pi value to reveal.
+        start_progress: Progress already reported before the reveal;
+                        the reveal covers the remaining range up to 1.0.
+
+    Returns:
+        ProgressResponse: {state, progress, result}, plus the reveal
+        schedule in "virtual" mode.
+    """
+    schedule = RevealSchedule(
+        total_chars=len(pi_value) - 1,  # Digits without the decimal point
+        started_at=time.time(),
+        start_progress=start_progress,
+    )
+    if settings.REVEAL_MODE == "worker":
+        with phase("reveal"):
+            _reveal_in_worker(task, schedule)
+        observe_phase(
+            "reveal", schedule.total_chars, time.time() - schedule.started_at
+        )
+        return finished_result(pi_value, task_id=task.request.id)
+
+    # Played out by the API from now on
+    observe_phase("reveal", schedule.total_chars, schedule.duration)
+
+    logger.info(
+        f"Calculation complete: {len(pi_value) - 1} digits. "
+        f"(virtual reveal over {schedule.duration:.2f}s)"
+    )
+    return finished_result(pi_value, schedule, task_id=task.request.id)
+
+
+def finished_result(
+    pi_value: str,
+    schedule: RevealSchedule | None = None,
+    task_id: str | None = None,
+) -> dict:
+    """Task result of a finished calculation.
+
+    Results of at least settings.RESULT_PACK_MIN_DIGITS digits are stored
+    packed under their own key (see app.storage.results), and the task
+    result only references them.
+
+    Args:
+        pi_value: Formatted Pi value.
+        schedule: Reveal schedule still to be played out by the API.
+        task_id: Id of the task the result belongs to; results are only
+                 packed when given.
+
+    Returns:
+        ProgressResponse: {state, progress, result}, plus the reveal
+        schedule and the packed result reference if any.
+    """
+    packed = (
+        task_id is not None and len(pi_value) > settings.RESULT_PACK_MIN_DIGITS
+    )
+    response = ProgressResponse(
+        state="FINISHED",
+        progress=1.0,
+        result=None if packed else pi_value,
+    ).model_dump(
+        # Derived by the API from the task state (see app.task_state)
+        exclude={"eta_seconds", "estimated_peak_bytes"}
+    )
+    if packed:
+        with phase("result_write"):
+            response["result_ref"] = store_packed_result(
+                get_redis(), task_id, pi_value
+            )
+    if schedule is not None:
+        response["reveal"] = schedule.to_meta()
+    return response
+
+
+def _reveal_in_worker(task: Task, schedule: RevealSchedule) -> None:
+    """Sleep through a reveal schedule, reporting its progress.
+
+    Progress writes are rate-limited by a ProgressReporter, so their
+    number is bounded by the reveal duration rather than the digits.
+
+    Raises:
+        TaskCancelledError: If the task is cancelled during the reveal.
+    """
+    total_chars = schedule.total_chars
+    reporter = progress_reporter(task)
+    check_cancelled = CancellationCheck(get_redis(), task.request.id)
+    eta_at = schedule.started_at + schedule.duration
 
     total_time = 0.0
     for i in range(total_chars):
-        progress_ratio = i / max(total_chars - 1, 1)
-        delay = 5.0 * math.exp(-8.0 * progress_ratio)
+        delay = schedule.delay(i)
 
-        progress = (i + 1) / total_chars
-        self.update_state(
-            state="PROGRESS",
-            meta={"progress": progress, "result": None},
+        progress = schedule.start_progress + (
+            1.0 - schedule.start_progress
+        ) * ((i + 1) / total_chars)
+        check_cancelled()
+        reporter.report(
+            progress, {"progress": progress, "result": None, "eta_at": eta_at}
         )
 
         time.sleep(delay)
@@ -53,13 +419,5 @@ def calculate_pi_task(self, n_digits: int) -> ProgressResponse:
                 f"(current delay: {delay:.3f}s)"
             )
 
-    logger.info(
-        f"Calculation complete: {pi_value}. (total time: {total_time:.2f}s)"
-    )
-
-    response = ProgressResponse(
-        state="FINISHED",
-        progress=1.0,
-        result=pi_value,
-    )
-    return response.model_dump()
+    reporter.flush()
+    logger.info(f"Calculation complete. (total time: {total_time:.2f}s)")
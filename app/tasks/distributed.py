@@ -0,0 +1,207 @@
+"""Distributed computation of one huge request across Celery workers.
+
+The Chudnovsky term range is split into parts, each computed by its own
+binary_split_range_task (a chord header). The partial P, Q, T products
+are exchanged through the shared scratch directory, and the chord body
+merge_partials_task combines them, converts the result to decimal and
+reveals it. The task_id returned to clients is the merge task's id, so
+/check_progress works unchanged: header tasks publish the aggregated
+progress under that id while the merge task is still waiting.
+"""
+
+from celery import chord, group
+from celery.exceptions import Ignore
+from loguru import logger
+
+from app.cancellation import (
+    TaskCancelledError,
+    is_cancelled,
+)
+from app.celery_app import celery_app
+from app.digits import format_pi
+from app.engines.chudnovsky import (
+    binary_split,
+    merge_all,
+    pi_from_split,
+    split_ranges,
+    terms_for,
+)
+from app.redis_client import get_redis
+from app.settings import settings
+from app.singleflight import release
+from app.storage import get_digit_store, published_high_water_mark
+from app.storage.partials import load_partial, remove_job, save_partial
+from app.tasks.calculate_pi import (
+    fail_subscribers,
+    finish_subscribers,
+    mark_cancelled,
+    reveal,
+)
+
+
+JOB_PARTS_DONE_KEY = "pi:job:{job_id}:done"
+JOB_KEY_TTL = 24 * 60 * 60
+
+# Share of the overall progress covered by the distributed compute phase
+COMPUTE_SHARE = 0.5
+
+
+def should_distribute(n_digits: int, algorithm: str | None) -> bool:
+    """Whether a request is large enough to be fanned out as a chord.
+
+    Only Chudnovsky requests are distributed, and never when a worker's
+    digit store already holds enough digits to serve them.
+    """
+    if n_digits < settings.DISTRIBUTED_MIN_DIGITS:
+        return False
+    if algorithm not in (None, "chudnovsky"):
+        return False
+    return published_high_water_mark(get_redis()) < n_digits + 2
+
+
+def start_distributed_calculation(
+    n_digits: int, algorithm: str | None, job_id: str, priority: int
+) -> str:
+    """Fan a request out as a chord of binary splitting subtasks.
+
+    Parts are queued on settings.PARTS_QUEUE, the merge task on
+    settings.HEAVY_QUEUE (see app.celery_app), all with the priority.
+
+    Args:
+        n_digits: Number of decimal digits to calculate.
+        algorithm: Requested engine name, used as the single-flight key.
+        job_id: Task id of the merge task.
+        priority: Queue priority of every task of the job (see
+                  app.routing).
+
+    Returns:
+        Task id of the merge task, used by clients to check progress.
+    """
+    ranges = split_ranges(
+        0, terms_for(n_digits + 2), settings.DISTRIBUTED_PARTS
+    )
+
+    header = group(
+        binary_split_range_task.s(job_id, a, b, len(ranges)).set(
+            priority=priority
+        )
+        for a, b in ranges
+    )
+    body = (
+        merge_partials_task.s(n_digits, algorithm)
+        .set(priority=priority)
+        .on_error(abandon_distributed_job_task.s(n_digits, algorithm))
+    )
+    chord(header, body).apply_async(task_id=job_id)
+
+    logger.info(
+        f"Distributed job {job_id} started for {n_digits} digits "
+        f"({len(ranges)} parts)"
+    )
+    return job_id
+
+
+@celery_app.task
+def binary_split_range_task(job_id: str, a: int, b: int, parts: int) -> str:
+    """Compute the P, Q, T products of the term range [a, b).
+
+    Args:
+        job_id: Id of the distributed job (its merge task id).
+        a: First term index (inclusive).
+        b: Last term index (exclusive).
+        parts: Total number of parts of the job, for progress reporting.
+
+    Returns:
+        Path of the partial products in the scratch directory, empty if
+        the job was cancelled (the merge task then cleans up).
+    """
+    redis = get_redis()
+    if is_cancelled(redis, job_id):
+        logger.info(f"Job {job_id} cancelled, skipping terms [{a}, {b})")
+        return ""
+    pqt = binary_split(a, b)
+    if is_cancelled(redis, job_id):
+        # Not saved nor reported: the job is already stored as cancelled
+        return ""
+    path = save_partial(job_id, a, b, pqt)
+
+    done_key = JOB_PARTS_DONE_KEY.format(job_id=job_id)
+    done = redis.incr(done_key)
+    redis.expire(done_key, JOB_KEY_TTL)
+
+    celery_app.backend.store_result(
+        job_id,
+        {"progress": COMPUTE_SHARE * done / parts, "result": None},
+        "PROGRESS",
+    )
+    logger.info(f"Job {job_id}: terms [{a}, {b}) done ({done}/{parts})")
+    return path
+
+
+# Not tracking STARTED keeps the aggregated progress visible until the
+# merge task reports its own
+@celery_app.task(bind=True, track_started=False)
+def merge_partials_task(
+    self, paths: list[str], n_digits: int, algorithm: str | None = None
+) -> dict:
+    """Merge the partial products of a job and reveal the result.
+
+    Args:
+        paths: Partial products of adjacent term ranges, in order.
+        n_digits: Number of decimal digits to calculate.
+        algorithm: Requested engine name, used as the single-flight key.
+
+    Returns:
+        ProgressResponse: {state, progress, result}
+    """
+    try:
+        if is_cancelled(get_redis(), self.request.id):
+            raise TaskCancelledError(f"Task {self.request.id} was cancelled")
+        self.update_state(
+            state="PROGRESS",
+            meta={"progress": COMPUTE_SHARE, "result": None},
+        )
+
+        _, q, t = merge_all([load_partial(path) for path in paths])
+        digits = pi_from_split(q, t, n_digits + 2)
+        get_digit_store().extend(digits)
+        finish_subscribers(self.request.id, algorithm, digits)
+        remove_job_files(self.request.id)
+
+        return reveal(
+            self, format_pi(digits, n_digits), start_progress=COMPUTE_SHARE
+        )
+    except TaskCancelledError as e:
+        logger.info(f"Distributed job {self.request.id} cancelled")
+        fail_subscribers(self.request.id, algorithm, e)
+        remove_job_files(self.request.id)
+        mark_cancelled(self.request.id)
+        raise Ignore()
+    except Exception as e:
+        fail_subscribers(self.request.id, algorithm, e)
+        raise
+    finally:
+        release(get_redis(), algorithm, n_digits, self.request.id)
+
+
+@celery_app.task
+def abandon_distributed_job_task(
+    request, exc: Exception, traceback, n_digits: int, algorithm: str | None
+) -> None:
+    """Errback of a failed job: fail its subscribers and clean up.
+
+    Called when a header task fails, in which case the merge task never
+    runs to release the job's single-flight claim itself.
+    """
+    job_id = request.id
+    logger.error(f"Distributed job {job_id} failed: {exc}")
+
+    fail_subscribers(job_id, algorithm, exc)
+    release(get_redis(), algorithm, n_digits, job_id)
+    remove_job_files(job_id)
+
+
+def remove_job_files(job_id: str) -> None:
+    """Delete the partial products and the progress counter of a job."""
+    remove_job(job_id)
+    get_redis().delete(JOB_PARTS_DONE_KEY.format(job_id=job_id))
@@ -0,0 +1,62 @@
+from celery.exceptions import Ignore
+from loguru import logger
+
+from app.cancellation import CancellationCheck, TaskCancelledError
+from app.celery_app import celery_app
+from app.engines.bbp import hex_digits_batch
+from app.redis_client import get_redis
+from app.schemas.progress_response import ProgressResponse
+from app.tasks.calculate_pi import mark_cancelled, progress_reporter
+
+
+# Positions evaluated per vectorized batch (and per progress report)
+GROUP_SIZE = 64
+
+
+@celery_app.task(bind=True)
+def extract_hex_digits_task(
+    self, positions: list[int], count: int = 1
+) -> dict:
+    """Extract hexadecimal digits of Pi at arbitrary positions with BBP.
+
+    Positions are processed in ascending order, in groups of similar
+    size, and progress reflects the share of series terms evaluated.
+    Cancelled tasks stop before their next group (see app.cancellation).
+
+    Args:
+        positions: 0-based indices of hex digits after the point.
+        count: Number of hex digits per position.
+
+    Returns:
+        ProgressResponse: {state, progress, result}, plus "hex_digits"
+        mapping each position to its digits.
+    """
+    positions = sorted(set(positions))
+    logger.info(f"Extracting hex digits at {len(positions)} positions")
+
+    reporter = progress_reporter(self)
+    check_cancelled = CancellationCheck(get_redis(), self.request.id)
+    total_terms = sum(position + 1 for position in positions)
+    done_terms = 0
+
+    digits = {}
+    try:
+        for i in range(0, len(positions), GROUP_SIZE):
+            check_cancelled()
+            group = positions[i : i + GROUP_SIZE]
+            for position, value in zip(group, hex_digits_batch(group, count)):
+                # JSON object keys are strings
+                digits[str(position)] = value
+            done_terms += sum(position + 1 for position in group)
+            reporter.report(done_terms / total_terms)
+    except TaskCancelledError:
+        logger.info(f"Task {self.request.id} cancelled")
+        mark_cancelled(self.request.id)
+        raise Ignore()
+    reporter.flush()
+
+    response = ProgressResponse(
+        state="FINISHED", progress=1.0, result=None
+    ).model_dump()
+    response["hex_digits"] = digits
+    return response
@@ -0,0 +1,6 @@
+"""Performance benchmarks of the engines, the task pipeline and the API.
+
+Run with ``just bench`` (or ``python -m benchmarks``); see __main__ for
+the options. Every suite returns Metric values, written to a JSON file
+that later runs compare against to fail on regressions.
+"""
@@ -0,0 +1,173 @@
+"""Run the benchmarks, write their results and check for regressions.
+
+Examples:
+    python -m benchmarks --output baseline.json
+    python -m benchmarks --baseline baseline.json --max-regression 0.2 \\
+        --threshold 'api.*=0.5'
+"""
+
+import argparse
+import sys
+
+from loguru import logger
+
+from app.cost_model import save_cost_model
+from benchmarks import api, engines, pipeline
+from benchmarks.environment import redis_environment
+from benchmarks.metrics import (
+    Metric,
+    find_regressions,
+    peak_rss_mb,
+    read_results,
+    write_results,
+)
+
+
+SUITES = ("engines", "pipeline", "api")
+
+
+def _sizes(max_digits: int, min_digits: int = 100) -> list[int]:
+    return [
+        10**exponent
+        for exponent in range(len(str(min_digits)) - 1, len(str(max_digits)))
+    ]
+
+
+def _threshold(value: str) -> tuple[str, float]:
+    pattern, _, fraction = value.partition("=")
+    try:
+        return pattern, float(fraction)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Expected PATTERN=FRACTION, got {value!r}"
+        ) from None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument(
+        "--suite",
+        action="append",
+        choices=SUITES,
+        help="Suite to run (repeatable), all of them by default",
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmark-results.json",
+        help="JSON file the results are written to",
+    )
+    parser.add_argument(
+        "--baseline", help="Results file to compare against for regressions"
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.25,
+        help="Allowed relative worsening of any metric (default: 0.25)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=_threshold,
+        action="append",
+        default=[],
+        metavar="GLOB=FRACTION",
+        help="Allowed worsening of metrics matching a name glob",
+    )
+    parser.add_argument(
+        "--max-digits",
+        type=int,
+        default=10**7,
+        help="Largest engine size, from 10^2 by powers of ten",
+    )
+    parser.add_argument(
+        "--engine",
+        action="append",
+        help="Engine to benchmark (repeatable), all available by default",
+    )
+    parser.add_argument(
+        "--calibrate",
+        metavar="PATH",
+        help=(
+            "Fit the cost model to the engine results and write it to PATH "
+            "(for COST_MODEL_PATH)"
+        ),
+    )
+    parser.add_argument(
+        "--task-max-digits",
+        type=int,
+        default=10**5,
+        help="Largest task pipeline size, from 10^2 by powers of ten",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=1000,
+        help="Requests sent to each API endpoint",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=50,
+        help="API requests in flight at once",
+    )
+    parser.add_argument(
+        "--real-redis",
+        action="store_true",
+        help="Use the Redis of the settings instead of fakeredis",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    suites = args.suite or SUITES
+
+    # The app logs every request; keep the benchmark's own progress only
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        filter={"": "WARNING", "benchmarks": "INFO", __name__: "INFO"},
+    )
+
+    metrics: list[Metric] = []
+    if "engines" in suites:
+        metrics += engines.run(_sizes(args.max_digits), args.engine)
+        if args.calibrate:
+            save_cost_model(args.calibrate, engines.calibrate(metrics))
+            logger.info(f"Wrote the cost model to {args.calibrate}")
+
+    with redis_environment(args.real_redis) as backend:
+        if "pipeline" in suites:
+            metrics += pipeline.run(_sizes(args.task_max_digits))
+        if "api" in suites:
+            metrics += api.run(
+                args.requests, args.concurrency, real_broker=args.real_redis
+            )
+
+    metrics.append(
+        Metric("process.peak_rss_mb", peak_rss_mb(), "MiB", "lower")
+    )
+    write_results(args.output, metrics, backend)
+    logger.info(f"Wrote {len(metrics)} metrics to {args.output}")
+
+    if args.baseline is None:
+        return 0
+
+    regressions = find_regressions(
+        metrics,
+        read_results(args.baseline),
+        args.max_regression,
+        dict(args.threshold),
+    )
+    for regression in regressions:
+        logger.error(f"Regression: {regression}")
+    if regressions:
+        return 1
+    logger.info(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
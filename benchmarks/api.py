@@ -0,0 +1,108 @@
+"""Latency of the API endpoints under concurrent requests."""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import nullcontext
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from app.celery_app import celery_app
+from app.main import app
+from app.tasks.calculate_pi import calculate_pi_task, finished_result
+from benchmarks.metrics import Metric, percentiles
+
+
+async def _timed(request: Awaitable[httpx.Response]) -> float:
+    started = time.perf_counter()
+    response = await request
+    response.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+async def _latencies(
+    client: httpx.AsyncClient,
+    requests: int,
+    concurrency: int,
+    make_request: Callable[
+        [httpx.AsyncClient, int], Awaitable[httpx.Response]
+    ],
+) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> float:
+        async with semaphore:
+            return await _timed(make_request(client, i))
+
+    return await asyncio.gather(*(one(i) for i in range(requests)))
+
+
+async def _measure(requests: int, concurrency: int) -> list[Metric]:
+    celery_app.backend.store_result(
+        "bench-running", {"progress": 0.5, "result": None}, "PROGRESS"
+    )
+    celery_app.backend.store_result(
+        "bench-finished", finished_result("3." + "1" * 1000), "SUCCESS"
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        # Distinct sizes, so that every request starts a calculation
+        # instead of joining an in-flight one
+        start = await _latencies(
+            client,
+            requests,
+            concurrency,
+            lambda c, i: c.post("/calculate_pi", json={"n": 1 + i % 1000}),
+        )
+        running = await _latencies(
+            client,
+            requests,
+            concurrency,
+            lambda c, _: c.post(
+                "/check_progress", json={"task_id": "bench-running"}
+            ),
+        )
+        finished = await _latencies(
+            client,
+            requests,
+            concurrency,
+            lambda c, _: c.post(
+                "/check_progress", json={"task_id": "bench-finished"}
+            ),
+        )
+
+    return [
+        *percentiles(start, "api.calculate_pi.latency", "ms"),
+        *percentiles(running, "api.check_progress.running.latency", "ms"),
+        *percentiles(finished, "api.check_progress.finished.latency", "ms"),
+    ]
+
+
+def run(requests: int, concurrency: int, real_broker: bool) -> list[Metric]:
+    """Measure latency percentiles of /calculate_pi and /check_progress.
+
+    Args:
+        requests: Requests sent to each endpoint.
+        concurrency: Requests in flight at once.
+        real_broker: Queue the started tasks on the Celery broker; without
+                     one (fakeredis), queueing is skipped and only the
+                     API's own work is measured.
+
+    Returns:
+        "api.<endpoint>.latency.p50/p95/p99" metrics in milliseconds.
+    """
+    queueing = (
+        nullcontext()
+        if real_broker
+        else patch.object(
+            calculate_pi_task,
+            "apply_async",
+            side_effect=lambda args, task_id, **_: MagicMock(id=task_id),
+        )
+    )
+    with queueing:
+        return asyncio.run(_measure(requests, concurrency))
@@ -0,0 +1,116 @@
+"""Throughput of every engine, each size measured in a fresh process."""
+
+import multiprocessing
+import time
+from multiprocessing.connection import Connection
+
+from loguru import logger
+
+from app.cost_model import TIME_EXPONENTS, EngineCost
+from app.engines import available_engines, get_engine
+from benchmarks.metrics import Metric, peak_rss_mb, rss_mb
+
+
+# Largest sizes worth running per engine (the spigot is quadratic)
+MAX_DIGITS = {"spigot": 4 * 10**4}
+
+# Sizes run in addition to the powers of ten, so that engines capped
+# below the next power are still measured at sizes worth fitting
+EXTRA_DIGITS = {"spigot": [2 * 10**4, 4 * 10**4]}
+
+# A fresh interpreter per run, so that peak RSS is the run's own
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _measure_in_child(
+    conn: Connection, engine_name: str, n_digits: int
+) -> None:
+    engine = get_engine(engine_name)
+    baseline = rss_mb()
+    started = time.perf_counter()
+    engine.compute(n_digits)
+    conn.send((time.perf_counter() - started, peak_rss_mb(), baseline))
+
+
+def _measure(engine_name: str, n_digits: int) -> tuple[float, float, float]:
+    # Not a pool worker: those are daemons, which cannot start the
+    # process pool of a parallel engine
+    receiver, sender = _MP_CONTEXT.Pipe(duplex=False)
+    process = _MP_CONTEXT.Process(
+        target=_measure_in_child, args=(sender, engine_name, n_digits)
+    )
+    process.start()
+    sender.close()
+    try:
+        return receiver.recv()
+    except EOFError:
+        raise RuntimeError(
+            f"Engine {engine_name} crashed computing {n_digits} digits"
+        ) from None
+    finally:
+        process.join()
+
+
+def run(sizes: list[int], engines: list[str] | None = None) -> list[Metric]:
+    """Measure digits/sec and peak RSS of engines over request sizes.
+
+    Args:
+        sizes: Numbers of digits to compute.
+        engines: Engine names, every available engine by default.
+
+    Returns:
+        "engine.<name>.<n>.digits_per_second", ".peak_rss_mb" and
+        ".rss_growth_mb" (peak over the RSS before the run) metrics.
+    """
+    metrics = []
+    for name in engines or available_engines():
+        extra = [n for n in EXTRA_DIGITS.get(name, []) if n <= max(sizes)]
+        for n_digits in sorted(set(sizes + extra)):
+            if n_digits > MAX_DIGITS.get(name, n_digits):
+                continue
+            elapsed, rss, baseline = _measure(name, n_digits)
+            logger.info(f"{name} computed {n_digits} digits in {elapsed:.3f}s")
+            prefix = f"engine.{name}.{n_digits}"
+            metrics += [
+                Metric(
+                    f"{prefix}.digits_per_second",
+                    n_digits / max(elapsed, 1e-9),
+                    "digits/s",
+                    "higher",
+                ),
+                Metric(f"{prefix}.peak_rss_mb", rss, "MiB", "lower"),
+                Metric(
+                    f"{prefix}.rss_growth_mb",
+                    max(rss - baseline, 0.0),
+                    "MiB",
+                    "lower",
+                ),
+            ]
+    return metrics
+
+
+def calibrate(metrics: list[Metric]) -> dict[str, EngineCost]:
+    """Fit the cost model of every engine measured at two sizes or more.
+
+    Args:
+        metrics: Metrics returned by run().
+
+    Returns:
+        Engine costs by engine name, see app.cost_model.
+    """
+    values = {metric.name: metric.value for metric in metrics}
+    samples: dict[str, list[tuple[int, float, float]]] = {}
+    for name, rate in values.items():
+        parts = name.split(".")
+        if parts[0] != "engine" or parts[-1] != "digits_per_second":
+            continue
+        engine, n_digits = parts[1], int(parts[2])
+        growth = values[f"engine.{engine}.{n_digits}.rss_growth_mb"]
+        samples.setdefault(engine, []).append(
+            (n_digits, n_digits / rate, growth * 1024 * 1024)
+        )
+    return {
+        engine: EngineCost.fit(engine_samples, TIME_EXPONENTS.get(engine))
+        for engine, engine_samples in samples.items()
+        if len(engine_samples) >= 2
+    }
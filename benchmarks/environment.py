@@ -0,0 +1,131 @@
+"""Redis setup of the benchmarks and accounting of Redis writes."""
+
+import tempfile
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any
+from unittest.mock import patch
+
+from celery.backends.redis import RedisBackend
+from redis.client import Pipeline, Redis
+
+from app.redis_client import get_async_redis, get_redis
+from app.settings import settings
+from app.storage import get_digit_store
+
+
+# Commands that store data, counted by WriteCounter
+WRITE_COMMANDS = frozenset(
+    {
+        "APPEND",
+        "DEL",
+        "EXPIRE",
+        "HSET",
+        "INCR",
+        "INCRBY",
+        "MSET",
+        "PEXPIRE",
+        "PUBLISH",
+        "RPUSH",
+        "SET",
+        "SETEX",
+        "SETRANGE",
+        "ZADD",
+    }
+)
+
+
+@contextmanager
+def redis_environment(real: bool) -> Iterator[str]:
+    """Point the app and the Celery result backend at one Redis.
+
+    Args:
+        real: Use the Redis configured in settings instead of an
+              in-memory fakeredis server.
+
+    Yields:
+        Description of the Redis used, for the results file.
+    """
+    with ExitStack() as stack:
+        if real:
+            backend = settings.REDIS_URL
+        else:
+            import fakeredis
+
+            server = fakeredis.FakeServer()
+            redis = fakeredis.FakeRedis(server=server)
+            stack.enter_context(
+                patch("app.redis_client.Redis.from_url", return_value=redis)
+            )
+            stack.enter_context(
+                patch(
+                    "app.redis_client.AsyncRedis",
+                    side_effect=lambda **_: fakeredis.FakeAsyncRedis(
+                        server=server
+                    ),
+                )
+            )
+            stack.enter_context(patch.object(RedisBackend, "client", redis))
+            backend = "fakeredis"
+
+        for cached in (get_redis, get_async_redis):
+            cached.cache_clear()
+            stack.callback(cached.cache_clear)
+        yield backend
+
+
+def _size(arg: Any) -> int:
+    if isinstance(arg, bytes | bytearray | memoryview):
+        return len(arg)
+    return len(str(arg).encode())
+
+
+@contextmanager
+def fresh_digit_store() -> Iterator[None]:
+    """Use an empty digit store, so that digits are really computed."""
+    with (
+        tempfile.TemporaryDirectory() as store_dir,
+        patch.object(settings, "DIGIT_STORE_PATH", f"{store_dir}/pi"),
+    ):
+        get_digit_store.cache_clear()
+        try:
+            yield
+        finally:
+            get_digit_store.cache_clear()
+
+
+@dataclass
+class WriteCounter:
+    """Number and payload bytes of Redis write commands sent."""
+
+    writes: int = 0
+    bytes: int = 0
+
+    def count(self, args: tuple) -> None:
+        if str(args[0]).upper() in WRITE_COMMANDS:
+            self.writes += 1
+            self.bytes += sum(_size(arg) for arg in args[1:])
+
+
+@contextmanager
+def count_redis_writes() -> Iterator[WriteCounter]:
+    """Count the writes of every sync Redis client, pipelines included."""
+    counter = WriteCounter()
+
+    def counting(execute: Callable) -> Callable:
+        def execute_command(self: Redis, *args: Any, **options: Any) -> Any:
+            counter.count(args)
+            return execute(self, *args, **options)
+
+        return execute_command
+
+    with (
+        patch.object(
+            Redis, "execute_command", counting(Redis.execute_command)
+        ),
+        patch.object(
+            Pipeline, "execute_command", counting(Pipeline.execute_command)
+        ),
+    ):
+        yield counter
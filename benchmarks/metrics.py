@@ -0,0 +1,139 @@
+import fnmatch
+import json
+import platform
+import resource
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Literal
+
+from app.bigint import HAS_GMPY2
+
+
+@dataclass(frozen=True)
+class Metric:
+    """One measured value and which direction is an improvement."""
+
+    name: str
+    value: float
+    unit: str
+    better: Literal["higher", "lower"]
+
+
+@dataclass(frozen=True)
+class Regression:
+    """A metric that got worse than its baseline by more than allowed."""
+
+    metric: Metric
+    baseline: float
+    change: float  # Relative change in the worse direction
+    allowed: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.metric.name}: {self.baseline:.4g} -> "
+            f"{self.metric.value:.4g} {self.metric.unit} "
+            f"({self.change:+.1%}, allowed {self.allowed:.0%})"
+        )
+
+
+def percentiles(samples: list[float], prefix: str, unit: str) -> list[Metric]:
+    """p50/p95/p99 of latency samples as lower-is-better metrics."""
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return [
+        Metric(f"{prefix}.p{p}", cuts[p - 1], unit, "lower")
+        for p in (50, 95, 99)
+    ]
+
+
+def _proc_status_mb(field: str) -> float | None:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024  # In KiB
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the current process, in MiB."""
+    # ru_maxrss survives the exec of spawned processes, so it would report
+    # the parent's peak when higher; VmHWM starts over with each program
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_mb() -> float:
+    """Current resident set size of the process, in MiB (its peak where
+    the current size is unavailable)."""
+    current = _proc_status_mb("VmRSS")
+    return peak_rss_mb() if current is None else current
+
+
+def write_results(path: str, metrics: list[Metric], backend: str) -> None:
+    """Write metrics with the environment they were measured in."""
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "gmpy2": HAS_GMPY2,
+            "redis": backend,
+        },
+        "metrics": [asdict(metric) for metric in metrics],
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def read_results(path: str) -> dict[str, Metric]:
+    """Metrics of a results file by name."""
+    with open(path) as f:
+        report = json.load(f)
+    return {metric["name"]: Metric(**metric) for metric in report["metrics"]}
+
+
+def find_regressions(
+    metrics: list[Metric],
+    baseline: dict[str, Metric],
+    max_regression: float,
+    thresholds: dict[str, float] | None = None,
+) -> list[Regression]:
+    """Metrics worse than their baseline by more than allowed.
+
+    Args:
+        metrics: Metrics of the current run.
+        baseline: Metrics of the reference run by name; metrics missing
+                  from it are not compared.
+        max_regression: Allowed relative change in the worse direction.
+        thresholds: Allowed change by metric name glob, overriding
+                    max_regression; the first matching pattern wins.
+
+    Returns:
+        The regressions, in the order of metrics.
+    """
+    regressions = []
+    for metric in metrics:
+        reference = baseline.get(metric.name)
+        if reference is None or reference.value == 0:
+            continue
+
+        allowed = max_regression
+        for pattern, threshold in (thresholds or {}).items():
+            if fnmatch.fnmatchcase(metric.name, pattern):
+                allowed = threshold
+                break
+
+        change = (metric.value - reference.value) / reference.value
+        if metric.better == "higher":
+            change = -change
+        if change > allowed:
+            regressions.append(
+                Regression(metric, reference.value, change, allowed)
+            )
+    return regressions
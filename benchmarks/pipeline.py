@@ -0,0 +1,50 @@
+"""Redis traffic and duration of whole calculation tasks."""
+
+import time
+from uuid import uuid4
+
+from loguru import logger
+
+from app.tasks.calculate_pi import calculate_pi_task
+from benchmarks.environment import count_redis_writes, fresh_digit_store
+from benchmarks.metrics import Metric
+
+
+# The spigot streams partial results, the others reveal once computed
+ENGINES = ("chudnovsky", "spigot")
+MAX_DIGITS = {"spigot": 10**4}
+
+
+def run(sizes: list[int]) -> list[Metric]:
+    """Run calculation tasks in process and measure their Redis writes.
+
+    Args:
+        sizes: Numbers of digits to calculate.
+
+    Returns:
+        "task.<engine>.<n>.redis_writes", ".redis_bytes" and ".seconds"
+        metrics.
+    """
+    metrics = []
+    for engine in ENGINES:
+        for n_digits in sizes:
+            if n_digits > MAX_DIGITS.get(engine, n_digits):
+                continue
+            with fresh_digit_store(), count_redis_writes() as counter:
+                started = time.perf_counter()
+                calculate_pi_task.apply(
+                    args=(n_digits, engine), task_id=str(uuid4())
+                ).get()
+                elapsed = time.perf_counter() - started
+
+            logger.info(
+                f"Task {engine}/{n_digits}: {counter.writes} writes, "
+                f"{counter.bytes} bytes"
+            )
+            prefix = f"task.{engine}.{n_digits}"
+            metrics += [
+                Metric(f"{prefix}.redis_writes", counter.writes, "", "lower"),
+                Metric(f"{prefix}.redis_bytes", counter.bytes, "B", "lower"),
+                Metric(f"{prefix}.seconds", elapsed, "s", "lower"),
+            ]
+    return metrics
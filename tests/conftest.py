@@ -1,11 +1,15 @@
 import sys
 from typing import Iterator
+from unittest.mock import patch
 
+import fakeredis
 import pytest
+from celery.backends.redis import RedisBackend
 from fastapi.testclient import TestClient
 from loguru import logger
 
 from app.main import app
+from app.redis_client import get_async_redis, get_redis
 
 
 @pytest.fixture(autouse=True, scope="session")
@@ -21,3 +25,24 @@ def _configure_test_logging() -> Iterator[None]:
 @pytest.fixture(scope="session")
 def test_client() -> TestClient:
     return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def fake_redis() -> Iterator[fakeredis.FakeRedis]:
+    """In-memory Redis shared by the app and the Celery result backend."""
+    server = fakeredis.FakeServer()
+    redis = fakeredis.FakeRedis(server=server)
+    get_redis.cache_clear()
+    get_async_redis.cache_clear()
+    with (
+        patch("app.redis_client.Redis.from_url", return_value=redis),
+        patch(
+            "app.redis_client.AsyncRedis",
+            side_effect=lambda **_: fakeredis.FakeAsyncRedis(server=server),
+        ),
+        # Backends are per thread, so patch the client on the class
+        patch.object(RedisBackend, "client", redis),
+    ):
+        yield redis
+    get_redis.cache_clear()
+    get_async_redis.cache_clear()
@@ -0,0 +1,175 @@
+"""Tests for BBP hex digit extraction."""
+
+from unittest.mock import MagicMock, patch
+
+import mpmath
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.cancellation import request_cancellation
+from app.celery_app import celery_app
+from app.engines import bbp
+from app.engines.bbp import hex_digits, hex_digits_batch
+from app.redis_client import get_redis
+from app.tasks.hex_digits import extract_hex_digits_task
+
+
+POSITIONS = [0, 1, 2, 7, 10, 99, 100, 1000, 4095, 12345]
+
+
+def _reference(position: int, count: int) -> str:
+    """Hex digits from a direct mpmath evaluation of Pi."""
+    with mpmath.workdps(int((position + count) * 1.21) + 20):
+        value = int(
+            mpmath.floor(mpmath.pi * mpmath.mpf(16) ** (position + count))
+        )
+    return f"{value % 16**count:0{count}X}"
+
+
+@pytest.mark.parametrize("position", POSITIONS)
+@pytest.mark.parametrize("count", [1, 8])
+def test_hex_digits_match_reference(position: int, count: int) -> None:
+    """Exact extraction agrees with the expansion of Pi."""
+    assert hex_digits(position, count) == _reference(position, count)
+
+
+def test_hex_digits_known_value() -> None:
+    """The digits at position one million are the published ones."""
+    assert hex_digits(1_000_000, 8) == "6C65E52C"
+
+
+@pytest.mark.parametrize("count", [1, 4, 8])
+def test_hex_digits_batch_matches_exact(count: int) -> None:
+    """The vectorized path returns the exact digits."""
+    assert hex_digits_batch(POSITIONS, count) == [
+        hex_digits(position, count) for position in POSITIONS
+    ]
+
+
+def test_hex_digits_batch_without_numpy() -> None:
+    """Without NumPy every position is computed exactly."""
+    with (
+        patch.object(bbp, "HAS_NUMPY", False),
+        patch.object(bbp, "hex_digits", wraps=bbp.hex_digits) as exact,
+    ):
+        digits = hex_digits_batch([0, 10], 2)
+
+    assert digits == ["24", "A3"]
+    assert exact.call_count == 2
+
+
+def test_hex_digits_batch_boundary_falls_back() -> None:
+    """Float results too close to a digit boundary are recomputed."""
+    with (
+        patch.object(bbp, "_float_margin", return_value=0.25),
+        patch.object(bbp, "hex_digits", wraps=bbp.hex_digits) as exact,
+    ):
+        # Position 2 is "3", followed by "F": 0.95 into the digit
+        digits = hex_digits_batch([2, 5], 1)
+
+    assert digits == [_reference(2, 1), _reference(5, 1)]
+    exact.assert_called_once_with(2, 1)
+
+
+def test_hex_digits_batch_many_digits_far_out() -> None:
+    """Positions beyond what float64 can resolve to 8 digits are exact."""
+    positions = list(range(9_980, 10_020)) + [1558]
+
+    assert hex_digits_batch(positions, 8) == [
+        hex_digits(position, 8) for position in positions
+    ]
+
+
+def test_extract_hex_digits_task() -> None:
+    """The task deduplicates positions and reports progress."""
+    with patch.object(
+        extract_hex_digits_task, "update_state", MagicMock()
+    ) as update_state:
+        result = extract_hex_digits_task.apply(
+            args=([100, 0, 100], 4), task_id="hex-id"
+        ).get()
+
+    assert result["state"] == "FINISHED"
+    assert result["hex_digits"] == {
+        "0": _reference(0, 4),
+        "100": _reference(100, 4),
+    }
+    assert update_state.call_args.kwargs["meta"]["progress"] == 1.0
+
+
+def test_extract_hex_digits_task_cancelled() -> None:
+    """A cancelled extraction stops before its next group of positions."""
+    request_cancellation(get_redis(), "hex-id")
+
+    with patch("app.tasks.hex_digits.hex_digits_batch") as mock_batch:
+        result = extract_hex_digits_task.apply(
+            args=([0, 100], 4), task_id="hex-id"
+        )
+
+    assert result.state == "IGNORED"
+    mock_batch.assert_not_called()
+    assert celery_app.backend.get_state("hex-id") == "REVOKED"
+
+
+def test_hex_digits_endpoint_starts_task(test_client: TestClient) -> None:
+    """The endpoint queues an extraction task."""
+    with patch("app.main.extract_hex_digits_task.apply_async") as mock_apply:
+        mock_apply.return_value = MagicMock(id="hex-id")
+        response = test_client.post(
+            "/hex_digits", json={"positions": [0, 1000], "count": 8}
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["task_id"] == "hex-id"
+    assert mock_apply.call_args.args[0] == ([0, 1000], 8)
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"positions": []},
+        {"positions": [-1]},
+        {"positions": [0], "count": 9},
+        {"positions": [10**12]},
+    ],
+)
+def test_hex_digits_endpoint_validation(
+    test_client: TestClient, payload: dict
+) -> None:
+    """Invalid positions and counts are rejected."""
+    response = test_client.post("/hex_digits", json=payload)
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+def test_get_hex_digits(test_client: TestClient) -> None:
+    """Finished extractions return digits by position."""
+    celery_app.backend.store_result(
+        "hex-id",
+        {
+            "state": "FINISHED",
+            "progress": 1.0,
+            "result": None,
+            "hex_digits": {"0": "243F", "1000": "3C32"},
+        },
+        "SUCCESS",
+    )
+
+    response = test_client.get("/hex_digits/hex-id")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"digits": {"0": "243F", "1000": "3C32"}}
+
+
+def test_get_hex_digits_not_finished(test_client: TestClient) -> None:
+    """Running extractions return 409, unknown tasks 404."""
+    celery_app.backend.store_result(
+        "running", {"progress": 0.5, "result": None}, "PROGRESS"
+    )
+
+    running = test_client.get("/hex_digits/running")
+    unknown = test_client.get("/hex_digits/unknown")
+
+    assert running.status_code == status.HTTP_409_CONFLICT
+    assert unknown.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,101 @@
+"""Tests for the benchmark runner and its regression checks."""
+
+import json
+from pathlib import Path
+
+from benchmarks.__main__ import main
+from benchmarks.metrics import Metric, find_regressions
+
+
+def _metric(name: str, value: float, better: str = "lower") -> Metric:
+    return Metric(name, value, "", better)
+
+
+def test_find_regressions_by_direction() -> None:
+    """Lower-is-better metrics regress upwards, the others downwards."""
+    baseline = {
+        "latency": _metric("latency", 10.0),
+        "throughput": _metric("throughput", 100.0, "higher"),
+    }
+
+    regressions = find_regressions(
+        [_metric("latency", 13.0), _metric("throughput", 110.0, "higher")],
+        baseline,
+        max_regression=0.25,
+    )
+    assert [r.metric.name for r in regressions] == ["latency"]
+
+    regressions = find_regressions(
+        [_metric("latency", 8.0), _metric("throughput", 70.0, "higher")],
+        baseline,
+        max_regression=0.25,
+    )
+    assert [r.metric.name for r in regressions] == ["throughput"]
+
+
+def test_find_regressions_thresholds() -> None:
+    """Glob thresholds override the default, new metrics are skipped."""
+    baseline = {
+        "api.latency": _metric("api.latency", 10.0),
+        "task.writes": _metric("task.writes", 10.0),
+    }
+    metrics = [
+        _metric("api.latency", 14.0),
+        _metric("task.writes", 11.0),
+        _metric("new.metric", 1e9),
+    ]
+
+    regressions = find_regressions(
+        metrics, baseline, 0.25, thresholds={"api.*": 0.5, "task.*": 0.0}
+    )
+
+    assert [r.metric.name for r in regressions] == ["task.writes"]
+
+
+def test_benchmark_run_writes_results(tmp_path: Path) -> None:
+    """A small run writes every suite's metrics and compares them."""
+    output = tmp_path / "results.json"
+    args = [
+        "--output",
+        str(output),
+        "--max-digits",
+        "100",
+        "--engine",
+        "mpmath",
+        "--task-max-digits",
+        "100",
+        "--requests",
+        "20",
+    ]
+
+    assert main(args) == 0
+
+    names = {
+        metric["name"] for metric in json.loads(output.read_text())["metrics"]
+    }
+    assert "engine.mpmath.100.digits_per_second" in names
+    assert "task.chudnovsky.100.redis_writes" in names
+    assert "api.check_progress.running.latency.p99" in names
+
+    # A baseline with far fewer Redis writes fails the next run
+    report = json.loads(output.read_text())
+    for metric in report["metrics"]:
+        if metric["name"] == "task.chudnovsky.100.redis_writes":
+            metric["value"] = 1
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report))
+
+    assert (
+        main(
+            [
+                *args,
+                "--suite",
+                "pipeline",
+                "--baseline",
+                str(baseline),
+                "--output",
+                str(tmp_path / "second.json"),
+            ]
+        )
+        == 1
+    )
@@ -10,10 +10,10 @@ from app.schemas import CalculatePiResponse
 
 def test_calculate_pi_minimal_value(test_client: TestClient) -> None:
     """Endpoint accepts n=1."""
-    with patch("app.main.calculate_pi_task.delay") as mock_delay:
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
         mock_task = MagicMock()
         mock_task.id = "test-task-id-123"
-        mock_delay.return_value = mock_task
+        mock_apply.return_value = mock_task
 
         response = test_client.post("/calculate_pi", json={"n": 1})
 
@@ -21,15 +21,16 @@ def test_calculate_pi_minimal_value(test_client: TestClient) -> None:
         data = response.json()
         assert data["task_id"] == "test-task-id-123"
         assert "1 digits" in data["message"]
-        mock_delay.assert_called_once_with(1)
+        mock_apply.assert_called_once()
+        assert mock_apply.call_args.args[0][:2] == (1, None)
 
 
 def test_calculate_pi_typical_value(test_client: TestClient) -> None:
     """Endpoint accepts typical n=100."""
-    with patch("app.main.calculate_pi_task.delay") as mock_delay:
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
         mock_task = MagicMock()
         mock_task.id = "task-uuid-456"
-        mock_delay.return_value = mock_task
+        mock_apply.return_value = mock_task
 
         response = test_client.post("/calculate_pi", json={"n": 100})
 
@@ -37,15 +38,16 @@ def test_calculate_pi_typical_value(test_client: TestClient) -> None:
         data = response.json()
         assert data["task_id"] == "task-uuid-456"
         assert "100 digits" in data["message"]
-        mock_delay.assert_called_once_with(100)
+        mock_apply.assert_called_once()
+        assert mock_apply.call_args.args[0][:2] == (100, None)
 
 
 def test_calculate_pi_large_value(test_client: TestClient) -> None:
     """Endpoint accepts large n=10000."""
-    with patch("app.main.calculate_pi_task.delay") as mock_delay:
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
         mock_task = MagicMock()
         mock_task.id = "large-task-id"
-        mock_delay.return_value = mock_task
+        mock_apply.return_value = mock_task
 
         response = test_client.post("/calculate_pi", json={"n": 10000})
 
@@ -75,14 +77,15 @@ def test_calculate_pi_rejects_float(test_client: TestClient) -> None:
 
 def test_calculate_pi_coerces_valid_string(test_client: TestClient) -> None:
     """Endpoint coerces valid numeric string to int."""
-    with patch("app.main.calculate_pi_task.delay") as mock_delay:
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
         mock_task = MagicMock()
         mock_task.id = "string-coercion-task"
-        mock_delay.return_value = mock_task
+        mock_apply.return_value = mock_task
 
         response = test_client.post("/calculate_pi", json={"n": "100"})
         assert response.status_code == status.HTTP_200_OK
-        mock_delay.assert_called_once_with(100)
+        mock_apply.assert_called_once()
+        assert mock_apply.call_args.args[0][:2] == (100, None)
 
 
 def test_calculate_pi_rejects_invalid_string(test_client: TestClient) -> None:
@@ -99,8 +102,8 @@ def test_calculate_pi_missing_parameter(test_client: TestClient) -> None:
 
 def test_calculate_pi_task_creation_error(test_client: TestClient) -> None:
     """Endpoint handles Celery task creation errors."""
-    with patch("app.main.calculate_pi_task.delay") as mock_delay:
-        mock_delay.side_effect = Exception("Celery connection failed")
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
+        mock_apply.side_effect = Exception("Celery connection failed")
 
         response = test_client.post("/calculate_pi", json={"n": 100})
 
@@ -112,10 +115,10 @@ def test_calculate_pi_task_creation_error(test_client: TestClient) -> None:
 
 def test_calculate_pi_response_schema(test_client: TestClient) -> None:
     """Endpoint response matches CalculatePiResponse schema."""
-    with patch("app.main.calculate_pi_task.delay") as mock_delay:
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
         mock_task = MagicMock()
         mock_task.id = "schema-test-id"
-        mock_delay.return_value = mock_task
+        mock_apply.return_value = mock_task
 
         response = test_client.post("/calculate_pi", json={"n": 50})
 
@@ -128,15 +131,15 @@ def test_calculate_pi_response_schema(test_client: TestClient) -> None:
 
 
 def test_calculate_pi_returns_unique_task_ids(test_client: TestClient) -> None:
-    """Endpoint returns different task_id for each request."""
-    with patch("app.main.calculate_pi_task.delay") as mock_delay:
+    """Endpoint returns different task_id for each distinct request."""
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
         task_ids = []
         for i in range(3):
             mock_task = MagicMock()
             mock_task.id = f"task-{i}"
-            mock_delay.return_value = mock_task
+            mock_apply.return_value = mock_task
 
-            response = test_client.post("/calculate_pi", json={"n": 10})
+            response = test_client.post("/calculate_pi", json={"n": 10 + i})
             assert response.status_code == status.HTTP_200_OK
             task_ids.append(response.json()["task_id"])
 
@@ -0,0 +1,334 @@
+"""Tests for cooperative task cancellation."""
+
+import json
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.bigint import isqrt, mpz
+from app.cancellation import (
+    CancellationCheck,
+    TaskCancelledError,
+    is_cancelled,
+    request_cancellation,
+)
+from app.celery_app import celery_app
+from app.engines.chudnovsky import parallel_binary_split, terms_for
+from app.radix import decimal_digits
+from app.redis_client import get_redis
+from app.reveal import RevealSchedule
+from app.settings import settings
+from app.singleflight import find_inflight
+from app.storage.digit_store import DigitStore
+from app.tasks.calculate_pi import (
+    _reveal_in_worker,
+    calculate_pi_task,
+    finished_result,
+)
+
+
+CANCELLED = {
+    "state": "CANCELLED",
+    "progress": 0.0,
+    "result": None,
+    "partial_result": None,
+    "eta_seconds": None,
+    "estimated_peak_bytes": None,
+}
+
+
+@pytest.fixture
+def mock_revoke() -> Iterator[MagicMock]:
+    with patch.object(celery_app.control, "revoke") as revoke:
+        yield revoke
+
+
+@pytest.fixture
+def fresh_store(tmp_path: Path) -> Iterator[DigitStore]:
+    store = DigitStore(str(tmp_path / "pi_digits"))
+    with patch("app.tasks.calculate_pi.get_digit_store", return_value=store):
+        yield store
+
+
+def _submit(test_client: TestClient, payload: dict) -> str:
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
+        mock_apply.side_effect = lambda *_, task_id, **__: MagicMock(
+            id=task_id
+        )
+        response = test_client.post("/calculate_pi", json=payload)
+    return response.json()["task_id"]
+
+
+def test_cancel_queued_task(
+    test_client: TestClient, mock_revoke: MagicMock
+) -> None:
+    """Queued tasks are revoked, reported cancelled and release their
+    claim, so identical requests start a new task."""
+    task_id = _submit(test_client, {"n": 1000})
+
+    response = test_client.delete(f"/tasks/{task_id}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == CANCELLED
+    mock_revoke.assert_called_once_with(task_id)
+    response = test_client.post("/check_progress", json={"task_id": task_id})
+    assert response.json() == CANCELLED
+    assert find_inflight(get_redis(), None, 1000) is None
+
+    # Cancelling again is a no-op
+    assert test_client.delete(f"/tasks/{task_id}").json() == CANCELLED
+    mock_revoke.assert_called_once()
+
+
+def test_cancel_started_task_leaves_cleanup_to_worker(
+    test_client: TestClient, mock_revoke: MagicMock
+) -> None:
+    """Started tasks are not revoked: they stop at their next check and
+    release their claim and scratch files on the worker."""
+    task_id = _submit(test_client, {"n": 1000})
+    celery_app.backend.store_result(task_id, {"pid": 1}, "STARTED")
+
+    assert test_client.delete(f"/tasks/{task_id}").json() == CANCELLED
+
+    mock_revoke.assert_not_called()
+    assert is_cancelled(get_redis(), task_id)
+    assert find_inflight(get_redis(), None, 1000) == task_id
+
+
+def test_cancel_detaches_clients_of_shared_task(
+    test_client: TestClient, mock_revoke: MagicMock
+) -> None:
+    """A task shared by deduplicated requests keeps running until every
+    client attached to it has cancelled; cancelled aliases stop waiting
+    for it."""
+    task_id = _submit(test_client, {"n": 1000})
+    waiting = _submit(test_client, {"n": 10})
+    cancelled = _submit(test_client, {"n": 20})
+
+    # Repeated cancellations only detach their client once
+    for client_id in (cancelled, task_id, task_id, cancelled):
+        assert test_client.delete(f"/tasks/{client_id}").json() == CANCELLED
+    mock_revoke.assert_not_called()
+    assert get_redis().hkeys(f"pi:subscribers:{task_id}") == [waiting.encode()]
+    response = test_client.post("/check_progress", json={"task_id": task_id})
+    assert response.json()["state"] == "PROGRESS"
+
+    assert test_client.delete(f"/tasks/{waiting}").json() == CANCELLED
+    mock_revoke.assert_called_once_with(task_id)
+    for client_id in (task_id, waiting, cancelled):
+        response = test_client.post(
+            "/check_progress", json={"task_id": client_id}
+        )
+        assert response.json() == CANCELLED
+    assert find_inflight(get_redis(), None, 1000) is None
+
+
+def test_retried_cancel_keeps_joined_task(
+    test_client: TestClient, mock_revoke: MagicMock
+) -> None:
+    """Retrying the cancellation of a joined task does not cancel it for
+    the other clients that joined it."""
+    task_id = _submit(test_client, {"n": 1000})
+    assert _submit(test_client, {"n": 1000}) == task_id
+
+    for _ in range(3):
+        assert test_client.delete(f"/tasks/{task_id}").json() == CANCELLED
+
+    mock_revoke.assert_not_called()
+    assert not is_cancelled(get_redis(), task_id)
+    response = test_client.post("/check_progress", json={"task_id": task_id})
+    assert response.json()["state"] == "PROGRESS"
+
+
+def test_mpmath_stops_between_phases(
+    fresh_store: DigitStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The mpmath engine, which reports no progress, stops right after
+    its evaluation instead of converting the result."""
+    monkeypatch.setattr(settings, "CANCEL_CHECK_INTERVAL", 0.0)
+    lock = MagicMock()
+    lock.__enter__.side_effect = lambda: request_cancellation(
+        get_redis(), "task-id"
+    )
+
+    with (
+        patch("app.engines.mpmath_engine._CONSTANTS_LOCK", lock),
+        patch("app.engines.mpmath_engine.decimal_digits") as conversion,
+    ):
+        result = calculate_pi_task.apply(
+            args=(1000, "mpmath"), task_id="task-id"
+        )
+
+    assert result.state == "IGNORED"
+    conversion.assert_not_called()
+    assert celery_app.backend.get_state("task-id") == "REVOKED"
+
+
+def test_chudnovsky_stops_in_final_division(
+    fresh_store: DigitStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Chudnovsky checks the flag inside its final division, after the
+    last progress report of the binary splitting."""
+    monkeypatch.setattr(settings, "CANCEL_CHECK_INTERVAL", 0.0)
+
+    def cancelling_isqrt(value: int) -> int:
+        request_cancellation(get_redis(), "task-id")
+        return isqrt(value)
+
+    with (
+        patch("app.engines.chudnovsky.isqrt", cancelling_isqrt),
+        patch("app.engines.chudnovsky.decimal_digits") as conversion,
+    ):
+        result = calculate_pi_task.apply(
+            args=(1000, "chudnovsky"), task_id="task-id"
+        )
+
+    assert result.state == "IGNORED"
+    conversion.assert_not_called()
+
+
+def test_parallel_split_cancels_queued_leaves() -> None:
+    """Cancelling parallel binary splitting returns without running the
+    leaves still queued in the process pool."""
+    terms = terms_for(2_000_000)
+    cancelled_at = []
+
+    def cancel(fraction: float) -> None:
+        cancelled_at.append(time.monotonic())
+        raise TaskCancelledError("cancelled")
+
+    with (
+        patch("app.engines.chudnovsky.CHUNKS_PER_WORKER", 16),
+        pytest.raises(TaskCancelledError),
+    ):
+        parallel_binary_split(0, terms, 2, on_progress=cancel)
+
+    # Queued leaves would take seconds; running ones are not waited for
+    assert time.monotonic() - cancelled_at[0] < 0.5
+
+
+def test_conversion_checks_cancellation() -> None:
+    """Radix conversion of a cancelled task stops between its splits."""
+    redis = get_redis()
+    request_cancellation(redis, "task-id")
+    value = mpz(10) ** 200_000 - 1
+
+    with (
+        CancellationCheck(redis, "task-id").activate(),
+        pytest.raises(TaskCancelledError),
+    ):
+        decimal_digits(value, 200_000)
+
+    # Outside of an active check, cancellation points are no-ops
+    assert decimal_digits(value, 200_000, 3) == "999"
+
+
+def test_cancel_unknown_or_finished_task(
+    test_client: TestClient, mock_revoke: MagicMock
+) -> None:
+    """Only known, unfinished tasks can be cancelled."""
+    response = test_client.delete("/tasks/unknown-id")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    celery_app.backend.store_result(
+        "done", finished_result("3.1416"), "SUCCESS"
+    )
+    response = test_client.delete("/tasks/done")
+    assert response.status_code == status.HTTP_409_CONFLICT
+    mock_revoke.assert_not_called()
+
+
+def test_cancel_virtual_reveal(
+    test_client: TestClient, mock_revoke: MagicMock
+) -> None:
+    """A result still revealed virtually, reported in progress by
+    /check_progress, can be cancelled too."""
+    schedule = RevealSchedule(total_chars=100, started_at=time.time())
+    celery_app.backend.store_result(
+        "revealing", finished_result("3.1416", schedule), "SUCCESS"
+    )
+    response = test_client.post(
+        "/check_progress", json={"task_id": "revealing"}
+    )
+    assert response.json()["state"] == "PROGRESS"
+
+    assert test_client.delete("/tasks/revealing").json() == CANCELLED
+    response = test_client.post(
+        "/check_progress", json={"task_id": "revealing"}
+    )
+    assert response.json() == CANCELLED
+    mock_revoke.assert_not_called()
+
+
+def test_running_task_stops_at_next_report(
+    fresh_store: DigitStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A running engine stops once the flag is raised, and the task is
+    stored as revoked."""
+    monkeypatch.setattr(settings, "CANCEL_CHECK_INTERVAL", 0.0)
+    blocks = []
+
+    def cancel_after_first_block(self, fraction: float, meta=None) -> None:
+        blocks.append(fraction)
+        request_cancellation(get_redis(), "task-id")
+
+    with patch(
+        "app.tasks.calculate_pi.ProgressReporter.report",
+        cancel_after_first_block,
+    ):
+        result = calculate_pi_task.apply(
+            args=(5000, "spigot"), task_id="task-id"
+        )
+
+    assert result.state == "IGNORED"
+    assert len(blocks) == 1
+    assert celery_app.backend.get_state("task-id") == "REVOKED"
+    assert fresh_store.high_water_mark() == 0
+
+
+def test_worker_reveal_stops_when_cancelled() -> None:
+    """The worker reveal loop checks the flag between digits."""
+    task = MagicMock()
+    task.request.id = "task-id"
+    schedule = RevealSchedule(total_chars=100, started_at=0.0)
+    request_cancellation(get_redis(), "task-id")
+
+    with (
+        patch("app.tasks.calculate_pi.time.sleep") as mock_sleep,
+        pytest.raises(TaskCancelledError),
+    ):
+        _reveal_in_worker(task, schedule)
+
+    mock_sleep.assert_not_called()
+
+
+def test_cancellation_check_is_rate_limited() -> None:
+    """The flag is read on the first check, then once per interval."""
+    redis = get_redis()
+    check = CancellationCheck(redis, "task-id", interval=60.0)
+    check()
+
+    request_cancellation(redis, "task-id")
+    check()
+
+    with pytest.raises(TaskCancelledError):
+        CancellationCheck(redis, "task-id", interval=60.0)()
+
+
+def test_stream_ends_with_cancelled_event(
+    test_client: TestClient, mock_revoke: MagicMock
+) -> None:
+    """Progress streams close with a cancelled event."""
+    task_id = _submit(test_client, {"n": 1000})
+    test_client.delete(f"/tasks/{task_id}")
+
+    response = test_client.get(f"/progress/{task_id}/stream")
+
+    event, data = response.text.strip().split("\n")
+    assert event == "event: cancelled"
+    assert json.loads(data.removeprefix("data: ")) == CANCELLED
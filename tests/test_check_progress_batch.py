@@ -0,0 +1,90 @@
+"""Tests for /check_progress/batch endpoint."""
+
+from unittest.mock import patch
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.celery_app import celery_app
+from app.redis_client import get_async_redis
+from app.tasks.calculate_pi import finished_result
+
+
+def test_batch_progress_mixed_states(test_client: TestClient) -> None:
+    """Every task gets its own progress or error entry."""
+    celery_app.backend.store_result(
+        "running", {"progress": 0.35, "result": None}, "PROGRESS"
+    )
+    celery_app.backend.store_result(
+        "done", finished_result("3.1416"), "SUCCESS"
+    )
+    celery_app.backend.mark_as_failure("failed", RuntimeError("boom"))
+
+    redis = get_async_redis()
+    with patch.object(redis, "mget", wraps=redis.mget) as mget:
+        response = test_client.post(
+            "/check_progress/batch",
+            json={"task_ids": ["running", "done", "failed", "unknown"]},
+        )
+
+    assert mget.call_count == 1
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["tasks"] == {
+        "running": {
+            "state": "PROGRESS",
+            "progress": 0.35,
+            "result": None,
+            "partial_result": None,
+            "eta_seconds": None,
+            "estimated_peak_bytes": None,
+        },
+        "done": {
+            "state": "FINISHED",
+            "progress": 1.0,
+            "result": "3.1416",
+            "partial_result": None,
+            "eta_seconds": 0.0,
+            "estimated_peak_bytes": None,
+        },
+        "failed": {"error": "FAILURE", "detail": "Task execution failed"},
+        "unknown": {"error": "NOT_FOUND", "detail": "Task not found"},
+    }
+
+
+def test_batch_progress_deduplicates_ids(test_client: TestClient) -> None:
+    """Repeated task IDs are read and returned once."""
+    celery_app.backend.store_result(
+        "running", {"progress": 0.5, "result": None}, "PROGRESS"
+    )
+
+    response = test_client.post(
+        "/check_progress/batch", json={"task_ids": ["running", "running"]}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert list(response.json()["tasks"]) == ["running"]
+
+
+def test_batch_progress_validation(test_client: TestClient) -> None:
+    """Empty and oversized batches are rejected."""
+    empty = test_client.post("/check_progress/batch", json={"task_ids": []})
+    too_many = test_client.post(
+        "/check_progress/batch",
+        json={"task_ids": [str(i) for i in range(1001)]},
+    )
+
+    assert empty.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert too_many.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+def test_batch_progress_backend_error(test_client: TestClient) -> None:
+    """Backend errors return 500 for the whole batch."""
+    with patch(
+        "app.main.read_states", side_effect=ConnectionError("Redis down")
+    ):
+        response = test_client.post(
+            "/check_progress/batch", json={"task_ids": ["a", "b"]}
+        )
+
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert response.json()["detail"] == "Failed to check task progress"
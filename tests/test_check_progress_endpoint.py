@@ -1,135 +1,120 @@
 """Tests for /check_progress endpoint."""
 
-from unittest.mock import MagicMock, patch
+import asyncio
+import time
+from typing import Any
+from unittest.mock import patch
 
+import httpx
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 
+from app.celery_app import celery_app
+from app.main import app
+from app.redis_client import get_async_redis
+from app.reveal import RevealSchedule
 from app.schemas import ProgressResponse
+from app.streaming import get_subscriber, progress_events
+from app.tasks.calculate_pi import finished_result
+
+
+def _store_meta(task_id: str, state: str, info: Any) -> None:
+    """Store a task's meta in the (fake) result backend."""
+    celery_app.backend.store_result(task_id, info, state)
 
 
 def test_check_progress_task_not_found(test_client: TestClient) -> None:
     """Endpoint returns 404 for non-existent task."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_task = MagicMock()
-        mock_task.state = "PENDING"
-        mock_task.info = None
-        mock_result.return_value = mock_task
-
-        response = test_client.post(
-            "/check_progress", json={"task_id": "non-existent-id"}
-        )
+    response = test_client.post(
+        "/check_progress", json={"task_id": "non-existent-id"}
+    )
 
-        assert response.status_code == status.HTTP_404_NOT_FOUND
-        data = response.json()
-        assert "Task not found" in data["detail"]
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    data = response.json()
+    assert "Task not found" in data["detail"]
 
 
 def test_check_progress_task_in_progress(test_client: TestClient) -> None:
     """Endpoint returns PROGRESS state for running task."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_task = MagicMock()
-        mock_task.state = "PROGRESS"
-        mock_task.info = {"progress": 0.35}
-        mock_result.return_value = mock_task
+    _store_meta("running-task-id", "PROGRESS", {"progress": 0.35})
 
-        response = test_client.post(
-            "/check_progress", json={"task_id": "running-task-id"}
-        )
+    response = test_client.post(
+        "/check_progress", json={"task_id": "running-task-id"}
+    )
 
-        assert response.status_code == status.HTTP_200_OK
-        data = response.json()
-        assert data["state"] == "PROGRESS"
-        assert data["progress"] == 0.35
-        assert data["result"] is None
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["state"] == "PROGRESS"
+    assert data["progress"] == 0.35
+    assert data["result"] is None
 
 
 def test_check_progress_task_started(test_client: TestClient) -> None:
     """Endpoint handles STARTED state."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_task = MagicMock()
-        mock_task.state = "STARTED"
-        mock_task.info = {"progress": 0.0}
-        mock_result.return_value = mock_task
+    _store_meta("started-task-id", "STARTED", {"pid": 1, "hostname": "w"})
 
-        response = test_client.post(
-            "/check_progress", json={"task_id": "started-task-id"}
-        )
+    response = test_client.post(
+        "/check_progress", json={"task_id": "started-task-id"}
+    )
 
-        assert response.status_code == status.HTTP_200_OK
-        data = response.json()
-        assert data["state"] == "PROGRESS"
-        assert data["progress"] == 0.0
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["state"] == "PROGRESS"
+    assert data["progress"] == 0.0
 
 
 def test_check_progress_task_success(test_client: TestClient) -> None:
     """Endpoint returns FINISHED state for completed task."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_task = MagicMock()
-        mock_task.state = "SUCCESS"
-        mock_task.result = {"result": "3.14159265358979"}
-        mock_result.return_value = mock_task
+    _store_meta("completed-task-id", "SUCCESS", {"result": "3.14159265358979"})
 
-        response = test_client.post(
-            "/check_progress", json={"task_id": "completed-task-id"}
-        )
+    response = test_client.post(
+        "/check_progress", json={"task_id": "completed-task-id"}
+    )
 
-        assert response.status_code == status.HTTP_200_OK
-        data = response.json()
-        assert data["state"] == "FINISHED"
-        assert data["progress"] == 1.0
-        assert data["result"] == "3.14159265358979"
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["state"] == "FINISHED"
+    assert data["progress"] == 1.0
+    assert data["result"] == "3.14159265358979"
 
 
 def test_check_progress_task_failure(test_client: TestClient) -> None:
     """Endpoint returns 500 for failed task."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_task = MagicMock()
-        mock_task.state = "FAILURE"
-        mock_task.info = Exception("Division by zero")
-        mock_result.return_value = mock_task
+    _store_meta(
+        "failed-task-id", "FAILURE", ZeroDivisionError("Division by zero")
+    )
 
-        response = test_client.post(
-            "/check_progress", json={"task_id": "failed-task-id"}
-        )
+    response = test_client.post(
+        "/check_progress", json={"task_id": "failed-task-id"}
+    )
 
-        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
-        data = response.json()
-        assert "Task execution failed" in data["detail"]
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    data = response.json()
+    assert "Task execution failed" in data["detail"]
 
 
 def test_check_progress_task_with_no_info(test_client: TestClient) -> None:
     """Endpoint handles task with no metadata."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_task = MagicMock()
-        mock_task.state = "PROGRESS"
-        mock_task.info = None
-        mock_result.return_value = mock_task
+    _store_meta("no-info-task-id", "PROGRESS", None)
 
-        response = test_client.post(
-            "/check_progress", json={"task_id": "no-info-task-id"}
-        )
+    response = test_client.post(
+        "/check_progress", json={"task_id": "no-info-task-id"}
+    )
 
-        assert response.status_code == status.HTTP_200_OK
-        data = response.json()
-        assert data["state"] == "PROGRESS"
-        assert data["progress"] == 0.0  # Default value
-        assert data["result"] is None
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["state"] == "PROGRESS"
+    assert data["progress"] == 0.0  # Default value
+    assert data["result"] is None
 
 
 def test_check_progress_empty_task_id(test_client: TestClient) -> None:
     """Endpoint accepts empty string as task_id."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_task = MagicMock()
-        mock_task.state = "PENDING"
-        mock_task.info = None
-        mock_result.return_value = mock_task
+    response = test_client.post("/check_progress", json={"task_id": ""})
 
-        response = test_client.post("/check_progress", json={"task_id": ""})
-
-        # Empty string is valid, should check backend and return 404
-        assert response.status_code == status.HTTP_404_NOT_FOUND
+    # Empty string is valid, should check backend and return 404
+    assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
 def test_check_progress_missing_task_id(test_client: TestClient) -> None:
@@ -139,37 +124,33 @@ def test_check_progress_missing_task_id(test_client: TestClient) -> None:
 
 
 def test_check_progress_celery_exception(test_client: TestClient) -> None:
-    """Endpoint handles unexpected Celery exceptions."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_result.side_effect = Exception("Redis connection lost")
-
+    """Endpoint handles unexpected backend exceptions."""
+    with patch(
+        "app.main.read_state", side_effect=Exception("Redis connection lost")
+    ):
         response = test_client.post(
             "/check_progress", json={"task_id": "any-task-id"}
         )
 
-        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
-        data = response.json()
-        assert "Failed to check task progress" in data["detail"]
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    data = response.json()
+    assert "Failed to check task progress" in data["detail"]
 
 
 def test_check_progress_response_schema(test_client: TestClient) -> None:
     """Endpoint response matches ProgressResponse schema."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_task = MagicMock()
-        mock_task.state = "PROGRESS"
-        mock_task.info = {"progress": 0.75}
-        mock_result.return_value = mock_task
+    _store_meta("schema-test-id", "PROGRESS", {"progress": 0.75})
 
-        response = test_client.post(
-            "/check_progress", json={"task_id": "schema-test-id"}
-        )
+    response = test_client.post(
+        "/check_progress", json={"task_id": "schema-test-id"}
+    )
 
-        assert response.status_code == status.HTTP_200_OK
-        data = response.json()
-        # Validate against schema
-        validated = ProgressResponse(**data)
-        assert validated.state in ["PROGRESS", "FINISHED"]
-        assert 0.0 <= validated.progress <= 1.0
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    # Validate against schema
+    validated = ProgressResponse(**data)
+    assert validated.state in ["PROGRESS", "FINISHED"]
+    assert 0.0 <= validated.progress <= 1.0
 
 
 @pytest.mark.parametrize(
@@ -187,22 +168,184 @@ def test_check_progress_state_mapping(
     expected_progress: float,
 ) -> None:
     """Endpoint correctly maps Celery states to API states."""
-    with patch("app.main.celery_app.AsyncResult") as mock_result:
-        mock_task = MagicMock()
-        mock_task.state = celery_state
-
-        if celery_state == "SUCCESS":
-            mock_task.result = {"result": "3.14"}
-        else:
-            mock_task.info = {"progress": expected_progress}
-
-        mock_result.return_value = mock_task
+    if celery_state == "SUCCESS":
+        _store_meta("state-test", celery_state, {"result": "3.14"})
+    else:
+        _store_meta(
+            "state-test", celery_state, {"progress": expected_progress}
+        )
 
-        response = test_client.post(
-            "/check_progress", json={"task_id": "state-test"}
+    response = test_client.post(
+        "/check_progress", json={"task_id": "state-test"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["state"] == expected_api_state
+    assert data["progress"] == expected_progress
+
+
+def test_check_progress_concurrent_polls() -> None:
+    """Concurrent polls are all served by one event loop."""
+    _store_meta("busy-task-id", "PROGRESS", {"progress": 0.5})
+
+    async def poll(n_polls: int) -> list[httpx.Response]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await asyncio.gather(
+                *(
+                    client.post(
+                        "/check_progress", json={"task_id": "busy-task-id"}
+                    )
+                    for _ in range(n_polls)
+                )
+            )
+
+    responses = asyncio.run(poll(1000))
+
+    assert all(r.status_code == status.HTTP_200_OK for r in responses)
+    assert {r.json()["progress"] for r in responses} == {0.5}
+
+
+def test_check_progress_etag(test_client: TestClient) -> None:
+    """Unchanged progress is answered with an empty 304."""
+    _store_meta("etag-task-id", "PROGRESS", {"progress": 0.5})
+    payload = {"task_id": "etag-task-id"}
+
+    etag = test_client.post("/check_progress", json=payload).headers["ETag"]
+    response = test_client.post(
+        "/check_progress", json=payload, headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    _store_meta("etag-task-id", "PROGRESS", {"progress": 0.6})
+    response = test_client.post(
+        "/check_progress", json=payload, headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert response.json()["progress"] == 0.6
+
+
+def test_check_progress_retry_after(test_client: TestClient) -> None:
+    """Retry-After is the expected time to the next progress write."""
+    _store_meta(
+        "eta-task-id",
+        "PROGRESS",
+        {"progress": 0.5, "eta_at": time.time() + 100.0},
+    )
+    celery_app.backend.store_result(
+        "done-task-id", finished_result("3.1416"), "SUCCESS"
+    )
+
+    response = test_client.post(
+        "/check_progress", json={"task_id": "eta-task-id"}
+    )
+    # 1% of progress at 0.5% per second
+    assert response.headers["Retry-After"] == "2"
+
+    response = test_client.post(
+        "/check_progress", json={"task_id": "done-task-id"}
+    )
+    assert "Retry-After" not in response.headers
+
+
+async def _long_poll(
+    payload: dict, headers: dict | None = None
+) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        return await client.post(
+            "/check_progress", json=payload, headers=headers
         )
 
-        assert response.status_code == status.HTTP_200_OK
-        data = response.json()
-        assert data["state"] == expected_api_state
-        assert data["progress"] == expected_progress
+
+@pytest.mark.asyncio
+async def test_check_progress_long_poll_returns_on_change() -> None:
+    """A long poll is answered as soon as the worker writes progress."""
+    _store_meta("waiting-task-id", "PROGRESS", {"progress": 0.2})
+    started = time.monotonic()
+
+    poll = asyncio.create_task(
+        _long_poll({"task_id": "waiting-task-id", "wait_ms": 10_000})
+    )
+    await asyncio.sleep(0.1)
+    assert not poll.done()
+    _store_meta("waiting-task-id", "PROGRESS", {"progress": 0.4})
+    response = await poll
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["progress"] == 0.4
+    assert time.monotonic() - started < 5.0
+
+
+@pytest.mark.asyncio
+async def test_check_progress_long_poll_timeout() -> None:
+    """Without a change, a long poll ends with a 304 after the wait."""
+    _store_meta("idle-task-id", "PROGRESS", {"progress": 0.2})
+    etag = (await _long_poll({"task_id": "idle-task-id"})).headers["ETag"]
+
+    response = await _long_poll(
+        {"task_id": "idle-task-id", "wait_ms": 50},
+        headers={"If-None-Match": etag},
+    )
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_check_progress_long_poll_virtual_reveal() -> None:
+    """During a virtual reveal, a long poll ends with the next digit."""
+    schedule = RevealSchedule(
+        total_chars=5, started_at=time.time(), base_delay=0.05
+    )
+    celery_app.backend.store_result(
+        "revealing-task-id", finished_result("3.1416", schedule), "SUCCESS"
+    )
+    first = await _long_poll({"task_id": "revealing-task-id"})
+
+    response = await _long_poll(
+        {"task_id": "revealing-task-id", "wait_ms": 10_000},
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["progress"] > first.json()["progress"]
+
+
+@pytest.mark.asyncio
+async def test_long_polls_share_one_subscription() -> None:
+    """Concurrent long polls and streams of a process wait on a single
+    pub/sub connection, released once the last one ends."""
+    redis = get_async_redis()
+    task_ids = [f"task-{i}" for i in range(20)]
+    for task_id in task_ids:
+        _store_meta(task_id, "PROGRESS", {"progress": 0.2})
+
+    with patch.object(redis, "pubsub", wraps=redis.pubsub) as pubsub:
+        stream = progress_events("task-0", redis)
+        await anext(stream)
+        polls = [
+            asyncio.create_task(
+                _long_poll({"task_id": task_id, "wait_ms": 10_000})
+            )
+            for task_id in task_ids
+        ]
+        await asyncio.sleep(0.1)
+        for task_id in task_ids:
+            _store_meta(task_id, "PROGRESS", {"progress": 0.4})
+        responses = await asyncio.gather(*polls)
+        assert (await anext(stream))[1]["progress"] == 0.4
+        await stream.aclose()
+
+    assert [r.json()["progress"] for r in responses] == [0.4] * 20
+    pubsub.assert_called_once()
+    assert get_subscriber(redis)._pubsub is None
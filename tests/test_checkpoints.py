@@ -0,0 +1,153 @@
+"""Tests for checkpointed, resumable computations."""
+
+import itertools
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.celery_app import celery_app
+from app.checkpoints import Checkpointer
+from app.engines import get_engine
+from app.engines.chudnovsky import (
+    binary_split,
+    chunked_binary_split,
+    parallel_binary_split,
+)
+from app.engines.spigot import gibbons_digits
+from app.redis_client import get_redis
+from app.settings import settings
+from app.storage.checkpoints import (
+    checkpoint_path,
+    find_checkpoint,
+    record_checkpoint,
+)
+from app.storage.digit_store import DigitStore
+from app.tasks.calculate_pi import calculate_pi_task
+
+
+class Crash(BaseException):
+    """Stands for the worker being killed in the middle of a run."""
+
+
+@pytest.fixture
+def scratch_dir(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[Path]:
+    monkeypatch.setattr(settings, "SCRATCH_DIR", str(tmp_path / "scratch"))
+    yield tmp_path / "scratch"
+
+
+def _crash_at(fraction: float):
+    def on_progress(done: float) -> None:
+        if done >= fraction:
+            raise Crash()
+
+    return on_progress
+
+
+def test_binary_split_resumes_from_checkpoint(tmp_path: Path) -> None:
+    """A resumed split skips the leaves done and gives the same products."""
+    path = str(tmp_path / "split.ckpt")
+
+    with pytest.raises(Crash):
+        chunked_binary_split(
+            0, 100, 8, _crash_at(0.5), Checkpointer(path, interval=0)
+        )
+
+    reports = []
+    products = chunked_binary_split(
+        0, 100, 8, reports.append, Checkpointer(path, interval=0)
+    )
+
+    assert products == binary_split(0, 100)
+    # Crashed reporting the fourth leaf, before saving it
+    assert reports[0] == pytest.approx(4 / 8)
+
+
+def test_parallel_split_resumes_from_checkpoint(tmp_path: Path) -> None:
+    """Parallel splitting only recomputes the leaves not saved."""
+    path = str(tmp_path / "split.ckpt")
+
+    with pytest.raises(Crash):
+        parallel_binary_split(
+            0, 57, 2, _crash_at(0.5), Checkpointer(path, interval=0)
+        )
+
+    reports = []
+    products = parallel_binary_split(
+        0, 57, 2, reports.append, Checkpointer(path, interval=0)
+    )
+
+    assert products == binary_split(0, 57)
+    assert len(reports) < 4
+
+
+def test_checkpoint_of_another_computation_is_ignored(tmp_path: Path) -> None:
+    """States are only restored for the key they were saved under."""
+    checkpointer = Checkpointer(str(tmp_path / "split.ckpt"), interval=0)
+    checkpointer.save(("other",), "state")
+
+    assert checkpointer.load(("other",)) == "state"
+    assert checkpointer.load(("chudnovsky",)) is None
+    assert chunked_binary_split(0, 50, 4, None, checkpointer) == (
+        binary_split(0, 50)
+    )
+
+
+def test_spigot_resumes_from_checkpoint(tmp_path: Path) -> None:
+    """A resumed stream yields the saved digits, then picks up after them."""
+    path = str(tmp_path / "spigot.ckpt")
+    engine = get_engine("spigot")
+
+    with Checkpointer(path, interval=0).activate():
+        blocks = engine.stream(300)
+        interrupted = next(blocks) + next(blocks)
+        blocks.close()
+
+        resumed = list(engine.stream(300))
+
+    assert resumed[0] == interrupted
+    assert "".join(resumed) == engine.compute(300)
+
+
+def test_gibbons_state_resumes_digits() -> None:
+    """The state yielded with a digit resumes the spigot right after it."""
+    digits = list(itertools.islice(gibbons_digits(), 20))
+    _, state = digits[9]
+
+    resumed = itertools.islice(gibbons_digits(state), 10)
+
+    assert [d for d, _ in resumed] == [d for d, _ in digits[10:]]
+
+
+def test_redelivered_task_resumes_from_checkpoint(
+    scratch_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A redelivered task finds its checkpoint in Redis, resumes from it
+    and deletes it once finished."""
+    monkeypatch.setattr(settings, "CHECKPOINT_MIN_SECONDS", 0.0)
+    redis = get_redis()
+    n_digits = 200
+
+    # The checkpoint of the first delivery: a recognizable prefix, then
+    # the spigot state after as many digits
+    _, state = next(itertools.islice(gibbons_digits(), 63, None))
+    path = checkpoint_path("task-id")
+    checkpointer = Checkpointer(path, interval=0)
+    checkpointer.save(("spigot", n_digits + 2), ("3" + "0" * 63, state))
+    record_checkpoint(redis, "task-id", path)
+
+    store = DigitStore(str(tmp_path / "pi_digits"))
+    with patch("app.tasks.calculate_pi.get_digit_store", return_value=store):
+        result = calculate_pi_task.apply(
+            args=(n_digits, "spigot"), task_id="task-id"
+        ).get()
+    celery_app.backend.store_result("task-id", result, "SUCCESS")
+
+    assert result["result"].startswith("3." + "0" * 63)
+    assert result["result"][66:-1] == get_engine("spigot").compute(202)[65:200]
+    assert find_checkpoint(redis, "task-id") is None
+    assert not os.path.exists(path)
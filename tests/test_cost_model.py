@@ -0,0 +1,163 @@
+"""Tests for the cost model, admission control and ETA reporting."""
+
+import json
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.celery_app import celery_app
+from app.cost_model import (
+    CostEstimate,
+    EngineCost,
+    EtaTracker,
+    admission,
+    estimate_cost,
+    get_cost_model,
+    save_cost_model,
+)
+from app.engines import available_engines
+from app.settings import settings
+from app.task_state import resolve_progress
+
+
+def test_fit_recovers_power_law() -> None:
+    """Fits recover the time exponent and the memory per digit."""
+    samples = [
+        (n, 2e-8 * n**1.25, 1000 + 12 * n) for n in [10**4, 10**5, 10**6]
+    ]
+
+    cost = EngineCost.fit(samples)
+
+    assert cost.time_exponent == pytest.approx(1.25)
+    assert cost.seconds(10**7) == pytest.approx(2e-8 * 10**8.75)
+    assert cost.peak_bytes(10**7) == pytest.approx(1000 + 12 * 10**7)
+
+
+def test_calibration_file_overrides_defaults(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Costs saved by the calibration replace the defaults they cover."""
+    path = str(tmp_path / "costs.json")
+    save_cost_model(path, {"spigot": EngineCost(1.0, 1.0, 0.0, 1.0)})
+    monkeypatch.setattr(settings, "COST_MODEL_PATH", path)
+    get_cost_model.cache_clear()
+    try:
+        assert estimate_cost(99, "spigot").seconds == pytest.approx(101.0)
+        assert estimate_cost(99, "chudnovsky").seconds < 1.0
+        assert (
+            json.loads(Path(path).read_text())["spigot"]["time_exponent"]
+            == 1.0
+        )
+    finally:
+        get_cost_model.cache_clear()
+
+
+def test_admission_budgets(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Requests are admitted, deferred or rejected by their estimate."""
+    monkeypatch.setattr(settings, "DEFER_MIN_SECONDS", 10.0)
+    monkeypatch.setattr(settings, "MAX_TASK_SECONDS", 100.0)
+    monkeypatch.setattr(settings, "MAX_TASK_BYTES", 1000)
+
+    assert admission(CostEstimate("chudnovsky", 5.0, 10)) == "admit"
+    assert admission(CostEstimate("chudnovsky", 50.0, 10)) == "defer"
+    assert admission(CostEstimate("chudnovsky", 500.0, 10)) == "reject"
+    assert admission(CostEstimate("chudnovsky", 5.0, 5000)) == "reject"
+
+
+def test_eta_extrapolates_from_progress() -> None:
+    """The model's estimate is used until enough progress is made."""
+    eta = EtaTracker(CostEstimate("chudnovsky", 100.0, 10), 5.0)
+    eta.started_at -= 10.0
+    now = time.time()
+
+    assert eta.meta(0.01)["eta_at"] == pytest.approx(now + 95.0, abs=1)
+    # 10s for a quarter of the work, 30s more and the reveal to go
+    assert eta.meta(0.25)["eta_at"] == pytest.approx(now + 35.0, abs=1)
+    assert eta.meta()["estimated_peak_bytes"] == 10
+
+
+def test_progress_reports_eta() -> None:
+    """The time left counts down while computing and revealing."""
+    progress = resolve_progress(
+        "PROGRESS",
+        {"progress": 0.0, "result": None, "eta_at": 130.0},
+        now=100.0,
+    )
+    assert progress.eta_seconds == pytest.approx(30.0)
+
+    reveal = {"total_chars": 10, "started_at": 100.0, "start_progress": 0.0}
+    finished = {"state": "FINISHED", "result": "3.1", "reveal": reveal}
+    revealing = resolve_progress("SUCCESS", finished, now=100.0)
+    done = resolve_progress("SUCCESS", finished, now=10**6)
+
+    assert revealing.eta_seconds > 0
+    assert done.eta_seconds == 0.0
+
+
+def test_endpoint_rejects_over_budget(
+    test_client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Requests over the budget are refused with their estimate."""
+    monkeypatch.setattr(settings, "MAX_TASK_SECONDS", 1.0)
+
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
+        response = test_client.post("/calculate_pi", json={"n": 10**7})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert "Estimated cost exceeds the budget" in response.json()["detail"]
+    mock_apply.assert_not_called()
+
+
+def test_endpoint_defers_expensive_requests(
+    test_client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Deferred requests run last and report their ETA right away."""
+    monkeypatch.setattr(settings, "DEFER_MIN_SECONDS", 1.0)
+
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
+        mock_apply.return_value = MagicMock(id="task-id")
+        response = test_client.post("/calculate_pi", json={"n": 3 * 10**6})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "deferred" in response.json()["message"]
+    assert mock_apply.call_args.kwargs["priority"] == 9
+
+    task_id = mock_apply.call_args.kwargs["task_id"]
+    info = celery_app.backend.get_task_meta(task_id)["result"]
+    progress = resolve_progress("PROGRESS", info)
+    assert progress.eta_seconds > 1.0
+    assert progress.estimated_peak_bytes > 0
+
+
+def test_fit_with_known_exponent() -> None:
+    """Known exponents are kept, the coefficient fits the largest run."""
+    samples = [(100, 0.01, 0.0), (10**4, 0.3, 1e5), (4 * 10**4, 6.0, 4e5)]
+
+    cost = EngineCost.fit(samples, time_exponent=2.0)
+
+    assert cost.time_exponent == 2.0
+    assert cost.seconds(4 * 10**4) == pytest.approx(6.0)
+
+
+def test_spigot_cost_is_quadratic() -> None:
+    """The spigot's estimate follows its measured quadratic time."""
+    assert estimate_cost(40_000, "spigot").seconds == pytest.approx(
+        5.96, rel=0.1
+    )
+    assert estimate_cost(10**6, "spigot").seconds > 3600
+
+
+def test_engine_digit_limit(test_client: TestClient) -> None:
+    """Engines are not used beyond their hard limit."""
+    response = test_client.post(
+        "/calculate_pi", json={"n": 200_001, "algorithm": "spigot"}
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert "at most 200000 digits" in response.text
+    assert "spigot" not in available_engines(200_001)
+    assert "spigot" in available_engines(200_000)
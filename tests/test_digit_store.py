@@ -0,0 +1,124 @@
+"""Tests for the persistent Pi digit store."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+from mpmath import mp
+
+from app.digits import StablePrefix, format_pi, stable_prefix
+from app.engines import get_engine
+from app.storage.digit_store import HIGH_WATER_MARK_KEY, DigitStore
+from app.tasks.calculate_pi import _get_digits
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> DigitStore:
+    return DigitStore(str(tmp_path / "pi_digits"), redis=fakeredis.FakeRedis())
+
+
+def test_empty_store_has_nothing(store: DigitStore) -> None:
+    """Fresh store reports zero digits and serves no prefix."""
+    assert store.high_water_mark() == 0
+    assert store.read(1) is None
+
+
+def test_extend_and_read_prefix(store: DigitStore) -> None:
+    """Any prefix up to the high-water mark is served by slicing."""
+    store.extend("314159265")
+
+    assert store.high_water_mark() == 9
+    assert store.read(3) == "314"
+    assert store.read(9) == "314159265"
+    assert store.read(10) is None
+
+
+def test_extend_only_appends_missing_tail(store: DigitStore) -> None:
+    """Shorter expansions never shrink or rewrite the stored prefix."""
+    store.extend("31415")
+    store.extend("314")
+    store.extend("3141592")
+
+    assert Path(store.path).read_text() == "3141592"
+
+
+def test_high_water_mark_published_to_redis(store: DigitStore) -> None:
+    """Redis mirrors the largest stored expansion."""
+    store.extend("3141592")
+    store.extend("31")
+
+    assert int(store.redis.get(HIGH_WATER_MARK_KEY)) == 7
+
+
+@pytest.mark.parametrize("n_digits", [1, 2, 3, 4, 5, 10, 50, 761, 1000])
+def test_format_pi_matches_mpmath(n_digits: int) -> None:
+    """Rounding stored digits reproduces mpmath's formatted output."""
+    mp.dps = n_digits + 10
+    expected = mp.nstr(mp.pi, n_digits + 1, strip_zeros=False)
+
+    digits = get_engine("chudnovsky").compute(n_digits + 2)
+
+    assert format_pi(digits, n_digits) == expected
+
+
+def test_format_pi_carries_through_nines() -> None:
+    """Round-up carries through a trailing run of nines."""
+    assert format_pi("3199951", 4) == "3.2000"
+
+
+@pytest.mark.parametrize(
+    "digits,expected",
+    [
+        ("", ""),
+        ("3", ""),
+        ("314", "3.1"),
+        ("31415", "3.141"),
+        ("3199", "3."),
+        ("3141592", "3.14159"),
+        ("31415926", "3.141593"),
+    ],
+)
+def test_stable_prefix(digits: str, expected: str) -> None:
+    """Digits a rounding carry could still change are held back."""
+    assert stable_prefix(digits, 6) == expected
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 5])
+def test_incremental_stable_prefix(block_size: int) -> None:
+    """StablePrefix follows stable_prefix block after block."""
+    digits = "314159265358979"
+    for n_digits in (4, 6, 9, 12):
+        streamed = StablePrefix(n_digits)
+        for start in range(0, len(digits), block_size):
+            streamed.extend(digits[start : start + block_size])
+            received = digits[: len(streamed)]
+            assert streamed.digits == received
+            assert streamed.prefix() == stable_prefix(received, n_digits)
+
+
+def test_stable_prefix_of_complete_digits() -> None:
+    """Once the rounding digit is known the prefix is the result."""
+    assert stable_prefix("3199951", 4) == "3.2000"
+
+
+def test_format_pi_requires_rounding_digit() -> None:
+    """Formatting needs one digit beyond the requested precision."""
+    with pytest.raises(ValueError):
+        format_pi("3141", 3)
+
+
+def test_get_digits_reuses_longer_expansion(store: DigitStore) -> None:
+    """Smaller requests after a large one skip the computation."""
+    with (
+        patch("app.tasks.calculate_pi.get_digit_store", return_value=store),
+        patch("app.tasks.calculate_pi.get_redis", return_value=store.redis),
+    ):
+        large = _get_digits(100)
+
+        with patch("app.tasks.calculate_pi.run_engine") as mock_run:
+            small = _get_digits(20)
+
+    mock_run.assert_not_called()
+    assert large.startswith(small)
+    assert store.high_water_mark() == 102
@@ -0,0 +1,136 @@
+"""Tests for distributed computation of huge requests."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.celery_app import celery_app
+from app.engines import get_engine
+from app.engines.chudnovsky import split_ranges, terms_for
+from app.settings import settings
+from app.storage import DigitStore
+from app.storage.digit_store import HIGH_WATER_MARK_KEY
+from app.tasks.distributed import (
+    COMPUTE_SHARE,
+    binary_split_range_task,
+    merge_partials_task,
+    should_distribute,
+    start_distributed_calculation,
+)
+
+
+@pytest.fixture
+def redis() -> fakeredis.FakeRedis:
+    redis = fakeredis.FakeRedis()
+    with patch("app.tasks.distributed.get_redis", return_value=redis):
+        yield redis
+
+
+@pytest.fixture
+def scratch_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "SCRATCH_DIR", str(tmp_path / "scratch"))
+    return tmp_path / "scratch"
+
+
+def test_should_distribute_large_requests(
+    redis: fakeredis.FakeRedis, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Only large Chudnovsky requests beyond the digit store fan out."""
+    monkeypatch.setattr(settings, "DISTRIBUTED_MIN_DIGITS", 1000)
+
+    assert not should_distribute(999, None)
+    assert should_distribute(1000, None)
+    assert should_distribute(1000, "chudnovsky")
+    assert not should_distribute(1000, "mpmath")
+
+    redis.set(HIGH_WATER_MARK_KEY, 5000)
+    assert not should_distribute(4000, None)
+    assert should_distribute(6000, None)
+
+
+def test_start_distributed_calculation() -> None:
+    """The chord body runs under the job id with a failure errback."""
+    with patch("app.tasks.distributed.chord") as mock_chord:
+        job_id = start_distributed_calculation(100_000, None, "job-id", 7)
+
+    assert job_id == "job-id"
+    header, body = mock_chord.call_args.args
+    assert len(header.tasks) == settings.DISTRIBUTED_PARTS
+    assert {task.options["priority"] for task in header.tasks} == {7}
+    assert body.args == (100_000, None)
+    assert body.options["priority"] == 7
+    assert body.options["link_error"]
+    mock_chord.return_value.apply_async.assert_called_once_with(task_id=job_id)
+
+
+def test_distributed_pipeline_matches_engine(
+    redis: fakeredis.FakeRedis, scratch_dir: Path, tmp_path: Path
+) -> None:
+    """Merged partial products give the same digits as a single engine."""
+    n_digits = 3000
+    ranges = split_ranges(0, terms_for(n_digits + 2), 5)
+    store = DigitStore(str(tmp_path / "pi_digits"))
+
+    with patch.object(celery_app.backend, "store_result") as mock_store:
+        paths = [
+            binary_split_range_task("job-id", a, b, len(ranges))
+            for a, b in ranges
+        ]
+
+    progress = [call.args[1]["progress"] for call in mock_store.call_args_list]
+    assert progress[-1] == pytest.approx(COMPUTE_SHARE)
+    assert progress == sorted(progress)
+
+    with (
+        patch.object(merge_partials_task, "update_state"),
+        patch("app.tasks.distributed.get_digit_store", return_value=store),
+        patch("app.tasks.distributed.reveal") as mock_reveal,
+    ):
+        merge_partials_task.apply(args=(paths, n_digits), task_id="job-id")
+
+    expected = get_engine("chudnovsky").compute(n_digits + 2)
+    assert store.read(n_digits + 2) == expected
+    pi_value = mock_reveal.call_args.args[1]
+    assert pi_value.replace(".", "")[:-1] == expected[:n_digits]
+    assert not (scratch_dir / "job-id").exists()
+
+
+def test_calculate_pi_distributes_large_requests(
+    test_client: TestClient,
+) -> None:
+    """Endpoint returns the distributed job id for huge requests."""
+    with (
+        patch("app.main.should_distribute", return_value=True),
+        patch(
+            "app.main.start_distributed_calculation",
+            return_value="distributed-job-id",
+        ) as mock_start,
+        patch("app.main.calculate_pi_task.apply_async") as mock_apply,
+    ):
+        response = test_client.post("/calculate_pi", json={"n": 10**7})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["task_id"] == "distributed-job-id"
+    mock_start.assert_called_once()
+    assert mock_start.call_args.args[:2] == (10**7, None)
+    # The priority of its route, like any calculation of its size
+    assert mock_start.call_args.args[3] == 7
+    mock_apply.assert_not_called()
+
+
+def test_failed_subtask_fails_the_job(
+    redis: fakeredis.FakeRedis, scratch_dir: Path
+) -> None:
+    """Merging fails loudly when a partial product is missing."""
+    with patch.object(merge_partials_task, "update_state"):
+        result = merge_partials_task.apply(
+            args=([str(scratch_dir / "missing.pqt")], 100),
+            task_id="job-id",
+        )
+
+    assert result.failed()
+    assert isinstance(result.result, FileNotFoundError)
@@ -0,0 +1,171 @@
+"""Tests for the Pi engine registry and engines."""
+
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from mpmath import mp
+
+from app.engines import (
+    EngineRun,
+    available_engines,
+    get_engine,
+    measured_throughputs,
+    record_throughput,
+    select_engine,
+    size_bucket,
+)
+from app.engines.chudnovsky import (
+    ChudnovskyEngine,
+    binary_split,
+    parallel_binary_split,
+    split_ranges,
+)
+
+
+def _reference_digits(n_chars: int) -> str:
+    mp.dps = n_chars + 20
+    digits = mp.nstr(mp.pi, n_chars + 20, strip_zeros=False)
+    return digits.replace(".", "")[:n_chars]
+
+
+@pytest.mark.parametrize("engine_name", ["mpmath", "chudnovsky", "spigot"])
+@pytest.mark.parametrize("n_chars", [1, 2, 15, 16, 100, 5000])
+def test_engine_matches_reference(engine_name: str, n_chars: int) -> None:
+    """Every engine returns the same truncated digits."""
+    assert get_engine(engine_name).compute(n_chars) == _reference_digits(
+        n_chars
+    )
+
+
+def test_chudnovsky_without_gmpy2() -> None:
+    """Chudnovsky falls back to plain Python ints."""
+    with patch("app.bigint.HAS_GMPY2", False):
+        digits = get_engine("chudnovsky").compute(3000)
+
+    assert digits == _reference_digits(3000)
+
+
+def test_unknown_engine_rejected() -> None:
+    """Unknown engine names raise ValueError."""
+    with pytest.raises(ValueError):
+        get_engine("abacus")
+
+
+def test_size_bucket() -> None:
+    """Buckets group sizes by order of magnitude."""
+    assert size_bucket(9) == 1
+    assert size_bucket(100) == 3
+    assert size_bucket(999) == 3
+    assert size_bucket(10**6) == 7
+
+
+def test_select_engine_models_unmeasured_engines() -> None:
+    """Engines are ranked by the cost model while a bucket has no
+    measurements, and the default engine is used without one."""
+    engine = select_engine(150_002, fakeredis.FakeRedis())
+    assert engine.name == "mpmath"
+
+    with patch("app.cost_model.get_cost_model", return_value={}):
+        engine = select_engine(150_002, fakeredis.FakeRedis())
+    assert engine.name == "chudnovsky"
+
+
+def test_select_engine_picks_fastest_measured() -> None:
+    """The engine with the highest measured digits/sec wins its bucket."""
+    redis = fakeredis.FakeRedis()
+    record_throughput(redis, EngineRun("chudnovsky", "3" * 1000, 0.002))
+    record_throughput(redis, EngineRun("mpmath", "3" * 1000, 0.001))
+
+    assert select_engine(1000, redis).name == "mpmath"
+    # Other buckets are unaffected
+    assert select_engine(10, redis).name == "spigot"
+
+
+def test_explicit_runs_do_not_lock_in_selection() -> None:
+    """A slow explicitly requested engine, measured alone in a bucket,
+    still competes with the modelled engines and is not selected."""
+    redis = fakeredis.FakeRedis()
+    record_throughput(
+        redis, EngineRun("spigot", "3" * 150_002, 83.0), selected=False
+    )
+    assert select_engine(150_002, redis).name != "spigot"
+
+    # Even measured by a selected run, it loses to the modelled engines
+    record_throughput(redis, EngineRun("spigot", "3" * 150_002, 83.0))
+    assert select_engine(150_002, redis).name != "spigot"
+    assert measured_throughputs(redis, 6, selected=False) == {
+        "spigot": 150_002 / 83.0
+    }
+
+
+def test_calculate_pi_passes_algorithm(test_client: TestClient) -> None:
+    """Endpoint forwards the requested algorithm to the task."""
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
+        mock_apply.return_value.id = "algorithm-task-id"
+
+        response = test_client.post(
+            "/calculate_pi", json={"n": 10, "algorithm": "mpmath"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        mock_apply.assert_called_once()
+        assert mock_apply.call_args.args == ((10, "mpmath", "mpmath"),)
+
+
+def test_calculate_pi_rejects_unknown_algorithm(
+    test_client: TestClient,
+) -> None:
+    """Endpoint rejects unknown algorithm names."""
+    response = test_client.post(
+        "/calculate_pi", json={"n": 10, "algorithm": "abacus"}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+def test_list_engines_reports_throughput(test_client: TestClient) -> None:
+    """Engines endpoint lists engines with measured digits/sec."""
+    redis = fakeredis.FakeRedis()
+    record_throughput(redis, EngineRun("chudnovsky", "3" * 500, 0.5))
+
+    with patch("app.main.get_redis", return_value=redis):
+        response = test_client.get("/engines")
+
+    assert response.status_code == status.HTTP_200_OK
+    engines = {engine["name"]: engine for engine in response.json()}
+    assert set(engines) == set(available_engines())
+    assert engines["chudnovsky"]["digits_per_second"] == {"3": 1000.0}
+    assert engines["mpmath"]["digits_per_second"] == {}
+
+
+def test_parallel_chudnovsky_matches_serial() -> None:
+    """Multi-core binary splitting yields the same digits."""
+    engine = ChudnovskyEngine(workers=2, parallel_min_digits=1)
+
+    assert engine.compute(20000) == _reference_digits(20000)
+
+
+def test_parallel_binary_split_merges_in_tree() -> None:
+    """Tree-merged partial products equal the serial products."""
+    assert parallel_binary_split(0, 57, 3) == binary_split(0, 57)
+
+
+def test_split_ranges_cover_term_range() -> None:
+    """Term ranges are adjacent, non-empty and cover [a, b)."""
+    ranges = split_ranges(0, 5, 8)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == 5
+    assert all(lo < hi for lo, hi in ranges)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_small_requests_stay_serial() -> None:
+    """Requests below the threshold never start a process pool."""
+    engine = ChudnovskyEngine(workers=4, parallel_min_digits=10_000)
+
+    with patch("app.engines.chudnovsky.parallel_binary_split") as mock_split:
+        engine.compute(1000)
+
+    mock_split.assert_not_called()
@@ -0,0 +1,200 @@
+"""Tests for the load generator."""
+
+import json
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from app.celery_app import celery_app
+from app.digits import format_pi
+from app.loadtest import (
+    RETRY_BACKOFF,
+    RETRY_BACKOFF_MAX,
+    LoadTestConfig,
+    LoadTestRecorder,
+    TaskSample,
+    format_summary,
+    main,
+    parse_n_weights,
+    retry_delay,
+    run_load_test,
+    summarize,
+)
+from app.redis_client import get_redis
+from app.singleflight import release
+from app.tasks.calculate_pi import (
+    finish_subscribers,
+    finished_result,
+    mark_cancelled,
+)
+
+
+@pytest.fixture
+def instant_worker() -> Iterator[None]:
+    """Tasks are started and finished as soon as they are queued."""
+
+    def apply_async(args: tuple, task_id: str, **_: object) -> MagicMock:
+        n_digits, algorithm, _ = args
+        digits = "3" + "1" * (n_digits + 1)
+        celery_app.backend.store_result(task_id, {"pid": 1}, "STARTED")
+        finish_subscribers(task_id, algorithm, digits)
+        celery_app.backend.store_result(
+            task_id, finished_result(format_pi(digits, n_digits)), "SUCCESS"
+        )
+        release(get_redis(), algorithm, n_digits, task_id)
+        return MagicMock(id=task_id)
+
+    with patch(
+        "app.main.calculate_pi_task.apply_async", side_effect=apply_async
+    ):
+        yield
+
+
+@pytest.mark.parametrize("mode", ["poll", "long-poll", "stream"])
+def test_load_test_in_process(
+    instant_worker: None, mode: str, capsys: pytest.CaptureFixture
+) -> None:
+    """Clients complete tasks and every measurement is reported."""
+    exit_code = main(
+        [
+            "--in-process",
+            "--clients",
+            "3",
+            "--duration",
+            "0.3",
+            "--n",
+            "10",
+            "--mode",
+            mode,
+            "--poll-interval",
+            "0.01",
+            "--json",
+        ]
+    )
+
+    summary = json.loads(capsys.readouterr().out)
+    assert exit_code == 0
+    assert summary["tasks"]["completed"] == summary["tasks"]["submitted"] > 0
+    assert summary["errors"] == 0
+    assert summary["latency_ms"]["calculate_pi"]["p99"] > 0
+    follow = "stream" if mode == "stream" else "check_progress"
+    assert summary["latency_ms"][follow]["count"] > 0
+    assert summary["completion_s"]["count"] == summary["tasks"]["completed"]
+    assert summary["queue_wait_s"]["count"] > 0
+    assert summary["queue_wait_s"]["p50"] >= 0
+
+
+@pytest.mark.parametrize("mode", ["poll", "long-poll", "stream"])
+def test_load_test_stops_following_cancelled_tasks(
+    mode: str, capsys: pytest.CaptureFixture
+) -> None:
+    """Clients give up on cancelled tasks instead of waiting for them
+    until the task timeout."""
+
+    def apply_async(args: tuple, task_id: str, **_: object) -> MagicMock:
+        mark_cancelled(task_id)
+        release(get_redis(), args[1], args[0], task_id)
+        return MagicMock(id=task_id)
+
+    with patch(
+        "app.main.calculate_pi_task.apply_async", side_effect=apply_async
+    ):
+        main(
+            [
+                "--in-process",
+                "--clients",
+                "2",
+                "--duration",
+                "0.2",
+                "--n",
+                "10",
+                "--mode",
+                mode,
+                "--poll-interval",
+                "0.01",
+                "--task-timeout",
+                "30",
+                "--json",
+            ]
+        )
+
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["elapsed"] < 10
+    assert summary["tasks"]["failed"] == summary["tasks"]["submitted"] > 0
+
+
+@pytest.mark.asyncio
+async def test_load_test_backs_off_throttled_submissions() -> None:
+    """Clients wait as long as a throttled submission's Retry-After says
+    instead of retrying in a tight loop."""
+    submissions = []
+
+    def throttled(request: httpx.Request) -> httpx.Response:
+        submissions.append(request)
+        return httpx.Response(429, headers={"Retry-After": "0.1"})
+
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(throttled), base_url="http://test"
+    ) as client:
+        summary = await run_load_test(
+            client, LoadTestConfig(clients=2, duration=0.25)
+        )
+
+    assert summary["tasks"]["submitted"] == 0
+    # Three submissions per client at most: at 0, 0.1 and 0.2 seconds
+    assert 2 <= len(submissions) <= 6
+
+
+def test_retry_delay() -> None:
+    """Retry-After is honoured, in seconds or as a date; without it the
+    delay doubles per consecutive failure, up to a maximum."""
+    response = httpx.Response(503, headers={"Retry-After": "3"})
+    assert retry_delay(response, 1) == 3.0
+    later = format_datetime(
+        datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True
+    )
+    response = httpx.Response(503, headers={"Retry-After": later})
+    assert 58 < retry_delay(response, 1) <= 60
+
+    response = httpx.Response(500)
+    assert retry_delay(response, 1) == RETRY_BACKOFF
+    assert retry_delay(response, 3) == 4 * RETRY_BACKOFF
+    assert retry_delay(response, 100) == RETRY_BACKOFF_MAX
+
+
+def test_parse_n_weights() -> None:
+    """Distributions map n to weights, 1 by default."""
+    assert parse_n_weights("100:5, 1000:0.5,10000") == {
+        100: 5.0,
+        1000: 0.5,
+        10000: 1.0,
+    }
+    with pytest.raises(ValueError):
+        parse_n_weights("100:0")
+    with pytest.raises(ValueError):
+        parse_n_weights("many")
+
+
+def test_summary_table() -> None:
+    """The table lists every endpoint, completion and queue wait."""
+    recorder = LoadTestRecorder()
+    recorder.latencies["calculate_pi"] += [0.010, 0.020]
+    recorder.tasks += [
+        TaskSample("a", 10, submitted_at=0.0, finished_at=2.0),
+        TaskSample("b", 10, submitted_at=1.0, failed=True),
+    ]
+    recorder.started_at["a"] = 0.5
+
+    summary = summarize(recorder, elapsed=4.0)
+    table = format_summary(summary)
+
+    assert summary["tasks"]["completed"] == 1
+    assert summary["tasks"]["failed"] == 1
+    assert summary["queue_wait_s"]["p50"] == 0.5
+    assert "calculate_pi (ms)" in table
+    assert "task completion (s)" in table
+    assert "queue wait (s)" in table
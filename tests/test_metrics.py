@@ -0,0 +1,99 @@
+"""Tests for the Prometheus metrics of the API and the worker."""
+
+import json
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.metrics import PUBLISHED_AT_HEADER, _json_size
+from app.storage.digit_store import DigitStore
+from app.tasks.calculate_pi import calculate_pi_task
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_endpoint(test_client: TestClient) -> None:
+    """/metrics exposes request latencies labelled by route template."""
+    labels = {
+        "method": "GET",
+        "endpoint": "/progress/{task_id}/stream",
+        "status": "404",
+    }
+    before = _sample("pi_http_request_duration_seconds_count", **labels)
+
+    test_client.get("/progress/unknown-id/stream")
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "pi_http_request_duration_seconds_bucket" in response.text
+    assert (
+        _sample("pi_http_request_duration_seconds_count", **labels)
+        == before + 1
+    )
+
+
+def test_task_metrics(tmp_path: Path) -> None:
+    """A calculation records its phases, writes and digit store lookups."""
+    task = calculate_pi_task.name
+    phases = ["queue_wait", "compute", "conversion", "reveal"]
+    before = {
+        phase: _sample("pi_task_phase_seconds_count", phase=phase, bucket="2")
+        for phase in phases
+    }
+    misses = _sample("pi_digit_store_lookups_total", result="miss")
+    hits = _sample("pi_digit_store_lookups_total", result="hit")
+    writes = _sample("pi_progress_writes_total")
+    result_bytes = _sample("pi_backend_bytes_written_total", kind="result")
+
+    store = DigitStore(str(tmp_path / "pi_digits"))
+    with patch("app.tasks.calculate_pi.get_digit_store", return_value=store):
+        for _ in range(2):
+            calculate_pi_task.apply(
+                args=(20, "chudnovsky"),
+                headers={PUBLISHED_AT_HEADER: time.time() - 1.0},
+            )
+
+    after = {
+        phase: _sample("pi_task_phase_seconds_count", phase=phase, bucket="2")
+        for phase in phases
+    }
+    assert after["queue_wait"] == before["queue_wait"] + 2
+    assert after["compute"] == before["compute"] + 1
+    assert after["conversion"] >= before["conversion"] + 1
+    assert after["reveal"] == before["reveal"] + 2
+    assert (
+        _sample("pi_task_phase_seconds_sum", phase="queue_wait", bucket="2")
+        >= 2.0
+    )
+    assert _sample("pi_digit_store_lookups_total", result="miss") == misses + 1
+    assert _sample("pi_digit_store_lookups_total", result="hit") == hits + 1
+    assert _sample("pi_progress_writes_total") > writes
+    assert (
+        _sample("pi_backend_bytes_written_total", kind="result") > result_bytes
+    )
+    assert _sample("pi_tasks_in_flight", task=task) == 0
+    assert _sample(
+        "pi_task_duration_seconds_count", task=task, state="SUCCESS"
+    )
+
+
+def test_json_size_of_task_meta() -> None:
+    """Backend writes are measured without serializing them."""
+    meta = {
+        "progress": 0.25,
+        "result": None,
+        "partial_result": "3.14159",
+        "phases": {"compute": 1.5, "reveal": 0},
+        "reveal": {"started_at": 1e9, "done": False},
+        "digits": ["31", 4, []],
+        "empty": {},
+    }
+
+    assert _json_size(meta) == len(json.dumps(meta))
+    assert _json_size("3." + "1" * 10**6) == 10**6 + 4
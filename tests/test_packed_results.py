@@ -0,0 +1,112 @@
+"""Tests for packed storage of finished results."""
+
+import json
+
+import fakeredis
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.celery_app import celery_app
+from app.settings import settings
+from app.storage.results import (
+    RESULT_KEY,
+    pack_digits,
+    store_packed_result,
+    unpack_digits,
+)
+from app.tasks.calculate_pi import finished_result
+
+
+PI_VALUE = "3." + "1415926535" * 100
+
+
+@pytest.fixture
+def pack_small_results(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "RESULT_PACK_MIN_DIGITS", 100)
+
+
+@pytest.mark.parametrize("digits", ["3", "31", "314", "3141592653589793"])
+def test_pack_round_trip(digits: str) -> None:
+    """Packing stores two digits per byte and unpacks losslessly."""
+    packed = pack_digits(digits)
+
+    assert len(packed) == (len(digits) + 1) // 2
+    assert unpack_digits(packed) == digits
+
+
+@pytest.mark.parametrize("start,length", [(0, 5), (1, 4), (7, 3), (14, 2)])
+def test_unpack_range(start: int, length: int) -> None:
+    """A digit range is unpacked from the bytes that hold it."""
+    digits = "3141592653589793"
+    packed = pack_digits(digits)
+    first_byte, end_byte = start // 2, (start + length + 1) // 2
+
+    assert (
+        unpack_digits(packed[first_byte:end_byte], start, length)
+        == digits[start : start + length]
+    )
+
+
+def test_large_result_is_packed(
+    fake_redis: fakeredis.FakeRedis, pack_small_results: None
+) -> None:
+    """Large results are referenced from the meta, at half the size."""
+    result = finished_result(PI_VALUE, task_id="big")
+
+    assert result["result"] is None
+    assert result["result_ref"] == {
+        "key": RESULT_KEY.format(task_id="big"),
+        "length": len(PI_VALUE) - 1,
+    }
+    packed = fake_redis.get(result["result_ref"]["key"])
+    inline = json.dumps(finished_result(PI_VALUE))
+    assert len(packed) + len(json.dumps(result)) < len(inline) / 2 + 100
+
+
+def test_small_result_stays_inline(pack_small_results: None) -> None:
+    """Results below the threshold are stored inline."""
+    result = finished_result("3.1416", task_id="small")
+
+    assert result["result"] == "3.1416"
+    assert "result_ref" not in result
+
+
+def test_check_progress_decodes_packed_result(
+    test_client: TestClient, pack_small_results: None
+) -> None:
+    """The API returns the full digits of a packed result."""
+    celery_app.backend.store_result(
+        "big", finished_result(PI_VALUE, task_id="big"), "SUCCESS"
+    )
+
+    response = test_client.post("/check_progress", json={"task_id": "big"})
+    batch = test_client.post(
+        "/check_progress/batch", json={"task_ids": ["big"]}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["result"] == PI_VALUE
+    assert batch.json()["tasks"]["big"]["result"] == PI_VALUE
+
+
+def test_stream_decodes_packed_result(
+    test_client: TestClient, fake_redis: fakeredis.FakeRedis
+) -> None:
+    """Streams send the full digits of a packed result."""
+    ref = store_packed_result(fake_redis, "big", PI_VALUE)
+    celery_app.backend.store_result(
+        "big",
+        {
+            "state": "FINISHED",
+            "progress": 1.0,
+            "result": None,
+            "result_ref": ref,
+        },
+        "SUCCESS",
+    )
+
+    response = test_client.get("/progress/big/stream")
+
+    data = json.loads(response.text.split("data: ", 1)[1])
+    assert data["result"] == PI_VALUE
@@ -0,0 +1,158 @@
+"""Tests for task phase timings and opt-in profiling."""
+
+import pstats
+import tracemalloc
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.celery_app import celery_app
+from app.main import app
+from app.phases import PhaseTimer, phase
+from app.profiling import _shared_tracing
+from app.settings import settings
+from app.storage.digit_store import DigitStore
+from app.tasks.calculate_pi import calculate_pi_task
+
+
+@pytest.fixture
+def fresh_store(tmp_path: Path) -> Iterator[DigitStore]:
+    store = DigitStore(str(tmp_path / "pi_digits"))
+    with patch("app.tasks.calculate_pi.get_digit_store", return_value=store):
+        yield store
+
+
+@pytest.fixture
+def admin_client(monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    return TestClient(app, headers={"X-Admin-Token": "secret"})
+
+
+def _run_task(task_id: str, n_digits: int = 50) -> dict:
+    result = calculate_pi_task.apply(
+        args=(n_digits, "chudnovsky"), task_id=task_id
+    ).get()
+    celery_app.backend.store_result(task_id, result, "SUCCESS")
+    return result
+
+
+def test_phase_timer_accumulates_nested_phases() -> None:
+    """Phases accumulate when repeated, nest, and are no-ops unobserved."""
+    with phase("ignored"):
+        pass
+
+    timer = PhaseTimer()
+    with timer.activate():
+        for _ in range(2):
+            with phase("outer"), phase("inner"):
+                pass
+
+    assert list(timer.seconds) == ["outer", "inner"]
+    assert timer.seconds["outer"] >= timer.seconds["inner"] > 0
+
+
+def test_task_phases_endpoint(
+    fresh_store: DigitStore, admin_client: TestClient
+) -> None:
+    """Finished calculations report the time of each phase."""
+    result = _run_task("task-id")
+
+    response = admin_client.get("/admin/tasks/task-id/phases")
+
+    assert response.status_code == status.HTTP_200_OK
+    phases = response.json()["phases"]
+    assert phases == result["phases"]
+    for name in [
+        "digit_store_read",
+        "compute",
+        "binary_splitting",
+        "final_division",
+        "conversion",
+        "digit_store_write",
+        "release",
+    ]:
+        assert name in phases
+    assert phases["compute"] >= phases["conversion"]
+    assert response.json()["profile"] is None
+
+
+def test_task_phases_of_unfinished_tasks(admin_client: TestClient) -> None:
+    """Unknown and running tasks have no phase timings."""
+    response = admin_client.get("/admin/tasks/unknown-id/phases")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    celery_app.backend.store_result(
+        "running-id", {"progress": 0.5, "result": None}, "PROGRESS"
+    )
+    response = admin_client.get("/admin/tasks/running-id/phases")
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "tracemalloc"])
+def test_profiling_switched_at_runtime(
+    fresh_store: DigitStore,
+    admin_client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    mode: str,
+) -> None:
+    """Profiles are saved once enabled, for tasks over a threshold."""
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path / "profiles"))
+    assert admin_client.get("/admin/profiling").json()["mode"] == "off"
+
+    config = {"mode": mode, "min_digits": 1000, "min_seconds": 60}
+    response = admin_client.put("/admin/profiling", json=config)
+    assert response.status_code == status.HTTP_200_OK
+    assert admin_client.get("/admin/profiling").json() == config
+
+    # Under both thresholds: profiled, but not saved
+    assert "profile" not in _run_task("small-id", n_digits=50)
+
+    profile = _run_task("large-id", n_digits=1000)["profile"]
+    assert profile["mode"] == mode
+    if mode == "cprofile":
+        assert pstats.Stats(profile["path"]).total_calls > 0
+    else:
+        assert tracemalloc.Snapshot.load(profile["path"]).traces
+        assert profile["peak_bytes"] > 0
+        assert not tracemalloc.is_tracing()
+
+    response = admin_client.get("/admin/tasks/large-id/phases")
+    assert response.json()["profile"] == profile
+
+
+def test_tracemalloc_shared_by_concurrent_tasks() -> None:
+    """Tracing stops with the last task using it, not the first."""
+    with _shared_tracing():
+        with _shared_tracing():
+            pass
+        assert tracemalloc.is_tracing()
+
+    assert not tracemalloc.is_tracing()
+
+
+def test_admin_token(
+    test_client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Admin endpoints are disabled without an admin token, and require
+    it once one is set."""
+    for token in (None, ""):
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", token)
+        response = test_client.get(
+            "/admin/profiling", headers={"X-Admin-Token": ""}
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+
+    response = test_client.get("/admin/profiling")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    response = test_client.get(
+        "/admin/profiling", headers={"X-Admin-Token": "secret"}
+    )
+    assert response.status_code == status.HTTP_200_OK
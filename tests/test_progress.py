@@ -0,0 +1,206 @@
+"""Tests for progress reporting of tasks and engines."""
+
+import json
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+import pytest
+
+from app.engines import get_engine
+from app.engines.chudnovsky import (
+    ChudnovskyEngine,
+    binary_split,
+    chunked_binary_split,
+)
+from app.progress import PROGRESS_CHANNEL, ProgressReporter
+from app.settings import settings
+from app.storage import DigitStore
+from app.tasks.calculate_pi import calculate_pi_task, reveal
+
+
+def _written_progress(task: MagicMock) -> list[float]:
+    return [
+        call.kwargs["meta"]["progress"]
+        for call in task.update_state.call_args_list
+    ]
+
+
+def test_reporter_coalesces_small_steps() -> None:
+    """Steps below min_delta within min_interval are not written."""
+    task = MagicMock()
+    reporter = ProgressReporter(
+        task, task_id="t", min_interval=60.0, min_delta=0.1
+    )
+
+    for i in range(1, 1001):
+        reporter.report(i / 1000)
+
+    # First report, then one write per 0.1 advance
+    assert reporter.writes == task.update_state.call_count
+    assert reporter.writes <= 11
+    assert task.update_state.call_args.kwargs["task_id"] == "t"
+
+
+def test_reporter_flushes_final_state() -> None:
+    """flush() writes the latest state even below the thresholds."""
+    task = MagicMock()
+    reporter = ProgressReporter(
+        task, task_id="t", min_interval=60.0, min_delta=0.5
+    )
+
+    reporter.report(0.1)
+    reporter.report(0.2)
+    reporter.flush()
+    reporter.flush()
+
+    assert _written_progress(task) == [0.1, 0.2]
+
+
+def test_reporter_builds_lazy_meta_on_write() -> None:
+    """Meta passed as a function is only built for written states."""
+    task = MagicMock()
+    reporter = ProgressReporter(
+        task, task_id="t", min_interval=60.0, min_delta=0.5
+    )
+    built = []
+
+    def report(fraction: float) -> None:
+        def meta() -> dict:
+            built.append(fraction)
+            return {"progress": fraction, "result": None}
+
+        reporter.report(fraction, meta)
+
+    for fraction in (0.1, 0.2, 0.3, 0.7, 0.8):
+        report(fraction)
+    reporter.flush()
+
+    assert built == [0.1, 0.7, 0.8]
+    assert _written_progress(task) == built
+
+
+def test_reporter_writes_after_interval() -> None:
+    """A changed progress is written once min_interval has passed."""
+    task = MagicMock()
+    reporter = ProgressReporter(
+        task, task_id="t", min_interval=0.5, min_delta=1.0
+    )
+
+    with patch(
+        "app.progress.time.monotonic", side_effect=[0.0, 0.1, 0.6, 0.6]
+    ):
+        reporter.report(0.1)
+        reporter.report(0.2)
+        reporter.report(0.3)
+
+    assert _written_progress(task) == [0.1, 0.3]
+
+
+def test_reporter_skips_unchanged_progress() -> None:
+    """Repeated reports of the same progress are never written."""
+    task = MagicMock()
+    reporter = ProgressReporter(
+        task, task_id="t", min_interval=0.0, min_delta=0.0
+    )
+
+    for _ in range(10):
+        reporter.report(0.5)
+
+    assert reporter.writes == 1
+
+
+def test_reporter_publishes_writes(fake_redis: fakeredis.FakeRedis) -> None:
+    """Written states are published on the task's pub/sub channel."""
+    pubsub = fake_redis.pubsub()
+    pubsub.subscribe(PROGRESS_CHANNEL.format(task_id="t"))
+    pubsub.get_message(timeout=1)  # Subscription confirmation
+
+    reporter = ProgressReporter(MagicMock(), task_id="t", redis=fake_redis)
+    reporter.report(0.25)
+
+    message = pubsub.get_message(timeout=1)
+    assert json.loads(message["data"]) == {
+        "state": "PROGRESS",
+        "progress": 0.25,
+        "result": None,
+    }
+
+
+def test_worker_reveal_writes_are_bounded(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Worker reveal writes are bounded by 1/min_delta, not by digits."""
+    monkeypatch.setattr(settings, "REVEAL_MODE", "worker")
+    monkeypatch.setattr(settings, "PROGRESS_MIN_INTERVAL", 60.0)
+    task = MagicMock()
+
+    with patch("app.tasks.calculate_pi.time.sleep"):
+        reveal(task, "3." + "1" * 5000)
+
+    progress = _written_progress(task)
+    assert len(progress) <= 1 / settings.PROGRESS_MIN_DELTA + 2
+    assert progress[-1] == 1.0
+
+
+def test_chunked_binary_split_matches_binary_split() -> None:
+    """Chunked merging gives the same products, reporting every leaf."""
+    reports = []
+    products = chunked_binary_split(
+        0, 100, chunks=7, on_progress=reports.append
+    )
+
+    assert products == binary_split(0, 100)
+    assert len(reports) == 7
+    assert reports[-1] == 1.0
+    assert reports == sorted(reports)
+
+
+def test_engine_reports_progress() -> None:
+    """The Chudnovsky engine reports increasing progress up to 1.0."""
+    reports = []
+    ChudnovskyEngine(workers=1).compute(2000, on_progress=reports.append)
+
+    assert reports == sorted(reports)
+    assert reports[-1] == 1.0
+
+
+def test_spigot_streams_blocks() -> None:
+    """The spigot engine yields blocks as it computes them."""
+    reports = []
+    blocks = list(get_engine("spigot").stream(200, on_progress=reports.append))
+
+    assert len(blocks) > 1
+    assert "".join(blocks) == get_engine("chudnovsky").compute(200)
+    assert reports == sorted(reports)
+    assert reports[-1] == 1.0
+
+
+def test_streaming_task_reports_partial_results(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Streaming engines publish real progress and final prefixes."""
+    monkeypatch.setattr(settings, "PROGRESS_MIN_DELTA", 0.0)
+    monkeypatch.setattr(settings, "PROGRESS_MIN_INTERVAL", 0.0)
+    store = DigitStore(str(tmp_path / "pi_digits"))
+
+    with (
+        patch("app.tasks.calculate_pi.get_digit_store", return_value=store),
+        patch.object(calculate_pi_task, "update_state") as update_state,
+    ):
+        result = calculate_pi_task.apply(
+            args=(300, "spigot"), task_id="task-id"
+        ).get()
+
+    metas = [call.kwargs["meta"] for call in update_state.call_args_list]
+    assert len(metas) > 1
+    assert [meta["progress"] for meta in metas] == sorted(
+        meta["progress"] for meta in metas
+    )
+    assert all(
+        result["result"].startswith(meta["partial_result"]) for meta in metas
+    )
+    assert len(metas[-1]["partial_result"]) > 290
+    # Digits were produced for real, there is nothing left to reveal
+    assert result["state"] == "FINISHED"
+    assert "reveal" not in result
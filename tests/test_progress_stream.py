@@ -0,0 +1,187 @@
+"""Tests for the SSE / WebSocket progress stream."""
+
+import json
+import time
+
+import fakeredis
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.celery_app import celery_app
+from app.progress import PROGRESS_CHANNEL
+from app.redis_client import get_async_redis
+from app.reveal import RevealSchedule
+from app.settings import settings
+from app.streaming import progress_events
+from app.tasks.calculate_pi import finished_result
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _store_progress(task_id: str, progress: float) -> None:
+    celery_app.backend.store_result(
+        task_id, {"progress": progress, "result": None}, "PROGRESS"
+    )
+
+
+def test_stream_task_not_found(test_client: TestClient) -> None:
+    """Stream returns 404 for non-existent task."""
+    response = test_client.get("/progress/non-existent-id/stream")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert "Task not found" in response.json()["detail"]
+
+
+def test_stream_finished_task(test_client: TestClient) -> None:
+    """A finished task streams a single finished event."""
+    celery_app.backend.store_result(
+        "done", finished_result("3.1416"), "SUCCESS"
+    )
+
+    response = test_client.get("/progress/done/stream?digits=true")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert _parse_sse(response.text) == [
+        (
+            "finished",
+            {
+                "state": "FINISHED",
+                "progress": 1.0,
+                "result": "3.1416",
+                "partial_result": None,
+                "eta_seconds": 0.0,
+                "estimated_peak_bytes": None,
+                "digits": "3.1416",
+            },
+        )
+    ]
+
+
+def test_stream_virtual_reveal(test_client: TestClient) -> None:
+    """Virtual reveal streams increasing progress and the new digits."""
+    schedule = RevealSchedule(
+        total_chars=5, started_at=time.time(), base_delay=0.05
+    )
+    celery_app.backend.store_result(
+        "revealing", finished_result("3.1416", schedule), "SUCCESS"
+    )
+
+    response = test_client.get("/progress/revealing/stream?digits=true")
+
+    events = _parse_sse(response.text)
+    assert events[-1][0] == "finished"
+    assert all(event == "progress" for event, _ in events[:-1])
+    progress = [data["progress"] for _, data in events]
+    assert progress == sorted(progress)
+    assert "".join(data["digits"] for _, data in events) == "3.1416"
+
+
+@pytest.mark.asyncio
+async def test_stream_pushes_published_states(
+    fake_redis: fakeredis.FakeRedis,
+) -> None:
+    """States written by the worker are pushed until the task finishes."""
+    _store_progress("task", 0.0)
+    events = progress_events("task", get_async_redis())
+
+    assert await anext(events) == (
+        "progress",
+        {
+            "state": "PROGRESS",
+            "progress": 0.0,
+            "result": None,
+            "partial_result": None,
+            "eta_seconds": None,
+            "estimated_peak_bytes": None,
+        },
+    )
+
+    _store_progress("task", 0.5)
+    assert (await anext(events))[1]["progress"] == 0.5
+
+    fake_redis.publish(
+        PROGRESS_CHANNEL.format(task_id="task"),
+        json.dumps({"state": "PROGRESS", "progress": 0.75, "result": None}),
+    )
+    assert (await anext(events))[1]["progress"] == 0.75
+
+    celery_app.backend.store_result("task", finished_result("3.14"), "SUCCESS")
+    assert await anext(events) == (
+        "finished",
+        {
+            "state": "FINISHED",
+            "progress": 1.0,
+            "result": "3.14",
+            "partial_result": None,
+            "eta_seconds": 0.0,
+            "estimated_peak_bytes": None,
+        },
+    )
+    assert await anext(events, None) is None
+
+
+@pytest.mark.asyncio
+async def test_stream_reports_failure() -> None:
+    """A failing task ends the stream with an error event."""
+    _store_progress("failing", 0.1)
+    events = progress_events("failing", get_async_redis())
+    await anext(events)
+
+    celery_app.backend.mark_as_failure("failing", RuntimeError("boom"))
+
+    assert await anext(events) == (
+        "error",
+        {"detail": "Task execution failed"},
+    )
+    assert await anext(events, None) is None
+
+
+@pytest.mark.asyncio
+async def test_stream_keepalive(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A keepalive event is sent when no update arrives in time."""
+    monkeypatch.setattr(settings, "STREAM_KEEPALIVE", 0.01)
+    _store_progress("idle", 0.2)
+    events = progress_events("idle", get_async_redis())
+    await anext(events)
+
+    assert await anext(events) == ("keepalive", {})
+    await events.aclose()
+
+
+def test_websocket_stream(test_client: TestClient) -> None:
+    """WebSocket clients receive the events as JSON messages."""
+    celery_app.backend.store_result(
+        "done", finished_result("3.1416"), "SUCCESS"
+    )
+
+    with test_client.websocket_connect("/progress/done/stream") as ws:
+        message = ws.receive_json()
+        assert message == {
+            "event": "finished",
+            "state": "FINISHED",
+            "progress": 1.0,
+            "result": "3.1416",
+            "partial_result": None,
+            "eta_seconds": 0.0,
+            "estimated_peak_bytes": None,
+        }
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_json()
+
+
+def test_websocket_task_not_found(test_client: TestClient) -> None:
+    """WebSocket streams of unknown tasks close with code 4404."""
+    with test_client.websocket_connect("/progress/unknown/stream") as ws:
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            ws.receive_json()
+
+    assert exc_info.value.code == 4404
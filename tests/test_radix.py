@@ -0,0 +1,78 @@
+"""Tests for divide-and-conquer decimal conversion."""
+
+import mmap
+import random
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from app import radix
+from app.radix import decimal_digits, write_decimal
+
+
+@pytest.fixture(params=["gmpy2", "python"])
+def conversion(
+    request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[None]:
+    """Run a test with and without gmpy2, splitting small values too."""
+    if request.param == "gmpy2":
+        pytest.importorskip("gmpy2")
+    monkeypatch.setattr("app.bigint.HAS_GMPY2", request.param == "gmpy2")
+    monkeypatch.setattr(radix, "LEAF_DIGITS", 8)
+    monkeypatch.setattr(radix, "LEAF_BITS", 32)
+    monkeypatch.setattr(radix, "COPY_CHUNK", 5)
+    yield
+
+
+@pytest.mark.parametrize("n_digits", [1, 7, 8, 9, 100, 1000, 1025])
+def test_decimal_digits_match_str(conversion: None, n_digits: int) -> None:
+    """Digits of random values equal their str()."""
+    value = random.Random(n_digits).randrange(
+        10 ** (n_digits - 1), 10**n_digits
+    )
+
+    assert decimal_digits(value, n_digits) == str(value)
+
+
+def test_decimal_digits_zero_padded(conversion: None) -> None:
+    """Values shorter than width get leading zeros."""
+    value = 10**40 + 7
+
+    assert decimal_digits(value, 60) == str(value).zfill(60)
+    assert decimal_digits(0, 20) == "0" * 20
+
+
+@pytest.mark.parametrize("n_chars", [0, 1, 15, 33, 99])
+def test_decimal_digits_truncated(conversion: None, n_chars: int) -> None:
+    """Only the leading n_chars digits are written."""
+    value = random.Random(0).randrange(10**99, 10**100)
+
+    assert decimal_digits(value, 100, n_chars) == str(value)[:n_chars]
+
+
+def test_write_decimal_to_memory_map(conversion: None, tmp_path: Path) -> None:
+    """Digits can be written straight into a memory-mapped file."""
+    value = random.Random(1).randrange(10**299, 10**300)
+    path = tmp_path / "digits"
+    path.write_bytes(b"\0" * 250)
+
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), 0) as mm:
+        write_decimal(value, 300, mm)
+
+    assert path.read_text() == str(value)[:250]
+
+
+def test_write_decimal_rejects_oversized_buffer() -> None:
+    """Buffers longer than the value's width are rejected."""
+    with pytest.raises(ValueError):
+        write_decimal(123, 3, bytearray(4))
+
+
+def test_decimal_digits_beyond_str_limit() -> None:
+    """Values longer than the int string conversion limit are converted."""
+    n_digits = sys.get_int_max_str_digits() + 1000
+    value = 10 ** (n_digits - 1) + 1
+
+    assert decimal_digits(value, n_digits) == "1" + "0" * (n_digits - 2) + "1"
@@ -0,0 +1,206 @@
+"""Tests for /result endpoint."""
+
+import gzip
+
+import fakeredis
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.celery_app import celery_app
+from app.result_reader import (
+    RangeNotSatisfiableError,
+    StoredResult,
+    parse_range,
+)
+from app.settings import settings
+from app.storage.results import store_packed_result
+from app.tasks.calculate_pi import finished_result
+
+
+PI_VALUE = "3." + "1415926535" * 20
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture(params=["inline", "packed"])
+def finished_task(
+    request: pytest.FixtureRequest, fake_redis: fakeredis.FakeRedis
+) -> str:
+    """A finished task whose result is stored inline or packed."""
+    result = finished_result(PI_VALUE)
+    if request.param == "packed":
+        result["result"] = None
+        result["result_ref"] = store_packed_result(
+            fake_redis, "done", PI_VALUE
+        )
+    celery_app.backend.store_result("done", result, "SUCCESS")
+    return "done"
+
+
+def test_result_full(test_client: TestClient, finished_task: str) -> None:
+    """The whole value is streamed as text/plain."""
+    response = test_client.get(f"/result/{finished_task}", headers=IDENTITY)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.text == PI_VALUE
+
+
+@pytest.mark.parametrize(
+    "offset,length", [(0, 1), (0, 3), (1, 2), (2, 5), (7, 100), (150, 500)]
+)
+def test_result_offset_length(
+    test_client: TestClient, finished_task: str, offset: int, length: int
+) -> None:
+    """offset/length select characters of the formatted value."""
+    response = test_client.get(
+        f"/result/{finished_task}",
+        params={"offset": offset, "length": length},
+        headers=IDENTITY,
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text == PI_VALUE[offset : offset + length]
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        ("bytes=0-9", slice(0, 10)),
+        ("bytes=100-", slice(100, None)),
+        ("bytes=-5", slice(-5, None)),
+    ],
+)
+def test_result_range(
+    test_client: TestClient, finished_task: str, header: str, expected: slice
+) -> None:
+    """Range requests are served as 206 Partial Content."""
+    response = test_client.get(
+        f"/result/{finished_task}", headers={"Range": header, **IDENTITY}
+    )
+
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.text == PI_VALUE[expected]
+    assert response.headers["content-range"].endswith(f"/{len(PI_VALUE)}")
+    assert "content-encoding" not in response.headers
+
+
+def test_result_invalid_range_ignored(
+    test_client: TestClient, finished_task: str
+) -> None:
+    """Syntactically invalid ranges are ignored: the full value is
+    served."""
+    response = test_client.get(
+        f"/result/{finished_task}", headers={"Range": "bytes=9-0", **IDENTITY}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text == PI_VALUE
+
+
+def test_parse_range_rejects_non_ascii_digits() -> None:
+    """Only ASCII digits are positions: other Unicode digits, which
+    int() rejects, make the range invalid rather than fail."""
+    assert parse_range("bytes=\u00b2-5", 100) is None  # Latin-1 "²"
+    assert parse_range("bytes=-\u00b2", 100) is None
+    assert parse_range("bytes=\u0661-5", 100) is None  # Arabic-Indic 1
+
+
+def test_result_range_not_satisfiable(
+    test_client: TestClient, finished_task: str
+) -> None:
+    """Ranges past the end are rejected with 416."""
+    response = test_client.get(
+        f"/result/{finished_task}", headers={"Range": "bytes=5000-"}
+    )
+
+    assert response.status_code == status.HTTP_416_RANGE_NOT_SATISFIABLE
+    assert response.headers["content-range"] == f"bytes */{len(PI_VALUE)}"
+
+
+def test_result_gzip(test_client: TestClient, finished_task: str) -> None:
+    """Full responses are gzip-compressed when accepted."""
+    with test_client.stream(
+        "GET", f"/result/{finished_task}", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == PI_VALUE.encode()
+
+
+def test_result_chunked_reads(
+    test_client: TestClient,
+    finished_task: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Results are read chunk by chunk."""
+    monkeypatch.setattr(settings, "RESULT_CHUNK_CHARS", 7)
+
+    response = test_client.get(
+        f"/result/{finished_task}",
+        params={"offset": 3, "length": 50},
+        headers=IDENTITY,
+    )
+
+    assert response.text == PI_VALUE[3:53]
+
+
+def test_result_task_not_found(test_client: TestClient) -> None:
+    """Unknown tasks return 404."""
+    response = test_client.get("/result/unknown")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_result_task_not_finished(test_client: TestClient) -> None:
+    """Running tasks return 409."""
+    celery_app.backend.store_result(
+        "running", {"progress": 0.5, "result": None}, "PROGRESS"
+    )
+
+    response = test_client.get("/result/running")
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+def test_result_task_failed(test_client: TestClient) -> None:
+    """Failed tasks return 500."""
+    celery_app.backend.mark_as_failure("failed", RuntimeError("boom"))
+
+    response = test_client.get("/result/failed")
+
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert response.json()["detail"] == "Task execution failed"
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        ("bytes=0-0", (0, 1)),
+        ("bytes=5-1000", (5, 100)),
+        ("bytes=-1000", (0, 100)),
+        ("items=0-5", None),
+        ("bytes=0-1,5-6", None),
+        ("bytes=x-5", None),
+        ("bytes=5-1", None),
+    ],
+)
+def test_parse_range(header: str, expected: tuple[int, int] | None) -> None:
+    """Single byte ranges are parsed, other ranges ignored."""
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=-0", "bytes=100-150"])
+def test_parse_range_not_satisfiable(header: str) -> None:
+    """Ranges outside of the representation are not satisfiable."""
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range(header, 100)
+
+
+def test_stored_result_length() -> None:
+    """Lengths count the decimal point of the formatted value."""
+    assert StoredResult(pi_value="3.14").length == 4
+    assert StoredResult(ref={"key": "k", "length": 3}).length == 4
+    assert StoredResult(ref={"key": "k", "length": 1}).length == 1
@@ -0,0 +1,126 @@
+"""Tests for the theatrical reveal schedule."""
+
+import math
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.celery_app import celery_app
+from app.reveal import RevealSchedule
+from app.settings import settings
+from app.tasks.calculate_pi import finished_result, reveal
+
+
+def _reveal_times(total_chars: int) -> list[float]:
+    """Reveal timestamps of the original sleeping loop."""
+    times, elapsed = [], 0.0
+    for i in range(total_chars):
+        times.append(elapsed)
+        elapsed += 5.0 * math.exp(-8.0 * i / max(total_chars - 1, 1))
+    return times + [elapsed]
+
+
+@pytest.mark.parametrize("total_chars", [1, 2, 11, 101, 5001])
+def test_schedule_matches_sleeping_loop(total_chars: int) -> None:
+    """Closed-form schedule reveals digits when the loop would have."""
+    schedule = RevealSchedule(total_chars=total_chars, started_at=0.0)
+    times = _reveal_times(total_chars)
+
+    assert schedule.duration == pytest.approx(times[-1])
+    for i, t in enumerate(times[:-1]):
+        assert schedule.revealed_chars(t + 1e-9) == i + 1
+        assert schedule.revealed_chars(t - 1e-9) == i
+    assert schedule.revealed_chars(times[-1] + 1e-9) == total_chars
+
+
+def test_schedule_progress_and_prefix() -> None:
+    """Progress and revealed prefix follow the elapsed time."""
+    schedule = RevealSchedule(total_chars=5, started_at=100.0)
+
+    assert schedule.progress(99.0) == 0.0
+    assert schedule.progress(100.0) == pytest.approx(0.2)
+    assert schedule.revealed_prefix("3.1416", 100.0) == "3"
+    assert schedule.revealed_prefix("3.1416", 105.0) == "3.1"
+    assert not schedule.is_finished(105.0)
+    assert schedule.is_finished(100.0 + schedule.duration + 1e-9)
+    assert schedule.revealed_prefix("3.1416", 200.0) == "3.1416"
+
+
+def test_schedule_start_progress() -> None:
+    """The reveal only covers the progress left after start_progress."""
+    schedule = RevealSchedule(
+        total_chars=4, started_at=0.0, start_progress=0.5
+    )
+
+    assert schedule.progress(0.0) == pytest.approx(0.625)
+    assert schedule.progress(schedule.duration) == 1.0
+
+
+def test_virtual_reveal_returns_immediately() -> None:
+    """Virtual mode returns the result with its schedule, no sleeping."""
+    task = MagicMock()
+
+    with patch("app.tasks.calculate_pi.time.sleep") as mock_sleep:
+        result = reveal(task, "3.1416")
+
+    mock_sleep.assert_not_called()
+    task.update_state.assert_not_called()
+    assert result["result"] == "3.1416"
+    assert result["reveal"]["total_chars"] == 5
+
+
+def test_worker_reveal_sleeps_through_schedule(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Worker mode reports each digit and returns a plain result."""
+    monkeypatch.setattr(settings, "REVEAL_MODE", "worker")
+    task = MagicMock()
+
+    with patch("app.tasks.calculate_pi.time.sleep") as mock_sleep:
+        result = reveal(task, "3.1416")
+
+    assert mock_sleep.call_count == 5
+    assert mock_sleep.call_args_list[0].args == (5.0,)
+    progress = [
+        call.kwargs["meta"]["progress"]
+        for call in task.update_state.call_args_list
+    ]
+    assert progress == pytest.approx([0.2, 0.4, 0.6, 0.8, 1.0])
+    assert "reveal" not in result
+
+
+@pytest.mark.parametrize(
+    "elapsed,expected_state,expected_progress",
+    [
+        (0.0, "PROGRESS", 0.2),
+        (5.5, "PROGRESS", 0.4),
+        (60.0, "FINISHED", 1.0),
+    ],
+)
+def test_check_progress_derives_virtual_reveal(
+    test_client: TestClient,
+    elapsed: float,
+    expected_state: str,
+    expected_progress: float,
+) -> None:
+    """Endpoint derives progress of a finished task from elapsed time."""
+    schedule = RevealSchedule(total_chars=5, started_at=time.time() - elapsed)
+
+    celery_app.backend.store_result(
+        "revealing-task", finished_result("3.1416", schedule), "SUCCESS"
+    )
+
+    response = test_client.post(
+        "/check_progress", json={"task_id": "revealing-task"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["state"] == expected_state
+    assert data["progress"] == pytest.approx(expected_progress, abs=0.01)
+    assert data["result"] == (
+        "3.1416" if expected_state == "FINISHED" else None
+    )
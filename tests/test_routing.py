@@ -0,0 +1,126 @@
+"""Tests for size-aware queue routing."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.celery_app import celery_app
+from app.cost_model import CostEstimate, estimate_cost
+from app.engines import EngineRun, record_throughput
+from app.redis_client import get_redis
+from app.routing import Route, default_priority, route_calculation
+from app.settings import settings
+
+
+def test_route_by_estimated_cost(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Requests estimated from HEAVY_MIN_SECONDS on go to the heavy queue."""
+    monkeypatch.setattr(settings, "HEAVY_MIN_SECONDS", 10.0)
+
+    quick = CostEstimate("chudnovsky", seconds=9.9, peak_bytes=0)
+    slow = CostEstimate("chudnovsky", seconds=10.0, peak_bytes=0)
+
+    assert route_calculation(10, quick).queue == settings.FAST_QUEUE
+    assert route_calculation(10, slow).queue == settings.HEAVY_QUEUE
+
+
+def test_smaller_requests_get_higher_priority() -> None:
+    """Default priorities follow the size, explicit ones are kept and
+    deferred requests come last."""
+    priorities = [default_priority(n) for n in [1, 50, 5000, 10**12]]
+    estimate = estimate_cost(5000)
+
+    assert priorities == [0, 1, 3, 9]
+    assert route_calculation(5000, estimate, priority=0).priority == 0
+    assert route_calculation(5000, estimate, 0, deferred=True).priority == 9
+
+
+def test_distributed_jobs_route() -> None:
+    """Distributed jobs run their parts on the parts queue and their
+    merge on the heavy queue."""
+    router = celery_app.amqp.router
+
+    part = router.route({}, "app.tasks.distributed.binary_split_range_task")
+    merge = router.route({}, "app.tasks.distributed.merge_partials_task")
+
+    assert part["queue"].name == settings.PARTS_QUEUE
+    assert merge["queue"].name == settings.HEAVY_QUEUE
+
+
+@pytest.mark.parametrize(
+    ("positions", "queue"),
+    [
+        ([0, 1000], settings.FAST_QUEUE),
+        ([10**6], settings.HEAVY_QUEUE),
+    ],
+)
+def test_hex_extractions_routed_by_cost(
+    test_client: TestClient, positions: list[int], queue: str
+) -> None:
+    """Hex digit extractions go to the queue of their estimated cost."""
+    with patch("app.main.extract_hex_digits_task.apply_async") as mock_apply:
+        mock_apply.return_value = MagicMock(id="hex-id")
+        response = test_client.post(
+            "/hex_digits", json={"positions": positions}
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert mock_apply.call_args.kwargs["queue"] == queue
+
+
+def test_oversized_hex_extraction_rejected(test_client: TestClient) -> None:
+    """Extractions over the time budget are refused."""
+    positions = list(range(10**7 - 999, 10**7 + 1))
+
+    response = test_client.post("/hex_digits", json={"positions": positions})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert "Estimated cost exceeds the budget" in response.text
+
+
+@pytest.mark.parametrize(
+    ("payload", "route"),
+    [
+        ({"n": 100}, Route(settings.FAST_QUEUE, 2)),
+        ({"n": 3 * 10**6}, Route(settings.HEAVY_QUEUE, 6)),
+        ({"n": 3 * 10**6, "priority": 0}, Route(settings.HEAVY_QUEUE, 0)),
+    ],
+)
+def test_endpoint_publishes_along_route(
+    test_client: TestClient, payload: dict, route: Route
+) -> None:
+    """/calculate_pi publishes calculations to their queue and priority."""
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
+        mock_apply.return_value = MagicMock(id="task-id")
+        response = test_client.post("/calculate_pi", json=payload)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert mock_apply.call_args.kwargs["queue"] == route.queue
+    assert mock_apply.call_args.kwargs["priority"] == route.priority
+
+
+def test_engine_picked_once_at_submission(test_client: TestClient) -> None:
+    """The engine picked for a request is the one its estimate and
+    route are based on, and the one the task is told to run."""
+    record_throughput(get_redis(), EngineRun("spigot", "3" * 150_002, 0.01))
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
+        mock_apply.return_value = MagicMock(id="task-id")
+        response = test_client.post("/calculate_pi", json={"n": 150_000})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert mock_apply.call_args.args == ((150_000, None, "spigot"),)
+    # Routed by the spigot's cost, not by the cheapest modelled engine
+    assert estimate_cost(150_000, "spigot").seconds >= (
+        settings.HEAVY_MIN_SECONDS
+    )
+    assert mock_apply.call_args.kwargs["queue"] == settings.HEAVY_QUEUE
+
+
+def test_endpoint_rejects_invalid_priority(test_client: TestClient) -> None:
+    """Priorities are limited to the broker's levels."""
+    response = test_client.post(
+        "/calculate_pi", json={"n": 10, "priority": 10}
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
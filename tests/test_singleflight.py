@@ -0,0 +1,243 @@
+"""Tests for single-flight deduplication of in-flight calculations."""
+
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.celery_app import celery_app
+from app.singleflight import (
+    Flight,
+    close_subscriptions,
+    detach,
+    find_inflight,
+    join_inflight,
+    join_or_claim,
+    release,
+)
+from app.storage import DigitStore
+from app.tasks.calculate_pi import (
+    calculate_pi_task,
+    fail_subscribers,
+    finish_subscribers,
+)
+
+
+@pytest.fixture
+def mock_apply() -> MagicMock:
+    with patch("app.main.calculate_pi_task.apply_async") as mock_apply:
+        mock_apply.side_effect = lambda args, task_id, **_: MagicMock(
+            id=task_id
+        )
+        yield mock_apply
+
+
+def test_first_request_claims(fake_redis: fakeredis.FakeRedis) -> None:
+    """The first request for (algorithm, n) claims it."""
+    flight = join_or_claim(fake_redis, None, 100, "task-a")
+
+    assert flight.outcome == "claimed"
+    assert flight.task_id == "task-a"
+    assert find_inflight(fake_redis, None, 100) == "task-a"
+
+
+def test_identical_request_joins(fake_redis: fakeredis.FakeRedis) -> None:
+    """Identical requests join the claimed task."""
+    join_or_claim(fake_redis, None, 100, "task-a")
+    flight = join_or_claim(fake_redis, None, 100, "task-b")
+
+    assert flight.outcome == "joined"
+    assert flight.task_id == "task-a"
+
+
+def test_algorithm_is_part_of_the_key(
+    fake_redis: fakeredis.FakeRedis,
+) -> None:
+    """Requests for another algorithm never share a task."""
+    join_or_claim(fake_redis, "mpmath", 100, "task-a")
+
+    assert join_or_claim(fake_redis, None, 100, "task-b").outcome == "claimed"
+    assert join_or_claim(fake_redis, None, 50, "task-c").task_id == "task-b"
+
+
+def test_smaller_request_subscribes(fake_redis: fakeredis.FakeRedis) -> None:
+    """Requests for fewer digits subscribe to the smallest larger task."""
+    join_or_claim(fake_redis, None, 100, "task-medium")
+    join_or_claim(fake_redis, None, 1000, "task-large")
+    flight = join_or_claim(fake_redis, None, 50, "alias")
+
+    assert flight.outcome == "subscribed"
+    assert flight.task_id == "task-medium"
+    assert close_subscriptions(fake_redis, None, "task-medium") == {
+        "alias": 50
+    }
+
+
+def test_subscription_bounded_by_remaining_time(
+    fake_redis: fakeredis.FakeRedis,
+) -> None:
+    """Requests only subscribe to a larger task estimated to finish
+    before their own calculation would."""
+    join_or_claim(fake_redis, None, 10**6, "task-slow", seconds=600.0)
+    join_or_claim(fake_redis, None, 10**5, "task-fast", seconds=5.0)
+
+    flight = join_or_claim(fake_redis, None, 2 * 10**5, "a", seconds=10.0)
+    assert flight.outcome == "claimed"
+    flight = join_or_claim(fake_redis, None, 50, "b", seconds=4.5)
+    assert flight == Flight("subscribed", "task-fast")
+    flight = join_or_claim(fake_redis, None, 3 * 10**5, "c", seconds=900.0)
+    assert flight == Flight("subscribed", "task-slow")
+
+
+def test_overdue_tasks_are_pruned(fake_redis: fakeredis.FakeRedis) -> None:
+    """Index members outliving their estimate (e.g. their worker died)
+    take no subscribers and are removed from the index."""
+    join_or_claim(fake_redis, None, 1000, "task-dead", seconds=10.0)
+    ttl = fake_redis.ttl("pi:finish:task-dead")
+    assert 0 < ttl <= 2 * 10 + 60
+    assert fake_redis.ttl("pi:inflight:auto") > 0
+
+    fake_redis.delete("pi:finish:task-dead")  # Expired
+    flight = join_or_claim(fake_redis, None, 50, "task-b")
+
+    assert flight.outcome == "claimed"
+    assert fake_redis.zscore("pi:inflight:auto", "task-dead") is None
+
+
+def test_closed_task_accepts_no_subscribers(
+    fake_redis: fakeredis.FakeRedis,
+) -> None:
+    """Once its digits are computed a task takes no more subscribers."""
+    join_or_claim(fake_redis, None, 1000, "task-large")
+    close_subscriptions(fake_redis, None, "task-large")
+
+    assert join_or_claim(fake_redis, None, 50, "task-b").outcome == "claimed"
+    # Identical requests still join until the task is released
+    assert join_or_claim(fake_redis, None, 1000, "x").outcome == "joined"
+
+
+def test_detach_counts_attached_clients(
+    fake_redis: fakeredis.FakeRedis,
+) -> None:
+    """A task is held while its submitter, joiners or live aliases are
+    attached to it; an alias detaches from the task it subscribed to."""
+    join_or_claim(fake_redis, None, 100, "task-a")
+    assert join_inflight(fake_redis, None, 100) == "task-a"
+    join_or_claim(fake_redis, None, 50, "alias")
+
+    assert detach(fake_redis, "alias") == ("task-a", True)
+    assert close_subscriptions(fake_redis, None, "task-a") == {}
+    assert detach(fake_redis, "task-a") == ("task-a", True)
+
+    join_or_claim(fake_redis, None, 200, "task-c")
+    join_or_claim(fake_redis, None, 150, "alias-c")
+    assert detach(fake_redis, "alias-c") == ("task-c", True)
+    assert detach(fake_redis, "task-c") == ("task-c", False)
+    # Tasks that were never deduplicated are not held
+    assert detach(fake_redis, "task-b") == ("task-b", False)
+
+
+def test_detach_is_idempotent(fake_redis: fakeredis.FakeRedis) -> None:
+    """Detaching an id again drops no other client's reference."""
+    join_or_claim(fake_redis, None, 100, "task-a")
+    assert join_inflight(fake_redis, None, 100) == "task-a"
+    join_or_claim(fake_redis, None, 50, "alias")
+
+    for _ in range(3):
+        assert detach(fake_redis, "task-a") == ("task-a", True)
+        assert detach(fake_redis, "alias") == ("task-a", True)
+    assert fake_redis.get("pi:holders:task-a") == b"1"
+
+
+def test_release_only_removes_own_claim(
+    fake_redis: fakeredis.FakeRedis,
+) -> None:
+    """Releasing a stale task id keeps a newer claim intact."""
+    join_or_claim(fake_redis, None, 100, "task-a")
+    release(fake_redis, None, 100, "task-old")
+    assert find_inflight(fake_redis, None, 100) == "task-a"
+
+    release(fake_redis, None, 100, "task-a")
+    assert find_inflight(fake_redis, None, 100) is None
+
+
+def test_endpoint_deduplicates_identical_requests(
+    test_client: TestClient, mock_apply: MagicMock
+) -> None:
+    """Identical requests get the same task_id and start one task."""
+    task_ids = {
+        test_client.post("/calculate_pi", json={"n": 100}).json()["task_id"]
+        for _ in range(5)
+    }
+
+    assert len(task_ids) == 1
+    mock_apply.assert_called_once()
+
+
+def test_endpoint_subscribes_smaller_requests(
+    test_client: TestClient, mock_apply: MagicMock
+) -> None:
+    """A smaller request gets an alias finished from the larger task."""
+    parent_id = test_client.post("/calculate_pi", json={"n": 100}).json()[
+        "task_id"
+    ]
+    alias_id = test_client.post("/calculate_pi", json={"n": 4}).json()[
+        "task_id"
+    ]
+
+    assert alias_id != parent_id
+    mock_apply.assert_called_once()
+
+    response = test_client.post("/check_progress", json={"task_id": alias_id})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["state"] == "PROGRESS"
+
+    finish_subscribers(parent_id, None, "3141592653")
+
+    # Skip past the alias's virtual reveal
+    with patch("app.task_state.time.time", return_value=time.time() + 60):
+        response = test_client.post(
+            "/check_progress", json={"task_id": alias_id}
+        )
+    assert response.json()["state"] == "FINISHED"
+    assert response.json()["result"] == "3.1416"
+
+
+def test_failed_task_fails_subscribers(
+    test_client: TestClient, mock_apply: MagicMock
+) -> None:
+    """Aliases fail together with the task they subscribed to."""
+    parent_id = test_client.post("/calculate_pi", json={"n": 100}).json()[
+        "task_id"
+    ]
+    alias_id = test_client.post("/calculate_pi", json={"n": 4}).json()[
+        "task_id"
+    ]
+
+    fail_subscribers(parent_id, None, RuntimeError("worker lost"))
+
+    response = test_client.post("/check_progress", json={"task_id": alias_id})
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+def test_task_releases_claim(
+    fake_redis: fakeredis.FakeRedis, tmp_path: Path
+) -> None:
+    """A finished task releases its claim and finishes subscribers."""
+    join_or_claim(fake_redis, None, 20, "task-id")
+    join_or_claim(fake_redis, None, 5, "alias")
+    store = DigitStore(str(tmp_path / "pi_digits"))
+
+    with (
+        patch("app.tasks.calculate_pi.get_digit_store", return_value=store),
+        patch("app.tasks.calculate_pi.reveal") as mock_reveal,
+    ):
+        calculate_pi_task.apply(args=(20,), task_id="task-id")
+
+    assert mock_reveal.call_args.args[1] == "3.14159265358979323846"
+    assert find_inflight(fake_redis, None, 20) is None
+    assert celery_app.AsyncResult("alias").result["result"] == "3.14159"
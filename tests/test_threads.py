@@ -0,0 +1,121 @@
+"""Tests for running tasks concurrently in one process (threads pool)."""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from celery.contrib.testing.worker import start_worker
+from mpmath import mp
+
+from app.celery_app import celery_app
+from app.digits import format_pi
+from app.engines import chudnovsky, get_engine
+from app.settings import settings
+from app.storage.digit_store import DigitStore
+from app.tasks.calculate_pi import calculate_pi_task
+
+
+ROOT = Path(__file__).parent.parent
+
+
+def _reference_digits(n_chars: int) -> str:
+    return get_engine("chudnovsky").compute(n_chars)
+
+
+def test_mpmath_precision_is_per_run() -> None:
+    """The mpmath engine neither follows nor changes the global mp."""
+    mp.dps = 5
+    try:
+        digits = get_engine("mpmath").compute(500)
+
+        assert mp.dps == 5
+    finally:
+        mp.dps = 15
+
+    assert digits == _reference_digits(500)
+
+
+def test_concurrent_engine_runs() -> None:
+    """Engines run side by side in threads give every run its digits."""
+    runs = [
+        (engine, n_chars)
+        for n_chars in (50, 3000, 700, 12_000, 1)
+        for engine in ("mpmath", "chudnovsky", "spigot")
+        if engine != "spigot" or n_chars <= 3000
+    ]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(
+            pool.map(lambda run: get_engine(run[0]).compute(run[1]), runs)
+        )
+
+    reference = _reference_digits(12_000)
+    for (engine, n_chars), digits in zip(runs, results):
+        assert digits == reference[:n_chars], (engine, n_chars)
+
+
+def test_concurrent_tasks(tmp_path: Path) -> None:
+    """Tasks of different sizes and engines running in threads of one
+    process, sharing the digit store, each return their own result."""
+    store = DigitStore(str(tmp_path / "pi_digits"))
+    runs = [
+        (n_digits, engine)
+        for n_digits in (10, 2000, 300, 5000)
+        for engine in ("mpmath", "chudnovsky", "spigot")
+    ]
+
+    def run(i: int) -> dict:
+        n_digits, engine = runs[i]
+        return calculate_pi_task.apply(
+            args=(n_digits, engine), task_id=f"task-{i}"
+        ).get()
+
+    with (
+        patch("app.tasks.calculate_pi.get_digit_store", return_value=store),
+        ThreadPoolExecutor(max_workers=6) as pool,
+    ):
+        results = list(pool.map(run, range(len(runs))))
+
+    reference = _reference_digits(5002)
+    for (n_digits, _), result in zip(runs, results):
+        assert result["result"] == format_pi(reference, n_digits)
+
+
+def _compose_pool(variable: str) -> str:
+    compose = (ROOT / "docker-compose.yml").read_text()
+    return re.search(rf"\$\{{{variable}:-(\w+)\}}", compose).group(1)
+
+
+def test_heavy_worker_splits_in_parallel(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A worker with the heavy queue's deployed pool runs large
+    calculations with parallel binary splitting, not the serial
+    fallback of daemonic pool processes."""
+    monkeypatch.setattr(settings, "PARALLEL_WORKERS", 2)
+    monkeypatch.setattr(settings, "PARALLEL_MIN_DIGITS", 1000)
+    monkeypatch.setitem(celery_app.conf, "broker_url", "memory://")
+    store = DigitStore(str(tmp_path / "pi_digits"))
+
+    with (
+        patch("app.tasks.calculate_pi.get_digit_store", return_value=store),
+        patch(
+            "app.engines.chudnovsky.chunked_binary_split",
+            wraps=chudnovsky.chunked_binary_split,
+        ) as serial,
+        start_worker(
+            celery_app,
+            pool=_compose_pool("HEAVY_WORKER_POOL"),
+            concurrency=1,
+            queues=[settings.HEAVY_QUEUE],
+            perform_ping_check=False,
+        ),
+    ):
+        result = calculate_pi_task.apply_async(
+            (3000, "chudnovsky"), queue=settings.HEAVY_QUEUE
+        ).get(timeout=60)
+
+    assert result["result"] == format_pi(_reference_digits(3002), 3000)
+    serial.assert_not_called()